@@ -122,6 +122,62 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Columnar per-symbol price files (see backtester_app/price_store.py)
+PRICE_STORE_DIR = Path(os.getenv("PRICE_STORE_DIR", BASE_DIR / "price_store"))
+
+# Symbol of the PriceData rows stored before the table had a symbol column.
+# The app then kept one symbol's history at a time, AAPL unless another was fetched.
+LEGACY_PRICE_SYMBOL = os.getenv("LEGACY_PRICE_SYMBOL", "AAPL")
+
+# Where price history is downloaded from: "yfinance", "local" (files in
+# LOCAL_PRICE_DIR) or "synthetic" (deterministic random walks, no network)
+PRICE_PROVIDER = os.getenv("PRICE_PROVIDER", "yfinance")
+LOCAL_PRICE_DIR = Path(os.getenv("LOCAL_PRICE_DIR", BASE_DIR / "market_data"))
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", 0))
+
+# Extra named universes for batch fetches, one <name>.txt symbol list per file
+UNIVERSE_DIR = Path(os.getenv("UNIVERSE_DIR", BASE_DIR / "universes"))
+
+# Worker processes for parameter sweeps (None = one per CPU)
+SWEEP_MAX_WORKERS = int(os.getenv("SWEEP_MAX_WORKERS", 0)) or None
+
+# Threads serving fetch/benchmark and backtest requests under ASGI, and provider
+# downloads allowed at once per process (see backtester_app/concurrency.py)
+IO_WORKERS = int(os.getenv("IO_WORKERS", 32))
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", 0)) or os.cpu_count() or 1
+MARKET_DATA_CONCURRENCY = int(os.getenv("MARKET_DATA_CONCURRENCY", 4))
+
+# Precision of stored equity curves ("float32" or "float64", see backtester_app/codec.py)
+RESULT_CURVE_DTYPE = os.getenv("RESULT_CURVE_DTYPE", "float32")
+
+# Allow ?profile=1 on backtest requests to return a cProfile summary (see backtester_app/timing.py)
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", str(DEBUG)).lower() in ("1", "true", "yes")
+
+# Indicator arrays reused between backtests: .npy files per symbol (least recently used ones deleted past
+# INDICATOR_CACHE_DISK_MB) behind an LRU memory tier,
+# and the IndicatorCache keys computed over each symbol's history after ingest (see backtester_app/indicator_store.py)
+INDICATOR_CACHE_DIR = Path(os.getenv("INDICATOR_CACHE_DIR", BASE_DIR / "indicator_cache"))
+INDICATOR_CACHE_MEMORY_MB = int(os.getenv("INDICATOR_CACHE_MEMORY_MB", 64))
+INDICATOR_CACHE_DISK_MB = int(os.getenv("INDICATOR_CACHE_DISK_MB", 1024))
+INDICATOR_PREWARM = [("sma", 50), ("sma", 200), ("rsi", 14), ("macd", 12, 26, 9), ("bbands", 20, 2.0)]
+
+# Backtest and benchmark responses keyed by symbol, data version and parameters.
+# The local-memory backend evicts least recently used entries past MAX_ENTRIES.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "results": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "backtest-results",
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 256)),
+            "CULL_FREQUENCY": 4,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
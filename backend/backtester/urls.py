@@ -16,14 +16,27 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from backtester_app.views import DataFetchView, BacktestView, IndicatorsView, BenchmarkView
+from backtester_app.views import DataFetchView, BatchFetchView, BacktestView, BacktestHistoryView, BacktestDetailView, IndicatorsView, BenchmarkView, SweepView, WalkForwardView, MonteCarloView, PortfolioView, MetricsView, MonitorListView, MonitorDetailView, JobListView, JobDetailView
+from backtester_app.concurrency import async_view
 from django.views.generic import TemplateView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/fetch-data/', DataFetchView.as_view(), name='fetch-data'),
-    path('api/backtest/', BacktestView.as_view(), name='backtest'),
+    path('api/fetch-data/', async_view(DataFetchView, 'io'), name='fetch-data'),
+    path('api/fetch-data/batch/', async_view(BatchFetchView, 'io'), name='fetch-data-batch'),
+    path('api/backtest/', async_view(BacktestView, 'compute'), name='backtest'),
+    path('api/backtest/results/', BacktestHistoryView.as_view(), name='backtest-results'),
+    path('api/backtest/results/<int:result_id>/', BacktestDetailView.as_view(), name='backtest-result-detail'),
+    path('api/backtest/sweep/', async_view(SweepView, 'compute'), name='backtest-sweep'),
+    path('api/backtest/walk-forward/', async_view(WalkForwardView, 'compute'), name='backtest-walk-forward'),
+    path('api/backtest/monte-carlo/', async_view(MonteCarloView, 'compute'), name='backtest-monte-carlo'),
     path('api/indicators/', IndicatorsView.as_view(), name='indicators'),
-    path('api/benchmark/', BenchmarkView.as_view(), name='benchmark'),
+    path('api/benchmark/', async_view(BenchmarkView, 'io'), name='benchmark'),
+    path('api/portfolio/', async_view(PortfolioView, 'compute'), name='portfolio'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/monitors/', MonitorListView.as_view(), name='monitors'),
+    path('api/monitors/<int:monitor_id>/', MonitorDetailView.as_view(), name='monitor-detail'),
+    path('api/jobs/', JobListView.as_view(), name='jobs'),
+    path('api/jobs/<int:job_id>/', JobDetailView.as_view(), name='job-detail'),
     path('', TemplateView.as_view(template_name='index.html'), name='index'),
 ]
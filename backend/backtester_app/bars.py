@@ -0,0 +1,89 @@
+"""Bar intervals: on-the-fly resampling and annualization.
+
+A symbol is stored at the intervals it was fetched at (see price_store.py).
+Any coarser interval is built when it is requested from the coarsest stored
+interval that divides it, so storing 1m bars also serves 5m, 1h and 1d.
+Buckets are aligned to whole multiples of the interval since the epoch on the
+stored (exchange local, naive) timestamps and labelled by their start.
+"""
+import numpy as np
+
+from . import engine, price_store, price_table
+from .price_store import DAILY, INTERVALS
+
+
+def date_unit(interval):
+    """NumPy datetime unit timestamps of an interval are shown with: days for daily bars, else minutes"""
+    return 'D' if interval == DAILY else 'm'
+
+
+def format_timestamps(timestamps, interval):
+    """ISO strings: '2024-05-01' for daily bars, '2024-05-01T09:30' for intraday ones"""
+    return np.datetime_as_string(np.asarray(timestamps, dtype='datetime64[ns]'), unit=date_unit(interval))
+
+
+def resample(prices, interval):
+    """Aggregate bars into interval buckets.
+
+    Each bucket takes the first open, highest high, lowest low, last close
+    and total volume of the bars that fall in it.
+    """
+    step = INTERVALS[price_store.normalize_interval(interval)] * 10**9
+    ns = np.asarray(prices.timestamp, dtype='datetime64[ns]').astype(np.int64)
+    if len(ns) == 0:
+        return prices
+
+    buckets = ns // step
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.append(starts[1:], len(ns)) - 1
+    return price_store.PriceArrays(
+        symbol=prices.symbol,
+        timestamp=(buckets[starts] * step).astype('datetime64[ns]'),
+        open=np.asarray(prices.open)[starts],
+        high=np.maximum.reduceat(np.asarray(prices.high), starts),
+        low=np.minimum.reduceat(np.asarray(prices.low), starts),
+        close=np.asarray(prices.close)[ends],
+        volume=np.add.reduceat(np.asarray(prices.volume), starts),
+    )
+
+
+def source_interval(symbol, interval):
+    """The stored interval to read for a requested one, or None if none can serve it"""
+    interval = price_store.normalize_interval(interval)
+    stored = price_store.stored_intervals(symbol)
+    if not stored and price_table.backfill(symbol):
+        # Daily bars from before the columnar store, only in the PriceData table
+        stored = [DAILY]
+    if interval in stored:
+        return interval
+    divisors = [s for s in stored if INTERVALS[s] < INTERVALS[interval] and INTERVALS[interval] % INTERVALS[s] == 0]
+    return max(divisors, key=INTERVALS.get) if divisors else None
+
+
+def load_bars(symbol, start=None, end=None, interval=DAILY, source=None):
+    """price_store.load_series() at any interval, resampling a finer stored one if needed"""
+    interval = price_store.normalize_interval(interval)
+    source = source or source_interval(symbol, interval)
+    if source is None:
+        return None
+    prices = price_store.load_series(symbol, start, end, source)
+    if prices is not None and source != interval:
+        prices = resample(prices, interval)
+    return prices
+
+
+def periods_per_year(timestamps, interval):
+    """Bars per year used to annualize a run's Sharpe ratio.
+
+    Daily bars use engine.TRADING_DAYS. Intraday bars multiply that by the
+    median number of bars per day in the data, which follows the trading
+    session (390 one-minute bars for a US equity, 1440 for a market that
+    never closes) without a calendar per exchange.
+    """
+    if price_store.normalize_interval(interval) == DAILY:
+        return engine.TRADING_DAYS
+    days = np.asarray(timestamps, dtype='datetime64[ns]').astype('datetime64[D]')
+    if len(days) == 0:
+        return engine.TRADING_DAYS * 86400 // INTERVALS[interval]
+    _, counts = np.unique(days, return_counts=True)
+    return engine.TRADING_DAYS * float(np.median(counts))
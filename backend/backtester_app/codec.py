@@ -0,0 +1,102 @@
+"""Compact binary encoding for stored backtest curves and trade ledgers.
+
+Arrays are written in .npy format (so dtype and shape travel with the data)
+and zlib-compressed. Equity curves use ``settings.RESULT_CURVE_DTYPE``
+(float32 by default, which is exact to well under a cent at these account
+sizes). Dates are stored as the gaps between consecutive bars, in days for
+daily bars and minutes for intraday ones, which compress to a few dozen bytes
+for a trading calendar, and trades as a structured array with one record per
+trade.
+"""
+import base64
+import io
+import zlib
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+
+def trade_dtype(unit='D'):
+    return np.dtype([
+        ('entry_date', f'datetime64[{unit}]'),
+        ('exit_date', f'datetime64[{unit}]'),
+        ('entry_price', 'f8'),
+        ('exit_price', 'f8'),
+        ('position', 'i1'),
+        ('percent_pnl', 'f8'),
+        ('dollar_pnl', 'f8'),
+    ])
+
+
+def pack_array(values):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(values), allow_pickle=False)
+    return zlib.compress(buffer.getvalue(), 6)
+
+
+def unpack_array(blob):
+    return np.load(io.BytesIO(zlib.decompress(bytes(blob))), allow_pickle=False)
+
+
+def to_base64(blob):
+    """Compact API form of a packed array: base64 of the compressed .npy bytes"""
+    return base64.b64encode(bytes(blob)).decode('ascii')
+
+
+def encode_curve(values, dtype=None):
+    return pack_array(np.asarray(values, dtype=dtype or settings.RESULT_CURVE_DTYPE))
+
+
+def decode_curve(blob):
+    return unpack_array(blob).astype(np.float64)
+
+
+def encode_dates(timestamps, unit='D'):
+    """Returns (first date, packed gaps in ``unit``) for sorted timestamps.
+
+    The first gap counts from midnight of the first date.
+    """
+    times = np.asarray(timestamps, dtype='datetime64[ns]').astype(f'datetime64[{unit}]')
+    if len(times) == 0:
+        return None, pack_array(np.empty(0, dtype=np.int32))
+    first_day = times[0].astype('datetime64[D]')
+    origin = first_day.astype(f'datetime64[{unit}]').astype(np.int64)
+    gaps = np.diff(times.astype(np.int64), prepend=origin).astype(np.int32)
+    return pd.Timestamp(first_day).date(), pack_array(gaps)
+
+
+def decode_dates(start, blob, unit='D'):
+    gaps = unpack_array(blob)
+    return np.datetime64(start, 'D').astype(f'datetime64[{unit}]') + np.cumsum(gaps, dtype=np.int64)
+
+
+def encode_trades(trades, unit='D'):
+    """Pack the list of trade dicts from engine.extract_trades()"""
+    dtype = trade_dtype(unit)
+    ledger = np.empty(len(trades), dtype=dtype)
+    for name in dtype.names:
+        ledger[name] = [trade[name] for trade in trades]
+    return pack_array(ledger)
+
+
+def decode_trades(blob, unit='D'):
+    """Trade dicts in the same shape engine.extract_trades() returns"""
+    ledger = unpack_array(blob)
+    entry_dates = np.datetime_as_string(ledger['entry_date'], unit=unit)
+    exit_dates = np.datetime_as_string(ledger['exit_date'], unit=unit)
+    return [
+        {
+            'entry_date': entry_date,
+            'exit_date': exit_date,
+            'entry_price': entry,
+            'exit_price': exit,
+            'position': position,
+            'percent_pnl': pct,
+            'dollar_pnl': dollars,
+        }
+        for entry_date, exit_date, entry, exit, position, pct, dollars in zip(
+            entry_dates.tolist(), exit_dates.tolist(), ledger['entry_price'].tolist(), ledger['exit_price'].tolist(),
+            ledger['position'].tolist(), ledger['percent_pnl'].tolist(), ledger['dollar_pnl'].tolist(),
+        )
+    ]
@@ -0,0 +1,155 @@
+"""Serving many requests per process without blocking on downloads or backtests.
+
+Under ASGI (``backtester/asgi.py``) Django runs every synchronous view on one
+shared thread, so a slow download or a long backtest holds up every other
+request. ``async_view`` wraps a DRF view in an async Django view that runs
+it on a bounded thread pool instead, leaving the event loop free:
+
+- ``io``: fetch and benchmark requests, which mostly wait on the market
+  data provider (``settings.IO_WORKERS`` threads)
+- ``compute``: backtests, whose NumPy kernels release the GIL for most of
+  their time (``settings.COMPUTE_WORKERS`` threads)
+
+Provider downloads are capped at ``settings.MARKET_DATA_CONCURRENCY`` at a
+time per process, and ``DOWNLOADS`` coalesces concurrent refreshes of the
+same symbol so they share one download.
+
+Under ASGI, Django buffers a StreamingHttpResponse over a synchronous
+iterator completely before sending any of it, so streaming views check
+``is_asgi`` and hand it an asynchronous iterator there, e.g. through
+``iterate_async``.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executors = {}
+_download_slots = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; callers arriving while it runs wait for and share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            logger.info(f"Waiting on the running call for {key}")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def running(self):
+        with self._lock:
+            return len(self._calls)
+
+
+DOWNLOADS = SingleFlight()
+
+
+def executor(name):
+    """The named thread pool, created on first use"""
+    with _lock:
+        if name not in _executors:
+            workers = {'io': settings.IO_WORKERS, 'compute': settings.COMPUTE_WORKERS}[name]
+            _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'backtester-{name}')
+        return _executors[name]
+
+
+@contextmanager
+def download_slot():
+    """Hold one of the MARKET_DATA_CONCURRENCY provider download slots"""
+    global _download_slots
+    with _lock:
+        if _download_slots is None:
+            _download_slots = threading.BoundedSemaphore(settings.MARKET_DATA_CONCURRENCY)
+    with _download_slots:
+        yield
+
+
+def _call(fn, args, kwargs):
+    try:
+        response = fn(*args, **kwargs)
+        # Render here rather than on the event loop's thread
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        # Pool threads outlive requests, so release their connections like a request would
+        close_old_connections()
+
+
+def _background(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background call to {fn.__name__} failed")
+    finally:
+        close_old_connections()
+
+
+def run_background(name, fn, *args, **kwargs):
+    """Start fn(*args, **kwargs) on the named pool without waiting for it; failures are logged"""
+    return executor(name).submit(_background, fn, args, kwargs)
+
+
+async def run_in(name, fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the named pool"""
+    return await asyncio.wrap_future(executor(name).submit(_call, fn, args, kwargs))
+
+
+def async_view(view_class, pool):
+    """An async Django view running a DRF view class on the named pool"""
+    view = view_class.as_view()
+
+    async def handler(request, *args, **kwargs):
+        return await run_in(pool, view, request, *args, **kwargs)
+
+    handler.csrf_exempt = True
+    handler.view_class = view_class
+    handler.__name__ = view_class.__name__
+    return handler
+
+
+def is_asgi(request):
+    """True if a Django or DRF request is being served by the ASGI handler"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def iterate_async(iterable):
+    """An async iterator over a sync one, producing each item on a worker thread rather than the event loop"""
+    iterator = iter(iterable)
+    step = sync_to_async(next, thread_sensitive=False)
+    done = object()
+    while True:
+        item = await step(iterator, done)
+        if item is done:
+            return
+        yield item
@@ -0,0 +1,100 @@
+"""Trading costs and fill limits applied to a run's returns.
+
+A CostModel charges a fraction of the traded notional on every bar where the
+held position changes: commission, half the quoted bid-ask spread, a fixed
+slippage, and a market-impact term that grows with the square root of the
+trade's share of the bar's volume. With ``max_participation`` set, an entry
+that would trade more than that share of the bar's volume is cut to what the
+volume allows, and the run holds that reduced size until the position next
+changes. Exits always complete.
+
+Everything is array arithmetic over the bars, with the portfolio value
+before costs standing in for the equity a trade is sized from, so a free
+model costs nothing and a priced one a few passes over the run.
+"""
+import numpy as np
+
+BPS = 1e-4
+FIELDS = ('commission_bps', 'spread_bps', 'slippage_bps', 'impact_bps', 'max_participation')
+
+
+class CostModel:
+    """Per-trade costs in basis points of the traded notional, plus an optional volume participation cap"""
+    __slots__ = FIELDS
+
+    def __init__(self, commission_bps=0.0, spread_bps=0.0, slippage_bps=0.0, impact_bps=0.0, max_participation=None):
+        self.commission_bps = float(commission_bps)
+        self.spread_bps = float(spread_bps)
+        self.slippage_bps = float(slippage_bps)
+        self.impact_bps = float(impact_bps)
+        self.max_participation = None if max_participation is None else float(max_participation)
+
+        for name in FIELDS[:4]:
+            if getattr(self, name) < 0:
+                raise ValueError(f"{name} must not be negative")
+        if self.max_participation is not None and not 0 < self.max_participation <= 1:
+            raise ValueError("max_participation must be a fraction of bar volume in (0, 1]")
+
+    @classmethod
+    def from_request(cls, spec):
+        """Build from the 'costs' object of a request body; None or {} means no costs"""
+        if not spec:
+            return cls()
+        if not isinstance(spec, dict):
+            raise ValueError("'costs' must be an object")
+        unknown = set(spec) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown cost settings: {', '.join(sorted(unknown))}. Available: {', '.join(FIELDS)}")
+        return cls(**{name: value for name, value in spec.items() if value is not None})
+
+    @property
+    def free(self):
+        return self.fixed_rate == 0 and self.impact_bps == 0 and self.max_participation is None
+
+    @property
+    def uses_volume(self):
+        return self.impact_bps > 0 or self.max_participation is not None
+
+    @property
+    def fixed_rate(self):
+        """Cost per unit of traded notional that doesn't depend on the trade's size"""
+        return (self.commission_bps + self.spread_bps / 2 + self.slippage_bps) * BPS
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def participation(self, close, volume, turnover, equity):
+        """Share of each bar's volume a change of turnover (in units of equity) trades.
+
+        Bars without volume data (zero or NaN) report zero participation and
+        so are neither limited nor charged impact.
+        """
+        if volume is None:
+            raise ValueError("This cost model needs bar volume")
+        shares = turnover * equity / close
+        volume = np.asarray(volume, dtype=np.float64)
+        return np.divide(shares, volume, out=np.zeros(len(shares)), where=volume > 0)
+
+    def fill(self, close, position, volume, equity):
+        """The exposure actually held: each entry scaled down to fit max_participation of its bar's volume"""
+        position = np.asarray(position, dtype=np.float64)
+        if self.max_participation is None or len(position) == 0:
+            return position
+
+        change = np.abs(np.diff(position, prepend=0.0))
+        participation = self.participation(close, volume, change, equity)
+        fraction = np.ones(len(position))
+        over = participation > self.max_participation
+        fraction[over] = self.max_participation / participation[over]
+
+        # Every bar of a run takes the fill fraction of the bar the run started on
+        run_start = np.maximum.accumulate(np.where(change > 0, np.arange(len(position)), 0))
+        return position * fraction[run_start]
+
+    def rates(self, close, turnover, volume, equity):
+        """Cost of each bar's trading as a fraction of the notional traded on it"""
+        rate = np.full(len(turnover), self.fixed_rate)
+        if self.impact_bps > 0:
+            participation = self.participation(close, volume, turnover, equity)
+            rate += self.impact_bps * BPS * np.sqrt(participation)
+        return rate
@@ -0,0 +1,126 @@
+"""Delivering long result curves to clients.
+
+``downsample`` thins a result's per-bar series to a chart-sized number of
+points with Largest-Triangle-Three-Buckets, which keeps the peaks and troughs
+a plain stride would skip. ``ndjson_lines`` streams a result as
+newline-delimited JSON: a summary line with the scalar fields, then the
+per-bar series in aligned chunks, then the trades in chunks, so a client can
+start drawing before the last point has been encoded.
+"""
+import json
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import bars, metrics
+
+# Series metrics.rolling() adds alongside the equity curve
+ROLLING_FIELDS = ('drawdown_curve', 'drawdown_duration', 'rolling_drawdown', 'rolling_volatility', 'rolling_sharpe')
+# Fields holding one value per bar, downsampled and streamed together
+SERIES_FIELDS = ('portfolio_dates', 'equity_curve') + ROLLING_FIELDS
+# Fields holding a list of records, streamed in chunks of their own
+RECORD_FIELDS = ('trades',)
+CHUNK_POINTS = 5000
+MIN_POINTS = 3
+
+
+def lttb_indices(y, n_out, x=None):
+    """Indices of the n_out points of y that Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept. The points between are split
+    into n_out - 2 buckets, and each bucket keeps the point forming the
+    largest triangle with the point kept from the bucket before and the
+    average of the bucket after.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out < MIN_POINTS:
+        raise ValueError(f"Downsampling needs at least {MIN_POINTS} points")
+    if n_out >= n:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # Bucket b covers [edges[b], edges[b + 1]); at least one point each since n_out < n
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # The bucket after the last one is the final point
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = x[previous], y[previous]
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((ax - avg_x[b]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[b] - ay))
+        previous = lo + int(np.argmax(area))
+        kept[b + 1] = previous
+    return kept
+
+
+def with_rolling(data, window=metrics.DEFAULT_WINDOW):
+    """Copy of a result dict with the rolling metric series of its equity curve added.
+
+    Windows are in bars, and ratios are annualized by the bars per year of
+    the result's interval. Bars before a window fills are null.
+    """
+    if window < 2:
+        raise ValueError("rolling_window must be at least 2 bars")
+    curve = data.get('equity_curve')
+    if not isinstance(curve, list):
+        raise ValueError("Rolling metrics need the equity curve as a list; drop ?compact=1")
+    interval = data.get('interval', bars.DAILY)
+    dates = data.get('portfolio_dates')
+    periods_per_year = bars.periods_per_year(np.array(dates or [], dtype='datetime64[ns]'), interval)
+
+    extended = dict(data)
+    for name, values in metrics.rolling(np.array(curve, dtype=np.float64), window, periods_per_year).items():
+        extended[name] = [None if value != value else value for value in values.tolist()]
+    return extended
+
+
+def downsample(data, max_points):
+    """Copy of a result dict with its per-bar series cut to max_points by LTTB on the equity curve"""
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    curve = data.get('equity_curve')
+    if not isinstance(curve, list) or len(curve) <= max_points:
+        return data
+    kept = lttb_indices(curve, max_points).tolist()
+    thinned = dict(data)
+    for name in SERIES_FIELDS:
+        values = data.get(name)
+        # Stored results without dates have an empty list here
+        if isinstance(values, list) and len(values) == len(curve):
+            thinned[name] = [values[i] for i in kept]
+    thinned['downsampled_from'] = len(curve)
+    return thinned
+
+
+def ndjson_lines(data, chunk_points=CHUNK_POINTS):
+    """Yield a result dict as NDJSON lines: summary, series chunks, record chunks, end"""
+    series = {name: data[name] for name in SERIES_FIELDS if isinstance(data.get(name), list) and data[name]}
+    records = {name: data[name] for name in RECORD_FIELDS if isinstance(data.get(name), list)}
+    summary = {name: value for name, value in data.items() if name not in series and name not in records}
+    n_points = max((len(values) for values in series.values()), default=0)
+    summary['counts'] = {**{name: len(values) for name, values in series.items()},
+                         **{name: len(values) for name, values in records.items()}}
+
+    def line(payload):
+        return json.dumps(payload, cls=DjangoJSONEncoder) + '\n'
+
+    yield line({'type': 'summary', **summary})
+    for offset in range(0, n_points, chunk_points):
+        yield line({
+            'type': 'series',
+            'offset': offset,
+            **{name: values[offset:offset + chunk_points] for name, values in series.items()},
+        })
+    for name, values in records.items():
+        for offset in range(0, len(values), chunk_points):
+            yield line({'type': name, 'offset': offset, name: values[offset:offset + chunk_points]})
+    yield line({'type': 'end'})
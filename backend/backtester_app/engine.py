@@ -0,0 +1,218 @@
+"""Returns, metrics and trade extraction shared by the API views.
+
+Everything works on NumPy arrays and nothing in here touches the ORM, so the
+functions can run inside worker processes (see sweep.py).
+"""
+import logging
+
+import numpy as np
+
+from . import metrics
+from .strategies import IndicatorCache
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPITAL = 10000.0
+TRADING_DAYS = metrics.TRADING_DAYS
+
+
+def simulate(close, position, initial_capital=INITIAL_CAPITAL, charges=None):
+    """Per-bar strategy returns and portfolio value for a position series.
+
+    The position held at the close of bar t earns the return of bar t + 1.
+    ``charges`` are trading costs as a fraction of equity, taken at the close
+    of the bar they fall on (see apply_costs()).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+
+    held = np.zeros(len(close))
+    held[1:] = position[:-1]
+    strategy_returns = held * returns
+    if charges is not None:
+        strategy_returns = (1 + strategy_returns) * (1 - charges) - 1
+    portfolio_value = initial_capital * np.cumprod(1 + strategy_returns)
+    return strategy_returns, portfolio_value
+
+
+def apply_costs(close, position, costs, volume=None, initial_capital=INITIAL_CAPITAL):
+    """The exposure a position series gets under a CostModel, with its per-bar charges and cost rates.
+
+    Trades are sized from the portfolio value before costs. Charges are the
+    fraction of equity paid on each bar; rates are the cost per unit of
+    notional traded on each bar, which extract_trades() uses to net trades.
+    """
+    _, equity = simulate(close, position, initial_capital)
+    exposure = costs.fill(close, position, volume, equity)
+    turnover = np.abs(np.diff(exposure, prepend=0.0))
+    rate = costs.rates(close, turnover, volume, equity)
+    return exposure, turnover * rate, rate
+
+
+def performance_metrics(strategy_returns, portfolio_value, initial_capital=INITIAL_CAPITAL, periods_per_year=TRADING_DAYS):
+    """Total return, max drawdown and Sharpe ratio of a run, annualized over periods_per_year bars"""
+    if len(portfolio_value) == 0:
+        return {'total_return': 0.0, 'max_drawdown': 0.0, 'sharpe_ratio': 0.0}
+
+    return {
+        'total_return': float(portfolio_value[-1] / initial_capital - 1),
+        'max_drawdown': metrics.max_drawdown(portfolio_value),
+        'sharpe_ratio': metrics.sharpe_ratio(strategy_returns, periods_per_year),
+    }
+
+
+def path_metrics(returns, periods_per_year=TRADING_DAYS):
+    """performance_metrics() for every row of a (paths x bars) matrix of per-bar returns"""
+    returns = np.asarray(returns, dtype=np.float64)
+    n_bars = returns.shape[1]
+
+    # In-place passes keep this to two (paths x bars) temporaries
+    growth = np.add(returns, 1.0)
+    np.cumprod(growth, axis=1, out=growth)
+    total_return = growth[:, -1] - 1
+    drawdown = np.maximum.accumulate(growth, axis=1)
+    np.divide(growth, drawdown, out=drawdown)
+    max_drawdown = drawdown.min(axis=1) - 1
+
+    if n_bars > 1:
+        mean = returns.mean(axis=1)
+        np.subtract(returns, mean[:, None], out=growth)
+        std = np.sqrt(np.einsum('ij,ij->i', growth, growth) / (n_bars - 1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sharpe_ratio = np.sqrt(periods_per_year) * mean / std
+        sharpe_ratio = np.where((std > 0) & np.isfinite(sharpe_ratio), sharpe_ratio, 0.0)
+    else:
+        sharpe_ratio = np.zeros(len(returns))
+    return {'total_return': total_return, 'max_drawdown': max_drawdown, 'sharpe_ratio': sharpe_ratio}
+
+
+def run_strategy(close, strategy, params, arrays=None, initial_capital=INITIAL_CAPITAL, periods_per_year=TRADING_DAYS,
+                 costs=None, volume=None):
+    """Run one parameter set of a strategy over a close series.
+
+    ``arrays`` is an IndicatorCache for the same close series; pass a shared
+    one to reuse indicators across runs. ``costs`` is a costs.CostModel;
+    models with market impact or a participation cap also need the bar
+    ``volume``. Returns a dict with the bar offset where the run starts after
+    the warmup period, the position (the strategy's signal), the exposure
+    actually held after fill limits, the per-bar cost rates (None without
+    costs), strategy returns and portfolio value arrays from that offset, and
+    the metrics: total return, max drawdown and Sharpe ratio plus the ones
+    from metrics.summary().
+    """
+    close = np.asarray(close, dtype=np.float64)
+    strategy.check_data(len(close), params)
+    if arrays is None:
+        arrays = IndicatorCache(close)
+    arrays.require(strategy.indicator_keys(params))
+    position = strategy.signals(arrays, params)
+
+    # Skip the warmup period where indicators aren't valid
+    start = strategy.warmup(params)
+    if len(close) <= start:
+        logger.warning(f"Not enough data points ({len(close)}) for warmup period ({start})")
+        start = 0
+    if len(close) - start == 0:
+        raise ValueError("After applying warmup period, no data points remain for backtest")
+
+    position = position[start:]
+    close = close[start:]
+    exposure, charges, cost_rate = position, None, None
+    if costs is not None and not costs.free:
+        volume = None if volume is None else np.asarray(volume, dtype=np.float64)[start:]
+        exposure, charges, cost_rate = apply_costs(close, position, costs, volume, initial_capital)
+    strategy_returns, portfolio_value = simulate(close, exposure, initial_capital, charges)
+    return {
+        'start': start,
+        'position': position,
+        'exposure': exposure,
+        'cost_rate': cost_rate,
+        'strategy_returns': strategy_returns,
+        'portfolio_value': portfolio_value,
+        **performance_metrics(strategy_returns, portfolio_value, initial_capital, periods_per_year),
+        **metrics.summary(strategy_returns, portfolio_value, initial_capital, periods_per_year, exposure),
+    }
+
+
+def extract_trades(timestamps, close, position, initial_capital=10000.0, unit='D',
+                   equity=None, exposure=None, cost_rate=None):
+    """Build the trade ledger from a position series without a per-row loop.
+
+    A trade is a run of constant non-zero position. It is entered at the close
+    of the bar where the run starts and exited at the close of the bar where
+    the position next changes (flat or reversed), or on the last bar if it is
+    still open. Reversals exit and re-enter on the same bar. A position that
+    only appears on the very last bar is never closed, so it is not a trade.
+    Entry and exit times are ISO strings at ``unit`` resolution ('D' or 'm').
+
+    Pass a run's portfolio value as ``equity`` to size each trade from the
+    equity at its entry instead of from initial_capital, with its
+    ``exposure`` and ``cost_rate`` (see run_strategy()) to scale it to the
+    filled size and net the entry and exit costs out of its P&L.
+    """
+    position = np.asarray(position, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(position)
+    if n == 0:
+        return []
+
+    # Change points of position.diff(): the first bar counts as a change from "nothing"
+    changed = np.empty(n, dtype=bool)
+    changed[0] = True
+    np.not_equal(position[1:], position[:-1], out=changed[1:])
+    change_idx = np.flatnonzero(changed)
+
+    entries = change_idx[position[change_idx] != 0]
+    entries = entries[entries < n - 1]
+    if len(entries) == 0:
+        return []
+
+    # Each trade exits at the next change point after its entry, or at the last bar
+    next_change = np.searchsorted(change_idx, entries, side='right')
+    exits = np.full(len(entries), n - 1)
+    has_next = next_change < len(change_idx)
+    exits[has_next] = change_idx[next_change[has_next]]
+
+    side = position[entries]
+    entry_price = close[entries]
+    exit_price = close[exits]
+
+    percent_pnl = np.where(
+        side == 1,
+        (exit_price - entry_price) / entry_price * 100,
+        (entry_price - exit_price) / entry_price * 100,
+    )
+    # Position size is the equity at entry when given (compounding), else initial capital
+    notional = np.full(len(entries), initial_capital) if equity is None else np.asarray(equity, dtype=np.float64)[entries]
+    if exposure is not None:
+        notional = notional * np.abs(np.asarray(exposure, dtype=np.float64)[entries])
+    dollar_pnl = (exit_price - entry_price) * side * (notional / entry_price)
+
+    if cost_rate is not None:
+        # Entry and exit costs as a fraction of the entry notional; a trade still open on the last bar pays no exit
+        cost_rate = np.asarray(cost_rate, dtype=np.float64)
+        exit_rate = np.where(has_next, cost_rate[exits], 0.0)
+        cost = cost_rate[entries] + exit_rate * exit_price / entry_price
+        percent_pnl = percent_pnl - cost * 100
+        dollar_pnl = dollar_pnl - notional * cost
+
+    dates = np.asarray(timestamps, dtype='datetime64[ns]')
+    entry_dates = np.datetime_as_string(dates[entries], unit=unit).tolist()
+    exit_dates = np.datetime_as_string(dates[exits], unit=unit).tolist()
+
+    return [
+        {
+            'entry_date': entry_date,
+            'exit_date': exit_date,
+            'entry_price': entry,
+            'exit_price': exit,
+            'position': int(pos),
+            'percent_pnl': pct,
+            'dollar_pnl': dollars,
+        }
+        for entry_date, exit_date, entry, exit, pos, pct, dollars in zip(
+            entry_dates, exit_dates, entry_price.tolist(), exit_price.tolist(),
+            side.tolist(), percent_pnl.tolist(), dollar_pnl.tolist(),
+        )
+    ]
@@ -0,0 +1,305 @@
+"""Indicator arrays kept between requests, in memory and on disk.
+
+Each entry holds one IndicatorCache key, e.g. ``('rsi', 14)``, for one
+loaded series: symbol, interval, the stored data's content hash (see
+``price_store.data_version``) and the first and last timestamp and length of
+the slice. Requests over the same bars (another RSI threshold, a different
+strategy reading SMA 50) reuse the arrays instead of recomputing them.
+
+Windowed indicators (``strategies.WINDOWED``: SMA, RSI, Bollinger bands) are
+instead keyed by the whole stored series when the caller says how to load
+it. They are computed once over the whole history, next to its timestamps
+and closes, and every date range is sliced out of that; the leading bars
+that depend on where the slice starts are recomputed from the slice's own
+closes, so the result matches computing over the slice (to rounding). EMAs
+depend on where the series starts, so MACD stays keyed by the slice.
+
+Entries live in ``settings.INDICATOR_CACHE_DIR/<SYMBOL>/`` as ``.npy``
+files, with a process-wide LRU tier of ``settings.INDICATOR_CACHE_MEMORY_MB``
+in front. Past ``settings.INDICATOR_CACHE_DISK_MB`` the least recently used
+files are deleted. New data changes the content hash, so stale entries are
+never read. Ingest also deletes a symbol's entries when it stores new bars,
+and then prewarms the ``settings.INDICATOR_PREWARM`` keys over the symbol's
+whole history on a background thread.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from . import concurrency, price_store, strategies
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# (symbol, series digest, key) -> arrays, least recently used first
+_memory = OrderedDict()
+_memory_bytes = 0
+# This process's tally of the files under INDICATOR_CACHE_DIR, None until it is scanned
+_disk_bytes = None
+
+# Entries of a whole stored series holding its bars, next to its windowed indicators
+TIMESTAMP = ('timestamp',)
+CLOSE = ('close',)
+
+
+def _nbytes(values):
+    return sum(row.nbytes for row in values) if isinstance(values, tuple) else values.nbytes
+
+
+def _remember(entry, values):
+    global _memory_bytes
+    limit = settings.INDICATOR_CACHE_MEMORY_MB * 2**20
+    with _lock:
+        if entry in _memory:
+            _memory.move_to_end(entry)
+            return
+        _memory[entry] = values
+        _memory_bytes += _nbytes(values)
+        while _memory_bytes > limit and _memory:
+            _, evicted = _memory.popitem(last=False)
+            _memory_bytes -= _nbytes(evicted)
+
+
+def _recall(entry):
+    with _lock:
+        values = _memory.get(entry)
+        if values is not None:
+            _memory.move_to_end(entry)
+        return values
+
+
+def _read_only(values):
+    for row in values if isinstance(values, tuple) else (values,):
+        row.flags.writeable = False
+    return values
+
+
+def _disk_files():
+    """(mtime, size, path) of every stored file"""
+    files = []
+    for root, _, names in os.walk(settings.INDICATOR_CACHE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    return files
+
+
+def _account(nbytes):
+    """Count a written file, deleting the least recently used files once the disk tier is over its limit"""
+    global _disk_bytes
+    limit = settings.INDICATOR_CACHE_DISK_MB * 2**20
+    with _lock:
+        if _disk_bytes is None:
+            # The scan already includes the new file
+            _disk_bytes = sum(size for _, size, _ in _disk_files())
+        else:
+            _disk_bytes += nbytes
+        if _disk_bytes <= limit:
+            return
+        # Other processes write here too, so evict from a fresh listing
+        files = sorted(_disk_files())
+        _disk_bytes = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in files:
+            if _disk_bytes <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            _disk_bytes -= size
+            evicted += 1
+    logger.info(f"Evicted {evicted} indicator files to stay under {settings.INDICATOR_CACHE_DISK_MB} MB")
+
+
+def _digest(*parts):
+    return hashlib.blake2b(json.dumps(parts).encode(), digest_size=12).hexdigest()
+
+
+class SeriesIndicators:
+    """The stored indicators of one loaded price series, for IndicatorCache(store=...).
+
+    ``history`` is a callable loading the whole stored series the slice was
+    loaded from (the same symbol, interval and data version); without it
+    every indicator is keyed by the slice.
+    """
+
+    def __init__(self, symbol, interval, data_version, timestamps, history=None):
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+        self.symbol = price_store.normalize_symbol(symbol)
+        self.digest = _digest(self.symbol, interval, data_version, str(timestamps[0]), str(timestamps[-1]), len(timestamps))
+        self.history = history
+        self.history_digest = _digest(self.symbol, interval, data_version)
+        self.first = timestamps[0].astype(np.int64)
+        self.last = timestamps[-1].astype(np.int64)
+        self.length = len(timestamps)
+        # Whole-series indicators computed here rather than found in the store
+        self.computed = 0
+
+    def path(self, key, digest=None):
+        name = hashlib.blake2b(json.dumps(list(key)).encode(), digest_size=8).hexdigest()
+        return os.path.join(symbol_dir(self.symbol), f'{digest or self.digest}-{name}.npy')
+
+    def _read(self, digest, key):
+        values = _recall((self.symbol, digest, key))
+        if values is not None:
+            return values
+        path = self.path(key, digest)
+        try:
+            stored = np.load(path)
+            # Reads count as use for the disk tier's eviction
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Indicators with several lines (bands, MACD) are stored one per row
+        values = _read_only(tuple(stored) if stored.ndim == 2 else stored)
+        _remember((self.symbol, digest, key), values)
+        return values
+
+    def _write(self, digest, key, values):
+        values = _read_only(tuple(np.asarray(row) for row in values) if isinstance(values, tuple) else np.asarray(values))
+        _remember((self.symbol, digest, key), values)
+        path = self.path(key, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent reader never sees half a file
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.vstack(values) if isinstance(values, tuple) else values)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Could not store indicator {key} for {self.symbol}: {e}")
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        _account(_nbytes(values))
+
+    def _whole(self, key):
+        """A windowed key over the whole stored series, with its timestamps and closes, or None"""
+        parts = [self._read(self.history_digest, part) for part in (TIMESTAMP, CLOSE, key)]
+        if all(part is not None for part in parts):
+            return parts
+        prices = self.history()
+        if prices is None or len(prices) == 0:
+            return None
+        close = np.asarray(prices.close, dtype=np.float64)
+        timestamps = np.asarray(prices.timestamp, dtype='datetime64[ns]').astype(np.int64)
+        values = strategies.KERNELS[key[0]](close, [key[1:]])[0]
+        self.computed += 1
+        for part, array in ((TIMESTAMP, timestamps), (CLOSE, close), (key, values)):
+            self._write(self.history_digest, part, array)
+        return timestamps, close, values
+
+    def _windowed(self, key):
+        """A windowed key over this slice, cut from the whole series, or None"""
+        whole = self._whole(key)
+        if whole is None:
+            return None
+        timestamps, close, values = whole
+        start = int(np.searchsorted(timestamps, self.first))
+        end = start + self.length
+        if end > len(timestamps) or timestamps[start] != self.first or timestamps[end - 1] != self.last:
+            logger.warning(f"Loaded {self.symbol} bars are not a slice of its stored series; computing {key} over them")
+            return None
+
+        # The leading bars depend on where the slice starts
+        lead = min(strategies.WINDOWED[key[0]](*key[1:]), self.length)
+        head = strategies.KERNELS[key[0]](close[start:start + lead], [key[1:]])[0]
+        rows = []
+        for row, head_row in zip(values, head) if isinstance(values, tuple) else ((values, head),):
+            row = row[start:end].copy()
+            row[:lead] = head_row
+            rows.append(row)
+        return _read_only(tuple(rows) if isinstance(values, tuple) else rows[0])
+
+    def get(self, key):
+        """The arrays for an IndicatorCache key, or None"""
+        values = _recall((self.symbol, self.digest, key))
+        if values is not None:
+            return values
+        if self.history is not None and key[0] in strategies.WINDOWED:
+            values = self._windowed(key)
+            if values is not None:
+                # Only in memory: on disk the whole series serves every slice
+                _remember((self.symbol, self.digest, key), values)
+            return values
+        return self._read(self.digest, key)
+
+    def put(self, key, values):
+        if self.history is not None and key[0] in strategies.WINDOWED:
+            # get() found no whole series to cut it from; don't store one file per date range
+            return
+        self._write(self.digest, key, values)
+
+
+def symbol_dir(symbol):
+    return os.path.join(settings.INDICATOR_CACHE_DIR, price_store.normalize_symbol(symbol))
+
+
+def for_series(symbol, interval, data_version, timestamps, history=None):
+    """SeriesIndicators for a loaded series, or None when it can't be versioned"""
+    if not data_version or len(timestamps) == 0:
+        return None
+    return SeriesIndicators(symbol, interval, data_version, timestamps, history)
+
+
+def invalidate(symbol):
+    """Drop every stored indicator of a symbol"""
+    global _memory_bytes, _disk_bytes
+    symbol = price_store.normalize_symbol(symbol)
+    shutil.rmtree(symbol_dir(symbol), ignore_errors=True)
+    with _lock:
+        for entry in [entry for entry in _memory if entry[0] == symbol]:
+            _memory_bytes -= _nbytes(_memory.pop(entry))
+        _disk_bytes = None
+
+
+def clear():
+    """Drop every stored indicator of every symbol"""
+    global _memory_bytes, _disk_bytes
+    shutil.rmtree(settings.INDICATOR_CACHE_DIR, ignore_errors=True)
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+        _disk_bytes = None
+
+
+def prewarm(symbol, interval=price_store.DAILY, keys=None):
+    """Compute the common indicators over a symbol's whole stored history; returns how many were computed"""
+    keys = settings.INDICATOR_PREWARM if keys is None else keys
+    if not keys:
+        return 0
+    prices = price_store.load_series(symbol, interval=interval)
+    if prices is None:
+        return 0
+    store = for_series(symbol, interval, price_store.data_version(symbol, interval), prices.timestamp, lambda: prices)
+    if store is None:
+        return 0
+    arrays = strategies.IndicatorCache(prices.close, store=store)
+    arrays.require([tuple(key) for key in keys])
+    return arrays.computed + store.computed
+
+
+def prewarm_later(symbols, interval=price_store.DAILY):
+    """Prewarm symbols on the compute pool instead of the calling request's thread"""
+    keys = [tuple(key) for key in settings.INDICATOR_PREWARM]
+    if not keys or not symbols:
+        return None
+    return concurrency.run_background('compute', _prewarm_all, list(symbols), interval, keys)
+
+
+def _prewarm_all(symbols, interval, keys):
+    for symbol in symbols:
+        prewarm(symbol, interval, keys)
@@ -0,0 +1,241 @@
+"""Batched indicator kernels.
+
+Each kernel takes a 1-D price array and a list of windows (or spans) and
+returns a 2-D float64 array of shape (n_windows, n_bars), computing the whole
+family from one cumulative-sum pass instead of one rolling() call per window.
+Positions before a window is full are NaN, matching pandas' rolling().
+
+The kernels also take a matrix of series, such as a portfolio's (bars x
+assets) closes, with the bars along ``axis`` (0 by default); the result then
+has shape (n_windows, *values.shape) and every series is computed in the same
+pass.
+
+Inputs are assumed to be free of NaNs, which holds for stored close prices.
+"""
+import numpy as np
+
+# Largest exponent we let d ** -k reach inside an EMA block before rescaling
+_EMA_MAX_EXPONENT = 600.0
+_EMA_MAX_BLOCK = 512
+
+
+def _as_windows(windows):
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    if windows.ndim != 1 or np.any(windows < 1):
+        raise ValueError("Windows must be positive integers")
+    return windows
+
+
+def _bars_last(values, axis):
+    """values as float64 with its bar axis moved last, and a function moving it back in a (n_windows, ...) result"""
+    values = np.asarray(values, dtype=np.float64)
+    position = 1 + axis % values.ndim
+    return np.moveaxis(values, axis, -1), lambda result: np.moveaxis(result, -1, position)
+
+
+def _window_moments(values, windows, squares=False):
+    """Trailing window sums (and sums of squares) for every window, over the last axis of values.
+
+    A single cumulative sum over a long trending series loses precision when
+    two large prefix values are subtracted, so the series is cut into
+    segments at least as long as the largest window, each with its own
+    center and its own cumulative sums. A window then spans at most two
+    segments, and the part in the previous segment is re-centered exactly.
+    Sums are relative to ``centers[t]``, the center of the segment holding the
+    window's last bar. Rows are NaN where the window isn't full.
+    """
+    n = values.shape[-1]
+    # Long segments keep the share of windows that straddle two of them small
+    length = max(512, 4 * int(windows.max()))
+    n_segments = -(-n // length)
+
+    segment = np.arange(n) // length
+    segment_start = segment * length
+    centers = values[..., segment_start]
+    deviation = values - centers
+
+    def running(x):
+        padded = np.zeros(x.shape[:-1] + (n_segments * length,))
+        padded[..., :n] = x
+        inclusive = np.cumsum(padded.reshape(x.shape[:-1] + (n_segments, length)), axis=-1).reshape(padded.shape)[..., :n]
+        return inclusive, inclusive - x
+
+    sum_incl, sum_excl = running(deviation)
+    if squares:
+        sq_incl, sq_excl = running(deviation * deviation)
+
+    sums = np.full((len(windows),) + values.shape, np.nan)
+    sq_sums = np.full((len(windows),) + values.shape, np.nan) if squares else None
+    for row, w in enumerate(windows):
+        if w > n:
+            continue
+        # Windows that fit inside one segment are a plain difference of running sums
+        sums[row, ..., w - 1:] = sum_incl[..., w - 1:] - sum_excl[..., :n - w + 1]
+        if squares:
+            sq_sums[row, ..., w - 1:] = sq_incl[..., w - 1:] - sq_excl[..., :n - w + 1]
+
+        # Windows ending in the first w - 1 bars of a segment reach into the previous one
+        t = (np.arange(length, n, length)[:, None] + np.arange(w - 1)[None, :]).ravel()
+        t = t[t < n]
+        if len(t) == 0:
+            continue
+        first = t - w + 1
+        last_prev = segment_start[t] - 1
+        count = (last_prev - first + 1).astype(np.float64)
+        delta = centers[..., first] - centers[..., t]
+
+        # Re-center the previous segment's part onto this segment's center
+        p1 = sum_incl[..., last_prev] - sum_excl[..., first]
+        sums[row][..., t] = sum_incl[..., t] + p1 + count * delta
+        if squares:
+            p2 = sq_incl[..., last_prev] - sq_excl[..., first]
+            sq_sums[row][..., t] = sq_incl[..., t] + p2 + 2 * delta * p1 + count * delta * delta
+    return sums, sq_sums, centers
+
+
+def rolling_mean(values, windows, axis=0):
+    """Simple moving averages for every window from one set of cumulative sums"""
+    values, restore = _bars_last(values, axis)
+    windows = _as_windows(windows)
+    if values.shape[-1] == 0:
+        return restore(np.empty((len(windows),) + values.shape))
+
+    sums, _, centers = _window_moments(values, windows)
+    return restore(sums / windows.reshape((-1,) + (1,) * values.ndim) + centers)
+
+
+def rolling_std(values, windows, ddof=1, axis=0):
+    """Rolling standard deviations from cumulative sums and sums of squares"""
+    values, restore = _bars_last(values, axis)
+    windows = _as_windows(windows)
+    if values.shape[-1] == 0:
+        return restore(np.empty((len(windows),) + values.shape))
+
+    sums, squares, _ = _window_moments(values, windows, squares=True)
+    counts = windows.reshape((-1,) + (1,) * values.ndim).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (squares - sums * sums / counts) / (counts - ddof)
+    variance[(counts <= ddof).ravel()] = np.nan
+    # Cancellation can leave tiny negatives where the true variance is zero
+    np.maximum(variance, 0.0, out=variance, where=~np.isnan(variance))
+    return restore(np.sqrt(variance))
+
+
+def bollinger(values, windows, num_std_dev=2.0, axis=0):
+    """Middle, upper and lower Bollinger bands for every window, each (n_windows, n)"""
+    middle = rolling_mean(values, windows, axis)
+    width = rolling_std(values, windows, axis=axis) * num_std_dev
+    return middle, middle + width, middle - width
+
+
+def rsi(close, periods, axis=0):
+    """RSI from simple rolling averages of gains and losses (as BacktestView computes it)"""
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.diff(close, axis=axis, prepend=np.take(close, [0], axis=axis)) if close.shape[axis] else close
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+
+    avg_gain = rolling_mean(gains, periods, axis)
+    avg_loss = rolling_mean(losses, periods, axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def ema(values, spans, adjust=True):
+    """Exponential moving averages for many spans at once, matching pandas ewm(span).mean().
+
+    ``values`` is either one 1-D series shared by every span or a 2-D array
+    with one row per span. The recursion y[t] = u[t] + d * y[t - 1] is solved
+    in blocks: inside a block it is a scaled cumulative sum, so the Python
+    loop runs once per block rather than once per bar.
+    """
+    spans = np.atleast_1d(np.asarray(spans, dtype=np.float64))
+    if np.any(spans < 1):
+        raise ValueError("Spans must be >= 1")
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[None, :]
+    n = values.shape[1]
+    out = np.empty((len(spans), n))
+    if n == 0:
+        return out
+
+    alpha = (2.0 / (spans + 1.0))[:, None]
+    decay = 1.0 - alpha
+
+    if adjust:
+        # Weighted sum over the sum of weights, where the weights sum to (1 - d ** (t + 1)) / alpha
+        numerator = _linear_recursion(values, decay, len(spans))
+        # d ** (t + 1) underflows below machine precision quickly, after which the sum is 1 / alpha
+        with np.errstate(divide='ignore'):
+            slowest = float(np.min(-np.log(np.where(decay > 0, decay, 1e-300))))
+        settled = n if slowest == 0 else min(n, int(40.0 / slowest) + 1)
+        weights = np.broadcast_to(1.0 / alpha, (len(spans), n)).copy()
+        weights[:, :settled] = (1.0 - decay ** np.arange(1, settled + 1, dtype=np.float64)) / alpha
+        out[:] = numerator / weights
+        # The first average is the first value; the blocked sum can be a few ulps off it
+        out[:, 0] = np.broadcast_to(values[:, :1], (len(spans), 1))[:, 0]
+    else:
+        # y[0] = x[0], then y[t] = alpha * x[t] + d * y[t - 1]
+        inputs = np.broadcast_to(values, (len(spans), n)) * alpha
+        inputs[:, 0] = np.broadcast_to(values[:, :1], (len(spans), 1))[:, 0]
+        out[:] = _linear_recursion(inputs, decay, len(spans))
+    return out
+
+
+def _linear_recursion(inputs, decay, rows):
+    """Solve y[t] = inputs[t] + decay * y[t - 1] (y[-1] = 0) row-wise, block by block"""
+    n = inputs.shape[1]
+    out = np.empty((rows, n))
+
+    # d ** -k must stay finite inside a block, so fast-decaying spans get shorter blocks
+    with np.errstate(divide='ignore'):
+        steepest = float(np.max(-np.log(np.where(decay > 0, decay, 1.0))))
+    block = int(min(_EMA_MAX_BLOCK, max(1, _EMA_MAX_EXPONENT // steepest))) if steepest > 0 else _EMA_MAX_BLOCK
+
+    k = np.arange(block, dtype=np.float64)
+    safe_decay = np.where(decay > 0, decay, 1.0)
+    growth = safe_decay ** k          # d ** k
+    shrink = safe_decay ** -k         # d ** -k
+    zero_decay = (decay == 0).ravel()
+
+    previous = np.zeros((rows, 1))
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        width = stop - start
+        chunk = inputs[:, start:stop]
+        partial = np.cumsum(chunk * shrink[:, :width], axis=1)
+        result = growth[:, :width] * (partial + safe_decay * previous)
+        if zero_decay.any():
+            # alpha == 1 (span 1): no memory at all
+            result[zero_decay] = np.broadcast_to(chunk, (rows, width))[zero_decay]
+        out[:, start:stop] = result
+        previous = result[:, -1:]
+    return out
+
+
+def macd(close, fast_periods, slow_periods, signal_periods, axis=0):
+    """MACD and signal lines for parallel lists of (fast, slow, signal) spans.
+
+    Every distinct fast/slow span is smoothed once in a single ema() call, and
+    the signal lines for all combinations are computed in a second call; with
+    several series, each call takes one row per (span, series).
+    Returns ``(macd_lines, signal_lines)``, each (n_combinations, n).
+    """
+    fast = np.atleast_1d(np.asarray(fast_periods))
+    slow = np.atleast_1d(np.asarray(slow_periods))
+    signal = np.atleast_1d(np.asarray(signal_periods))
+    if not (len(fast) == len(slow) == len(signal)):
+        raise ValueError("fast, slow and signal periods must have the same length")
+
+    close, restore = _bars_last(close, axis)
+    n = close.shape[-1]
+    series = close.reshape(int(np.prod(close.shape[:-1])), n)
+
+    spans, inverse = np.unique(np.concatenate([fast, slow]), return_inverse=True)
+    rows = np.broadcast_to(series, (len(spans),) + series.shape).reshape(len(spans) * len(series), n)
+    emas = ema(rows, np.repeat(spans, len(series))).reshape((len(spans),) + series.shape)
+    macd_lines = emas[inverse[:len(fast)]] - emas[inverse[len(fast):]]
+    signal_lines = ema(macd_lines.reshape(len(fast) * len(series), n), np.repeat(signal, len(series))).reshape(macd_lines.shape)
+    return tuple(restore(lines.reshape((len(fast),) + close.shape)) for lines in (macd_lines, signal_lines))
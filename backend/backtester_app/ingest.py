@@ -0,0 +1,228 @@
+"""Download price history and persist it to the columnar store and PriceData table.
+
+Intraday bars only go to the columnar store; the PriceData table keeps daily bars.
+"""
+import functools
+import logging
+from datetime import datetime, timedelta
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import bars, concurrency, indicator_store, monitors, price_store, providers
+from .price_store import DAILY
+from .models import PriceData, PriceSeries
+
+logger = logging.getLogger(__name__)
+
+HISTORY_START = "2015-01-01"  # Get data from 2015 onwards
+# Days of history first fetched for an intraday interval: as far back as Yahoo serves it
+INTRADAY_HISTORY_DAYS = {'1m': 7, '5m': 59, '15m': 59, '30m': 59, '1h': 729}
+
+# Rows per executemany() call when bulk loading PriceData
+INSERT_BATCH_SIZE = 2000
+
+
+def _utc_datetimes(timestamps):
+    return pd.DatetimeIndex(timestamps).tz_localize('UTC').to_pydatetime()
+
+
+def _label(timestamp, interval):
+    """A stored or catalog timestamp as shown in refresh results"""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return str(bars.format_timestamps([timestamp.to_datetime64()], interval)[0])
+
+
+def _insert_prices(series):
+    """Insert PriceData rows for several PriceArrays.
+
+    Rows are built column-wise as plain tuples and written with executemany,
+    INSERT_BATCH_SIZE rows per call, which avoids a model instance per bar
+    and SQLite's per-statement variable limit that caps bulk_create batches.
+    """
+    quote = connection.ops.quote_name
+    columns = ('symbol', 'timestamp') + price_store.PRICE_COLUMNS
+    sql = (
+        f"INSERT INTO {quote(PriceData._meta.db_table)} ({', '.join(quote(c) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+
+    count = 0
+    with connection.cursor() as cursor:
+        for prices in series:
+            rows = list(zip(
+                repeat(prices.symbol),
+                [adapt(ts) for ts in _utc_datetimes(prices.timestamp)],
+                *(np.asarray(getattr(prices, column), dtype=np.float64).tolist() for column in price_store.PRICE_COLUMNS),
+            ))
+            for i in range(0, len(rows), INSERT_BATCH_SIZE):
+                cursor.executemany(sql, rows[i:i + INSERT_BATCH_SIZE])
+            count += len(rows)
+    return count
+
+
+def store_prices(prices):
+    """Replace the stored history of one symbol, leaving other symbols untouched"""
+    with transaction.atomic():
+        PriceData.objects.filter(symbol=prices.symbol).delete()
+        count = _insert_prices([prices])
+        price_store.write_series(prices)
+
+    logger.info(f"Successfully stored {count} data points for {prices.symbol}")
+    return count
+
+
+def refresh_many(symbols, full=False, provider=None, interval=DAILY):
+    """Bring several symbols' stored histories at one interval up to date in grouped downloads.
+
+    Symbols that have been stored before only download the tail starting at
+    their last stored bar (which is re-fetched in case it was revised); the
+    rest download their full history. Symbols are grouped by the date their
+    download starts at, so a universe that was refreshed together is one
+    provider call per batch rather than one per symbol. Every table change is
+    written inside one transaction with chunked bulk inserts.
+
+    Returns ``(results, missing)``: a dict per updated symbol describing what
+    changed, and the never-stored symbols nothing could be downloaded for.
+    """
+    symbols = list(dict.fromkeys(price_store.normalize_symbol(s) for s in symbols))
+    interval = price_store.normalize_interval(interval)
+    daily = interval == DAILY
+    provider = provider or providers.get_provider()
+    today = datetime.now().date()
+    history_start = HISTORY_START if daily else (today - timedelta(days=INTRADAY_HISTORY_DAYS[interval])).strftime('%Y-%m-%d')
+    catalogs = {
+        catalog.symbol: catalog for catalog in PriceSeries.objects.filter(symbol__in=symbols, interval=interval)
+    }
+
+    results = {}
+    groups = {}
+    for symbol in symbols:
+        catalog = catalogs.get(symbol)
+        if full or catalog is None or catalog.last_timestamp is None or not price_store.has_series(symbol, interval):
+            groups.setdefault(history_start, []).append(symbol)
+            continue
+
+        last_date = catalog.last_timestamp.date()
+        results[symbol] = {
+            'symbol': symbol,
+            'interval': interval,
+            'mode': 'incremental',
+            'added': 0,
+            'replaced': 0,
+            'first_new': None,
+            'last_timestamp': _label(catalog.last_timestamp, interval),
+            'count': catalog.bar_count,
+        }
+        # Providers treat `end` as exclusive, so today's partial bar is never requested
+        if last_date + timedelta(days=1) >= today:
+            results[symbol]['mode'] = 'up_to_date'
+        else:
+            groups.setdefault(last_date.strftime('%Y-%m-%d'), []).append(symbol)
+
+    downloads = {}
+    for start, group in groups.items():
+        logger.info(f"Fetching {len(group)} symbols from {start} ({provider.name})")
+        with concurrency.download_slot():
+            downloads.update(provider.download_many(group, start, today.strftime('%Y-%m-%d'), interval))
+
+    fetched_full = [symbol for symbol in downloads if symbol not in results]
+    missing = [symbol for symbol in groups.get(history_start, []) if symbol not in downloads and symbol not in results]
+    # Stored symbols with nothing new yet (weekend or holiday)
+    unchanged = [
+        symbol for symbol, result in results.items()
+        if result['mode'] == 'incremental' and symbol not in downloads
+    ]
+
+    with transaction.atomic():
+        if fetched_full and daily:
+            PriceData.objects.filter(symbol__in=fetched_full).delete()
+        for symbol, prices in downloads.items():
+            if symbol not in results:
+                price_store.write_series(prices, interval)
+                results[symbol] = {
+                    'symbol': symbol,
+                    'interval': interval,
+                    'mode': 'full',
+                    'added': len(prices),
+                    'replaced': 0,
+                    'first_new': _label(prices.timestamp[0], interval),
+                    'last_timestamp': _label(prices.timestamp[-1], interval),
+                    'count': len(prices),
+                }
+                continue
+
+            if daily:
+                PriceData.objects.filter(symbol=symbol, timestamp__gte=_utc_datetimes(prices.timestamp[:1])[0]).delete()
+            catalog, added, replaced = price_store.append_series(prices, interval)
+            results[symbol].update({
+                'added': added,
+                'replaced': replaced,
+                'first_new': _label(prices.timestamp[len(prices) - added], interval) if added else None,
+                'last_timestamp': _label(catalog.last_timestamp, interval),
+                'count': catalog.bar_count,
+            })
+        rows = _insert_prices(downloads.values()) if daily else sum(len(prices) for prices in downloads.values())
+
+        # Record the check so read paths don't retry today
+        for symbol in unchanged:
+            results[symbol]['mode'] = 'up_to_date'
+        PriceSeries.objects.filter(symbol__in=unchanged, interval=interval).update(updated_at=timezone.now())
+
+    logger.info(f"Refreshed {len(results)} symbols ({rows} rows written), {len(missing)} without data")
+
+    updated = [symbol for symbol in downloads if symbol in results]
+    # Runs after the store has published the new bars, which also waits for the commit
+    transaction.on_commit(functools.partial(_after_refresh, updated, interval))
+    return [results[symbol] for symbol in symbols if symbol in results], missing
+
+
+def _after_refresh(symbols, interval):
+    # Indicators of the old bars can't be read again; compute the common ones over the new history off the request
+    for symbol in symbols:
+        indicator_store.invalidate(symbol)
+    indicator_store.prewarm_later(symbols, interval)
+    # Carry saved strategies forward over the new bars
+    monitors.advance_symbols(symbols)
+
+
+def refresh_symbol(symbol, full=False, provider=None, interval=DAILY):
+    """Bring one symbol's stored history up to date.
+
+    Returns a dict describing what changed (see refresh_many), or None if
+    nothing could be downloaded for a symbol that has never been stored.
+    Concurrent calls for the same symbol and interval share one refresh.
+    """
+    symbol = price_store.normalize_symbol(symbol)
+    interval = price_store.normalize_interval(interval)
+    provider = provider or providers.get_provider()
+    key = (provider.name, symbol, interval, bool(full))
+    return concurrency.DOWNLOADS.do(key, _refresh_one, symbol, full, provider, interval)
+
+
+def _refresh_one(symbol, full, provider, interval):
+    results, _ = refresh_many([symbol], full=full, provider=provider, interval=interval)
+    return results[0] if results else None
+
+
+def ensure_covered(symbol, end_date):
+    """Make sure a symbol is stored and, if stale, refreshed up to ``end_date``.
+
+    Used by read paths such as the benchmark so they only touch the network
+    when the stored history stops short of the requested range.
+    """
+    symbol = price_store.normalize_symbol(symbol)
+    catalog = PriceSeries.objects.filter(symbol=symbol, interval=DAILY).first()
+    if catalog is None or not price_store.has_series(symbol):
+        return refresh_symbol(symbol)
+
+    stale = catalog.last_timestamp is None or catalog.last_timestamp.date() < pd.Timestamp(end_date).date()
+    if stale and catalog.updated_at.date() < datetime.now().date():
+        return refresh_symbol(symbol)
+    return None
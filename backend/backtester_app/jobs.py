@@ -0,0 +1,163 @@
+"""Database-backed job queue for long-running API requests.
+
+A job stores the request body of one of the API views. ``enqueue`` records
+it and returns at once; the ``run_jobs`` management command claims queued
+jobs and runs the same view code a synchronous request would, storing the
+response body (or error) on the job. Jobs are claimed with a conditional
+UPDATE, so several workers can share one queue without an external broker.
+While a job runs, views that take long (sweeps, portfolios) report progress
+through ``JobRequest.report_progress``, which updates the job's message.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> name of the view in views.py whose post() runs it
+JOB_VIEWS = {
+    'fetch': 'DataFetchView',
+    'fetch_batch': 'BatchFetchView',
+    'benchmark': 'BenchmarkView',
+    'backtest': 'BacktestView',
+    'sweep': 'SweepView',
+    'walk_forward': 'WalkForwardView',
+    'monte_carlo': 'MonteCarloView',
+    'portfolio': 'PortfolioView',
+}
+
+# Least seconds between two progress writes of one job
+JOB_PROGRESS_INTERVAL = 1.0
+
+
+class JobRequest:
+    """The parts of a DRF request the views read: the parsed body and query string"""
+
+    def __init__(self, data, job=None):
+        self.data = data
+        self.query_params = {}
+        self.job = job
+        self._reported = None
+
+    def report_progress(self, message):
+        """Show message as the job's status, at most once per JOB_PROGRESS_INTERVAL"""
+        if self.job is None:
+            return
+        now = time.monotonic()
+        if self._reported is not None and now - self._reported < JOB_PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        record_progress(self.job, message)
+
+
+def record_progress(job, message):
+    """Set a running job's message; a job that has been requeued or finished is left alone"""
+    job.message = message[:200]
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(message=job.message)
+
+
+def enqueue(kind, data):
+    if kind not in JOB_VIEWS:
+        raise ValueError(f"Unknown job kind: {kind}. Available: {', '.join(JOB_VIEWS)}")
+    if not isinstance(data, dict):
+        raise ValueError("Job data must be an object")
+    job = Job.objects.create(kind=kind, payload=dict(data), message='Waiting for a worker')
+    logger.info(f"Queued {kind} job {job.pk}")
+    return job
+
+
+def describe(job):
+    """API representation of a job"""
+    state = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'message': job.message,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+    if job.status == Job.SUCCEEDED:
+        state['result'] = job.result
+    elif job.status == Job.FAILED:
+        state['error'] = job.error
+    return state
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next(worker):
+    """Mark the oldest queued job as running for this worker and return it, or None"""
+    for pk in Job.objects.filter(status=Job.QUEUED).values_list('pk', flat=True)[:10]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=timezone.now(), message='Running'
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Run a claimed job through its view and record the outcome"""
+    from . import views
+
+    view = getattr(views, JOB_VIEWS[job.kind])()
+    started = time.perf_counter()
+    try:
+        response = view.post(JobRequest(job.payload, job))
+        data = response.data
+        failed = response.status_code >= 400
+    except Exception as e:
+        logger.exception(f"Job {job.pk} crashed")
+        data = {'error': str(e)}
+        failed = True
+
+    elapsed = time.perf_counter() - started
+    if failed:
+        job.status = Job.FAILED
+        job.error = str(data.get('error', data)) if isinstance(data, dict) else str(data)
+        job.message = f'Failed after {elapsed:.2f}s'
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = data
+        job.message = f'Finished in {elapsed:.2f}s'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'message', 'finished_at'])
+    logger.info(f"{job.kind} job {job.pk} {job.status} in {elapsed:.2f}s")
+    return job
+
+
+def requeue_stale(max_runtime):
+    """Put jobs back in the queue whose worker has held them longer than max_runtime seconds"""
+    cutoff = timezone.now() - timedelta(seconds=max_runtime)
+    count = Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff).update(
+        status=Job.QUEUED, worker='', started_at=None, message='Requeued after the worker stopped responding'
+    )
+    if count:
+        logger.warning(f"Requeued {count} stale jobs")
+    return count
+
+
+def run_worker(poll_interval=1.0, burst=False, max_runtime=None, worker=None):
+    """Claim and run jobs until interrupted (or, with burst, until the queue is empty)"""
+    worker = worker or worker_name()
+    processed = 0
+    while True:
+        if max_runtime:
+            requeue_stale(max_runtime)
+        job = claim_next(worker)
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        execute(job)
+        processed += 1
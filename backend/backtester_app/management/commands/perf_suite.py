@@ -0,0 +1,63 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backtester_app import perf
+
+
+class Command(BaseCommand):
+    help = "Time the engine and backtest views on synthetic data and compare throughput with a saved baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('cases', nargs='*',
+                            help="Case name prefixes to run, e.g. engine or view.backtest.SMA (default: all)")
+        parser.add_argument('--sizes', default=','.join(str(size) for size in perf.SIZES),
+                            help="Comma-separated bar counts to run every case at")
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case; the fastest counts")
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'perf_baseline.json'),
+                            help="JSON baseline file to compare against or save to")
+        parser.add_argument('--threshold', type=float, default=perf.DEFAULT_THRESHOLD,
+                            help="Fail when throughput drops by more than this fraction of the baseline")
+        parser.add_argument('--save', action='store_true', help="Save the results as the new baseline instead of comparing")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        unknown = [prefix for prefix in options['cases'] if not any(name.startswith(prefix) for name in perf.CASES)]
+        if unknown:
+            raise CommandError(f"No cases match {', '.join(unknown)}. Available: {', '.join(perf.CASES)}")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<24} {result['bars']:>9} bars  {result['seconds'] * 1000:>10.2f} ms  "
+                f"{result['bars_per_second']:>14,.0f} bars/s  peak {result['peak_memory_bytes'] / 2**20:>8.1f} MiB  "
+                f"retained {result['retained_allocations']} blocks"
+            )
+
+        # Every view request logs a handful of INFO lines; keep them for -v 2
+        if options['verbosity'] < 2:
+            logging.disable(logging.INFO)
+        try:
+            results = perf.run_suite(sizes, options['cases'] or None, options['repeat'], progress)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options['save']:
+            perf.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Saved {len(results)} results to {options['baseline']}"))
+            return
+
+        baseline = perf.load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(f"No baseline at {options['baseline']}; run with --save to create one"))
+            return
+
+        regressions = perf.compare(results, baseline, options['threshold'])
+        for regression in regressions:
+            self.stderr.write(
+                f"{regression['case']}: {regression['bars_per_second']:,.0f} bars/s vs "
+                f"{regression['baseline_bars_per_second']:,.0f} in the baseline ({regression['change']:+.0%})"
+            )
+        if regressions:
+            raise CommandError(f"{len(regressions)} cases regressed by more than {options['threshold']:.0%}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']:.0%} in {len(results)} cases"))
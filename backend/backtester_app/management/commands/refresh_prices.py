@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from backtester_app import ingest, price_store, providers, universes
+from backtester_app.models import PriceSeries
+
+
+class Command(BaseCommand):
+    help = "Download the missing tail of every stored symbol (or the given symbols) and append it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help="Symbols to refresh; defaults to every stored symbol")
+        parser.add_argument('--universe', action='append', default=[],
+                            help="Also refresh every symbol of a named universe (repeatable)")
+        parser.add_argument('--full', action='store_true', help="Re-download the whole history instead of the tail")
+        parser.add_argument('--provider', choices=sorted(providers.PROVIDERS),
+                            help="Price provider to download from (defaults to settings.PRICE_PROVIDER)")
+        parser.add_argument('--interval', choices=list(price_store.INTERVALS), default=price_store.DAILY,
+                            help="Bar interval to fetch; intraday bars are kept in the columnar store only")
+
+    def handle(self, *args, **options):
+        symbols = list(options['symbols'])
+        for name in options['universe']:
+            symbols.extend(universes.get_universe(name))
+        symbols = symbols or list(
+            PriceSeries.objects.filter(interval=options['interval']).values_list('symbol', flat=True)
+        )
+        provider = providers.get_provider(options['provider'])
+
+        results, missing = ingest.refresh_many(
+            symbols, full=options['full'], provider=provider, interval=options['interval']
+        )
+        for changes in results:
+            self.stdout.write(
+                f"{changes['symbol']}: {changes['mode']}, {changes['added']} new, "
+                f"{changes['replaced']} revised, last bar {changes['last_timestamp']}"
+            )
+        for symbol in missing:
+            self.stderr.write(f"{symbol}: no data found")
+
+        total_added = sum(changes['added'] for changes in results)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {len(results)} symbols, {total_added} new bars"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from backtester_app import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued backtest, benchmark and fetch jobs. Start several to work the queue in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait between checks of an empty queue")
+        parser.add_argument('--max-runtime', type=int, default=3600,
+                            help="Requeue jobs another worker has been running for longer than this many seconds (0 disables)")
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        self.stdout.write(f"Worker {worker} waiting for jobs")
+        try:
+            processed = jobs.run_worker(
+                poll_interval=options['poll_interval'],
+                burst=options['burst'],
+                max_runtime=options['max_runtime'] or None,
+                worker=worker,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Queue empty, ran {processed} jobs"))
@@ -0,0 +1,170 @@
+"""Performance metrics from a run's per-bar returns and portfolio values.
+
+Scalar metrics summarize a whole run; rolling metrics are series aligned
+with the equity curve. Every kernel is a fixed number of vectorized passes
+(cumulative sums, running maxima), so the cost is linear in the number of
+bars whatever the window, which keeps the full set cheap enough to compute
+for every combination of a sweep.
+"""
+import numpy as np
+
+from . import indicators
+
+TRADING_DAYS = 252
+# Bars in a rolling window when a request doesn't pick one (about a quarter of daily bars)
+DEFAULT_WINDOW = 63
+# Keys summary() returns; the last two only when given the exposure
+SUMMARY_FIELDS = ('sortino_ratio', 'calmar_ratio', 'annualized_return', 'volatility', 'max_drawdown_duration',
+                  'turnover', 'average_exposure')
+
+
+def bar_returns(values):
+    """Per-bar returns of a value series; the first bar earns nothing"""
+    values = np.asarray(values, dtype=np.float64)
+    returns = np.zeros(len(values))
+    returns[1:] = values[1:] / values[:-1] - 1
+    return returns
+
+
+def drawdown(values):
+    """Fall from the running peak at every bar, as a (non-positive) fraction"""
+    values = np.asarray(values, dtype=np.float64)
+    return values / np.maximum.accumulate(values) - 1
+
+
+def max_drawdown(values):
+    if len(values) == 0:
+        return 0.0
+    return float(np.min(drawdown(values)))
+
+
+def drawdown_duration(values):
+    """Bars since the running peak was last set (0 at a new high)"""
+    values = np.asarray(values, dtype=np.float64)
+    index = np.arange(len(values))
+    at_peak = values >= np.maximum.accumulate(values)
+    return index - np.maximum.accumulate(np.where(at_peak, index, 0))
+
+
+def rolling_max(values, window):
+    """Trailing maximum over window bars (fewer at the start) in O(n).
+
+    The van Herk/Gil-Werman method: with the series cut into blocks of
+    ``window`` bars, any window is the suffix of one block and the prefix of
+    the next, so it is the larger of a suffix maximum and a prefix maximum,
+    both of which are one running-maximum pass per block.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    window = min(int(window), n)
+    if n == 0 or window <= 1:
+        return values.copy()
+
+    blocks = np.concatenate([values, np.full(-n % window, -np.inf)]).reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()[:n]
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()[:n]
+
+    result = np.empty(n)
+    result[:window - 1] = np.maximum.accumulate(values[:window - 1])
+    ends = np.arange(window - 1, n)
+    result[window - 1:] = np.maximum(suffix[ends - window + 1], prefix[ends])
+    return result
+
+
+def rolling_drawdown(values, window):
+    """Fall from the highest value of the trailing window"""
+    return np.asarray(values, dtype=np.float64) / rolling_max(values, window) - 1
+
+
+def sharpe_ratio(returns, periods_per_year=TRADING_DAYS):
+    # Handle case where std dev is zero (happens with no trades or constant returns)
+    std_dev = np.std(returns, ddof=1) if len(returns) > 1 else np.nan
+    if std_dev == 0 or np.isnan(std_dev):
+        return 0.0
+    sharpe = np.sqrt(periods_per_year) * np.mean(returns) / std_dev
+    # Make sure sharpe is not NaN
+    return 0.0 if np.isnan(sharpe) else float(sharpe)
+
+
+def sortino_ratio(returns, periods_per_year=TRADING_DAYS):
+    """Annualized mean return over the downside deviation (losses only, target zero)"""
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) == 0:
+        return 0.0
+    losses = np.minimum(returns, 0.0)
+    downside = np.sqrt(np.dot(losses, losses) / len(returns))
+    if downside == 0:
+        return 0.0
+    return float(np.sqrt(periods_per_year) * np.mean(returns) / downside)
+
+
+def volatility(returns, periods_per_year=TRADING_DAYS):
+    if len(returns) < 2:
+        return 0.0
+    return float(np.std(returns, ddof=1) * np.sqrt(periods_per_year))
+
+
+def annualized_return(values, initial_capital, periods_per_year=TRADING_DAYS):
+    if len(values) == 0 or values[-1] <= 0:
+        return 0.0 if len(values) == 0 else -1.0
+    return float((values[-1] / initial_capital) ** (periods_per_year / len(values)) - 1)
+
+
+def calmar_ratio(values, initial_capital, periods_per_year=TRADING_DAYS):
+    """Annualized return over the magnitude of the maximum drawdown"""
+    worst = max_drawdown(values)
+    if worst == 0:
+        return 0.0
+    return annualized_return(values, initial_capital, periods_per_year) / -worst
+
+
+def turnover(exposure, periods_per_year=TRADING_DAYS):
+    """Equity traded per year, in multiples of the equity (entering and exiting once is 2)"""
+    exposure = np.asarray(exposure, dtype=np.float64)
+    if len(exposure) == 0:
+        return 0.0
+    traded = np.abs(np.diff(exposure, prepend=0.0)).sum()
+    return float(traded * periods_per_year / len(exposure))
+
+
+def rolling_volatility(returns, window, periods_per_year=TRADING_DAYS):
+    """Annualized standard deviation of the trailing window's returns; NaN until the window is full"""
+    return indicators.rolling_std(returns, [window])[0] * np.sqrt(periods_per_year)
+
+
+def rolling_sharpe(returns, window, periods_per_year=TRADING_DAYS):
+    """Annualized Sharpe ratio of the trailing window; NaN until the window is full, 0 where it is flat"""
+    mean = indicators.rolling_mean(returns, [window])[0]
+    std = indicators.rolling_std(returns, [window])[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.sqrt(periods_per_year) * mean / std
+    sharpe[std == 0] = 0.0
+    return sharpe
+
+
+def summary(returns, values, initial_capital, periods_per_year=TRADING_DAYS, exposure=None):
+    """Scalar metrics of a run; turnover and time in the market need the exposure it held"""
+    result = {
+        'sortino_ratio': sortino_ratio(returns, periods_per_year),
+        'calmar_ratio': calmar_ratio(values, initial_capital, periods_per_year),
+        'annualized_return': annualized_return(values, initial_capital, periods_per_year),
+        'volatility': volatility(returns, periods_per_year),
+        'max_drawdown_duration': int(drawdown_duration(values).max()) if len(values) else 0,
+    }
+    if exposure is not None:
+        exposure = np.asarray(exposure, dtype=np.float64)
+        result['turnover'] = turnover(exposure, periods_per_year)
+        result['average_exposure'] = float(np.mean(np.abs(exposure))) if len(exposure) else 0.0
+    return result
+
+
+def rolling(values, window=DEFAULT_WINDOW, periods_per_year=TRADING_DAYS):
+    """Rolling series aligned with an equity curve, keyed by response field name"""
+    returns = bar_returns(values)
+    return {
+        'drawdown_curve': drawdown(values),
+        'drawdown_duration': drawdown_duration(values),
+        'rolling_drawdown': rolling_drawdown(values, window),
+        'rolling_volatility': rolling_volatility(returns, window, periods_per_year),
+        'rolling_sharpe': rolling_sharpe(returns, window, periods_per_year),
+    }
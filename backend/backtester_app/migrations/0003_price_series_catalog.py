@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0002_alter_backtestresult_long_window_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceSeries",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=20, unique=True)),
+                ("first_timestamp", models.DateTimeField(blank=True, null=True)),
+                ("last_timestamp", models.DateTimeField(blank=True, null=True)),
+                ("bar_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["symbol"],
+            },
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="symbol",
+            field=models.CharField(default="", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="pricedata",
+            name="symbol",
+            field=models.CharField(default="", max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name="pricedata",
+            index=models.Index(
+                fields=["symbol", "timestamp"], name="backtester__symbol_655403_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0003_price_series_catalog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="priceseries",
+            name="data_hash",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
@@ -0,0 +1,125 @@
+import io
+import json
+import zlib
+
+import numpy as np
+from django.db import migrations, models
+
+TRADE_DTYPE = np.dtype(
+    [
+        ("entry_date", "datetime64[D]"),
+        ("exit_date", "datetime64[D]"),
+        ("entry_price", "f8"),
+        ("exit_price", "f8"),
+        ("position", "i1"),
+        ("percent_pnl", "f8"),
+        ("dollar_pnl", "f8"),
+    ]
+)
+
+
+def pack_array(values):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(values), allow_pickle=False)
+    return zlib.compress(buffer.getvalue(), 6)
+
+
+def load_json(value):
+    # The old view stored json.dumps() output inside the JSONField
+    return json.loads(value) if isinstance(value, str) else (value or [])
+
+
+def pack_results(apps, schema_editor):
+    BacktestResult = apps.get_model("backtester_app", "BacktestResult")
+    for result in BacktestResult.objects.all().iterator():
+        result.equity_curve = pack_array(
+            np.asarray(load_json(result.equity_curve_json), dtype=np.float64)
+        )
+        trades = load_json(result.trades_json)
+        ledger = np.empty(len(trades), dtype=TRADE_DTYPE)
+        for name in TRADE_DTYPE.names:
+            ledger[name] = [trade[name] for trade in trades]
+        result.trades = pack_array(ledger)
+        # Dates were never stored for these rows
+        result.save(update_fields=["equity_curve", "trades"])
+
+
+def unpack_results(apps, schema_editor):
+    BacktestResult = apps.get_model("backtester_app", "BacktestResult")
+    for result in BacktestResult.objects.all().iterator():
+        curve = np.load(io.BytesIO(zlib.decompress(bytes(result.equity_curve))))
+        ledger = np.load(io.BytesIO(zlib.decompress(bytes(result.trades))))
+        trades = [
+            {
+                name: str(value) if name.endswith("_date") else value.item()
+                for name, value in zip(TRADE_DTYPE.names, record)
+            }
+            for record in ledger
+        ]
+        result.equity_curve_json = json.dumps(curve.astype(np.float64).tolist())
+        result.trades_json = json.dumps(trades)
+        result.save(update_fields=["equity_curve_json", "trades_json"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0005_job_queue"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="backtestresult",
+            old_name="equity_curve",
+            new_name="equity_curve_json",
+        ),
+        migrations.RenameField(
+            model_name="backtestresult",
+            old_name="trades",
+            new_name="trades_json",
+        ),
+        # Nullable while both forms exist, so the migration can be reversed
+        migrations.AlterField(
+            model_name="backtestresult",
+            name="equity_curve_json",
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="backtestresult",
+            name="trades_json",
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="equity_curve",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="curve_start",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="curve_dates",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="calendar",
+            field=models.CharField(blank=True, default="", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="trades",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.RunPython(pack_results, unpack_results),
+        migrations.RemoveField(
+            model_name="backtestresult",
+            name="equity_curve_json",
+        ),
+        migrations.RemoveField(
+            model_name="backtestresult",
+            name="trades_json",
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0006_binary_backtest_results"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="priceseries",
+            options={"ordering": ["symbol", "interval"]},
+        ),
+        migrations.AddField(
+            model_name="backtestresult",
+            name="interval",
+            field=models.CharField(default="1d", max_length=4),
+        ),
+        migrations.AddField(
+            model_name="priceseries",
+            name="interval",
+            field=models.CharField(default="1d", max_length=4),
+        ),
+        migrations.AlterField(
+            model_name="priceseries",
+            name="symbol",
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name="priceseries",
+            constraint=models.UniqueConstraint(
+                fields=("symbol", "interval"), name="unique_price_series_interval"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0007_intraday_intervals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="backtestresult",
+            name="costs",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
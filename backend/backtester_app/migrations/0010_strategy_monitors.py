@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0009_backtest_metrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StrategyMonitor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("symbol", models.CharField(max_length=20)),
+                ("interval", models.CharField(default="1d", max_length=4)),
+                ("indicator", models.CharField(max_length=50)),
+                ("params", models.JSONField(default=dict)),
+                ("costs", models.JSONField(blank=True, default=dict)),
+                ("start_date", models.DateTimeField()),
+                ("last_timestamp", models.DateTimeField(blank=True, null=True)),
+                ("bar_count", models.IntegerField(default=0)),
+                ("position", models.FloatField(default=0.0)),
+                ("portfolio_value", models.FloatField(default=0.0)),
+                ("total_return", models.FloatField(default=0.0)),
+                ("max_drawdown", models.FloatField(default=0.0)),
+                ("sharpe_ratio", models.FloatField(default=0.0)),
+                ("state", models.JSONField(default=dict)),
+            ],
+            options={
+                "ordering": ["symbol", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["symbol", "interval"],
+                        name="backtester__symbol_14fff3_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def assign_legacy_symbol(apps, schema_editor):
+    """Give rows from before the symbol column settings.LEGACY_PRICE_SYMBOL"""
+    PriceData = apps.get_model("backtester_app", "PriceData")
+    symbol = settings.LEGACY_PRICE_SYMBOL.strip().upper()
+    legacy = PriceData.objects.filter(symbol="")
+    if not symbol or not legacy.exists():
+        return
+    # Bars fetched again since then already have the symbol; keep those
+    stored = PriceData.objects.filter(symbol=symbol).values("timestamp")
+    legacy.filter(timestamp__in=stored).delete()
+    legacy.update(symbol=symbol)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("backtester_app", "0010_strategy_monitors"),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_legacy_symbol, migrations.RunPython.noop),
+    ]
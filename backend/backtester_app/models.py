@@ -1,8 +1,10 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 # Create your models here.
 
 class PriceData(models.Model):
+    symbol = models.CharField(max_length=20, default='')
     timestamp = models.DateTimeField()
     open = models.FloatField()
     high = models.FloatField()
@@ -14,13 +16,35 @@ class PriceData(models.Model):
         ordering = ['timestamp']
         indexes = [
             models.Index(fields=['timestamp']),
+            models.Index(fields=['symbol', 'timestamp']),
         ]
 
     def __str__(self):
-        return f"{self.timestamp} - Close: {self.close}"
+        return f"{self.symbol} {self.timestamp} - Close: {self.close}"
+
+class PriceSeries(models.Model):
+    """Catalog entry for one interval of a symbol held in the columnar price store (see price_store.py)"""
+    symbol = models.CharField(max_length=20)
+    interval = models.CharField(max_length=4, default='1d')
+    first_timestamp = models.DateTimeField(null=True, blank=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    bar_count = models.IntegerField(default=0)
+    # Digest of the stored columns; changes whenever the data does
+    data_hash = models.CharField(max_length=32, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['symbol', 'interval']
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'interval'], name='unique_price_series_interval'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.interval} - {self.bar_count} bars"
 
 class BacktestResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
+    symbol = models.CharField(max_length=20, default='')
     indicator = models.CharField(max_length=50)
     short_window = models.IntegerField(null=True, blank=True)
     long_window = models.IntegerField(null=True, blank=True)
@@ -29,11 +53,89 @@ class BacktestResult(models.Model):
     total_return = models.FloatField(default=0.0)
     max_drawdown = models.FloatField(default=0.0)
     sharpe_ratio = models.FloatField(default=0.0)
-    equity_curve = models.JSONField()
-    trades = models.JSONField()
+    # Curves, dates and trades are zlib-compressed arrays (see codec.py)
+    equity_curve = models.BinaryField(default=b'')
+    curve_start = models.DateField(null=True, blank=True)
+    curve_dates = models.BinaryField(null=True, blank=True)
+    # Symbol whose stored bars the curve's dates follow
+    calendar = models.CharField(max_length=20, blank=True, default='')
+    interval = models.CharField(max_length=4, default='1d')
+    trades = models.BinaryField(default=b'')
+    # Trading cost model the run was charged (see costs.py); empty for a free run
+    costs = models.JSONField(default=dict, blank=True)
+    # Further scalar metrics (Sortino, Calmar, turnover, ...; see metrics.summary())
+    metrics = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         strategy_desc = f"{self.indicator}"
         if self.short_window is not None and self.long_window is not None:
             strategy_desc += f" ({self.short_window}/{self.long_window})"
         return f"{strategy_desc} - Return: {self.total_return:.2%}"
+
+class StrategyMonitor(models.Model):
+    """A saved strategy carried forward bar by bar as new prices are stored (see monitors.py)"""
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    symbol = models.CharField(max_length=20)
+    interval = models.CharField(max_length=4, default='1d')
+    indicator = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    # Fixed trading costs charged on every change of position (see costs.py)
+    costs = models.JSONField(default=dict, blank=True)
+    start_date = models.DateTimeField()
+    # Last bar the run has seen, and the run's figures as of that bar
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    bar_count = models.IntegerField(default=0)
+    position = models.FloatField(default=0.0)
+    portfolio_value = models.FloatField(default=0.0)
+    total_return = models.FloatField(default=0.0)
+    max_drawdown = models.FloatField(default=0.0)
+    sharpe_ratio = models.FloatField(default=0.0)
+    # Checkpoint of the streaming.StrategyRun, indicators included
+    state = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['symbol', 'id']
+        indexes = [
+            models.Index(fields=['symbol', 'interval']),
+        ]
+
+    def __str__(self):
+        return f"{self.indicator} on {self.symbol} - Return: {self.total_return:.2%}"
+
+class Job(models.Model):
+    """A queued API request, run by the run_jobs worker (see jobs.py)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default='')
+    message = models.CharField(max_length=200, blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    @property
+    def done(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} - {self.status}"
@@ -0,0 +1,158 @@
+"""Saved strategies carried forward incrementally as new bars are stored.
+
+A StrategyMonitor is one strategy and parameter set on one symbol, run from
+its start date like a backtest. It keeps a checkpoint of the run's streaming
+state (indicators, position, portfolio value, running metrics; see
+streaming.py), so when ingest appends bars each monitor on the symbol only
+feeds the new closes through its run instead of recomputing its history.
+If the bar a checkpoint ended on has since been revised, that monitor is
+replayed from its start date instead.
+
+Monitors charge fixed trading costs only: impact and participation limits
+size trades from the equity path of the whole run (see engine.apply_costs()).
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from . import bars, costs, engine, price_store, streaming, strategies
+from .models import StrategyMonitor
+
+logger = logging.getLogger(__name__)
+
+# Fields written back after a monitor's run moves forward
+UPDATE_FIELDS = ['last_timestamp', 'bar_count', 'position', 'portfolio_value', 'total_return',
+                 'max_drawdown', 'sharpe_ratio', 'state', 'updated_at']
+
+
+def _store_time(timestamp):
+    """A DateTimeField value as a (naive UTC) timestamp of the price store"""
+    return np.datetime64(pd.Timestamp(timestamp).tz_convert('UTC').tz_localize(None), 'ns')
+
+
+def _field_time(timestamp):
+    """A naive UTC timestamp as a DateTimeField value"""
+    return timezone.make_aware(pd.Timestamp(timestamp).to_pydatetime(), timezone.utc)
+
+
+def _cost_model(spec):
+    cost_model = costs.CostModel.from_request(spec)
+    if cost_model.uses_volume:
+        raise ValueError("Monitors support fixed costs only (commission, spread and slippage)")
+    return cost_model
+
+
+def create(symbol, indicator, params, start_date, interval=price_store.DAILY, cost_spec=None,
+           initial_capital=engine.INITIAL_CAPITAL):
+    """Save a monitor and run it over the stored bars from start_date"""
+    strategy = strategies.get_strategy(indicator)
+    monitor = StrategyMonitor(
+        symbol=price_store.normalize_symbol(symbol),
+        interval=price_store.normalize_interval(interval),
+        indicator=indicator,
+        params=strategy.parse_params(params),
+        costs=_cost_model(cost_spec).as_dict(),
+        start_date=_field_time(pd.Timestamp(start_date).tz_localize(None)),
+    )
+    replay(monitor, initial_capital)
+    monitor.save()
+    logger.info(f"Monitoring {indicator} on {monitor.symbol}: {monitor.bar_count} bars, return {monitor.total_return:.2%}")
+    return monitor
+
+
+def replay(monitor, initial_capital=None):
+    """Run a monitor from its start date over every stored bar, replacing its checkpoint"""
+    strategy = strategies.get_strategy(monitor.indicator)
+    prices = bars.load_bars(monitor.symbol, _store_time(monitor.start_date), None, monitor.interval)
+    if prices is None or len(prices) == 0:
+        raise ValueError(f"No {monitor.interval} price data stored for {monitor.symbol} from {monitor.start_date:%Y-%m-%d}")
+    strategy.check_data(len(prices), monitor.params)
+    warmup = strategy.warmup(monitor.params)
+    if len(prices) <= warmup:
+        raise ValueError(f"Not enough data points ({len(prices)}) for the warmup period ({warmup})")
+
+    if initial_capital is None:
+        initial_capital = monitor.state['initial_capital'] if monitor.state else engine.INITIAL_CAPITAL
+    run = streaming.StrategyRun(
+        strategy.stream(monitor.params), warmup, initial_capital,
+        cost_rate=_cost_model(monitor.costs).fixed_rate,
+        periods_per_year=bars.periods_per_year(prices.timestamp, monitor.interval),
+    )
+    _feed(monitor, run, prices.timestamp, prices.close)
+
+
+def _feed(monitor, run, timestamps, close):
+    for value in close:
+        run.update(value)
+    monitor.last_timestamp = _field_time(timestamps[-1])
+    monitor.bar_count = run.bars
+    monitor.position = run.position
+    monitor.portfolio_value = run.value
+    monitor.state = run.state()
+    for name, value in run.metrics().items():
+        setattr(monitor, name, value)
+    # bulk_update() doesn't apply auto_now
+    monitor.updated_at = timezone.now()
+
+
+def advance(monitor, prices=None):
+    """Feed a monitor the bars stored after its checkpoint; returns how many bars it ran over.
+
+    ``prices`` may be bars of the monitor's symbol and interval loaded from
+    at or before its last bar, to share one load between monitors.
+    """
+    if not monitor.state:
+        replay(monitor)
+        return monitor.bar_count
+
+    last = _store_time(monitor.last_timestamp)
+    if prices is None:
+        prices = bars.load_bars(monitor.symbol, last, None, monitor.interval)
+    if prices is None or len(prices) == 0:
+        return 0
+    timestamps = np.asarray(prices.timestamp)
+    at = int(np.searchsorted(timestamps, last))
+
+    run = streaming.restore(monitor.state)
+    # The checkpoint's bar must still be stored as the run saw it
+    if at == len(timestamps) or timestamps[at] != last or prices.close[at] != run.last_close:
+        logger.info(f"Bars up to monitor {monitor.pk}'s checkpoint changed; replaying it")
+        replay(monitor)
+        return monitor.bar_count
+
+    new = slice(at + 1, None)
+    if len(timestamps[new]) == 0:
+        return 0
+    _feed(monitor, run, timestamps[new], prices.close[new])
+    return len(timestamps[new])
+
+
+def advance_symbols(symbols):
+    """Advance every monitor on the symbols, loading each symbol's new bars once per interval.
+
+    A monitor that fails (e.g. its bars were deleted) is logged and skipped
+    so it can't hold up the rest. Returns the number of monitors advanced.
+    """
+    groups = {}
+    for monitor in StrategyMonitor.objects.filter(symbol__in=symbols):
+        groups.setdefault((monitor.symbol, monitor.interval), []).append(monitor)
+
+    changed = []
+    for (symbol, interval), group in groups.items():
+        checkpoints = [monitor.last_timestamp for monitor in group if monitor.last_timestamp is not None]
+        prices = bars.load_bars(symbol, _store_time(min(checkpoints)), None, interval) if checkpoints else None
+        for monitor in group:
+            try:
+                if advance(monitor, prices):
+                    changed.append(monitor)
+            except Exception:
+                logger.exception(f"Could not advance monitor {monitor.pk} ({monitor.indicator} on {symbol} {interval})")
+
+    with transaction.atomic():
+        StrategyMonitor.objects.bulk_update(changed, UPDATE_FIELDS, batch_size=500)
+    if changed:
+        logger.info(f"Advanced {len(changed)} monitors on {len({monitor.symbol for monitor in changed})} symbols")
+    return len(changed)
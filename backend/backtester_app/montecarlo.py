@@ -0,0 +1,113 @@
+"""Monte Carlo robustness checks for a run's per-bar strategy returns.
+
+Each method builds resampled return paths as an index matrix into the
+original returns, gathers a (simulations x bars) block of paths at a time and
+reduces it with engine.path_metrics(), so memory stays bounded by the chunk
+size however many simulations are requested.
+
+- ``block_bootstrap`` draws blocks of consecutive bars with replacement
+  (wrapping around the end), which keeps short-range autocorrelation such as
+  volatility clustering.
+- ``trade_shuffle`` permutes the order of the run's segments (each trade and
+  each flat stretch between trades) without changing any segment. Total
+  return and Sharpe ratio don't depend on the order, so this isolates how
+  much of the drawdown is down to the sequence the trades happened in.
+"""
+import numpy as np
+
+from . import engine
+
+METHODS = ('block_bootstrap', 'trade_shuffle')
+MAX_SIMULATIONS = 100000
+# Cells (simulations x bars) per chunk: small enough that a chunk's matrices
+# (about 5 MB each) stay in cache, which beats fewer, larger chunks
+CHUNK_CELLS = 640_000
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def block_bootstrap_indices(n_bars, n_sims, block_size, rng):
+    """(n_sims, n_bars) indices made of blocks starting at random bars.
+
+    Indices run up to n_bars + block_size - 2; they point into the returns
+    followed by their first block_size - 1 values again, which wraps blocks
+    around the end without a modulo over every index.
+    """
+    n_blocks = -(-n_bars // block_size)
+    starts = rng.integers(0, n_bars, size=(n_sims, n_blocks, 1))
+    return (starts + np.arange(block_size)).reshape(n_sims, n_blocks * block_size)[:, :n_bars]
+
+
+def segments(held):
+    """Start and length of each run of constant held position"""
+    held = np.asarray(held)
+    if len(held) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], held[1:] != held[:-1]]))
+    lengths = np.diff(np.append(starts, len(held)))
+    return starts, lengths
+
+
+def trade_shuffle_indices(starts, lengths, n_sims, rng):
+    """(n_sims, n_bars) indices that lay the segments out in a random order per simulation"""
+    n_bars = int(lengths.sum())
+    order = np.argsort(rng.random((n_sims, len(starts))), axis=1)
+    shuffled_lengths = lengths[order]
+    # Where each shuffled segment begins in the output path
+    out_starts = np.cumsum(shuffled_lengths, axis=1) - shuffled_lengths
+    # Every output bar maps to its segment's source start plus its offset inside the segment
+    shift = np.repeat((starts[order] - out_starts).ravel(), shuffled_lengths.ravel())
+    return shift.reshape(n_sims, n_bars) + np.arange(n_bars)
+
+
+def simulate(returns, method='block_bootstrap', n_sims=10000, block_size=20, held=None, seed=None,
+             periods_per_year=engine.TRADING_DAYS):
+    """Metrics of n_sims resampled paths: {metric: array of n_sims values}, annualized over periods_per_year bars"""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if not 1 <= n_sims <= MAX_SIMULATIONS:
+        raise ValueError(f"n_sims must be between 1 and {MAX_SIMULATIONS}")
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    n_bars = len(returns)
+    if n_bars < 2:
+        raise ValueError("Need at least two bars of returns to resample")
+
+    rng = np.random.default_rng(seed)
+    if method == 'block_bootstrap':
+        block_size = max(1, min(int(block_size), n_bars))
+        source = np.concatenate([returns, returns[:block_size - 1]])
+    else:
+        if held is None:
+            raise ValueError("trade_shuffle needs the held position per bar")
+        starts, lengths = segments(held)
+        source = returns
+
+    chunk = max(1, CHUNK_CELLS // n_bars)
+    results = {name: np.empty(n_sims) for name in ('total_return', 'max_drawdown', 'sharpe_ratio')}
+    for first in range(0, n_sims, chunk):
+        count = min(chunk, n_sims - first)
+        if method == 'block_bootstrap':
+            indices = block_bootstrap_indices(n_bars, count, block_size, rng)
+        else:
+            indices = trade_shuffle_indices(starts, lengths, count, rng)
+        for name, values in engine.path_metrics(source[indices], periods_per_year).items():
+            results[name][first:first + count] = values
+    return results
+
+
+def summarize(simulated, actual, confidence=0.9, percentiles=PERCENTILES):
+    """Confidence interval, percentiles, mean and the actual run's percentile rank for each metric"""
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    tail = (1 - confidence) / 2 * 100
+    summary = {}
+    for name, values in simulated.items():
+        low, high = np.percentile(values, [tail, 100 - tail])
+        summary[name] = {
+            'actual': actual[name],
+            'mean': float(values.mean()),
+            'interval': [float(low), float(high)],
+            'percentiles': {str(p): float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))},
+            'actual_rank': float((values < actual[name]).mean() * 100),
+        }
+    summary['probability_of_loss'] = float((simulated['total_return'] < 0).mean())
+    return summary
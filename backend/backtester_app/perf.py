@@ -0,0 +1,253 @@
+"""Performance suite for the backtest engine and API views.
+
+Each case is timed on synthetic data at several sizes and reports wall time,
+throughput in bars per second, the tracemalloc peak and the allocations still
+held when the case returns. ``perf_suite`` (the management command) saves the
+results as a JSON baseline and compares later runs against it, failing when
+throughput drops by more than a threshold.
+
+- ``engine.<INDICATOR>``: engine.run_strategy() and extract_trades() on a
+  close array, with each strategy's default parameters
+- ``view.backtest.<INDICATOR>`` and ``view.benchmark``: a full request
+  through BacktestView or BenchmarkView, from the price store to the
+  rendered JSON, on one-minute bars (the only interval with a million bars
+  of history)
+
+View cases run against a temporary price store. The store only publishes a
+series once its catalog row commits, so the fixture series are written
+before the cases start and their rows deleted afterwards; the requests
+themselves run inside a transaction that is rolled back, so they leave no
+rows or files behind.
+"""
+import functools
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+from django.core.cache import caches
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from . import engine, indicator_store, price_store, providers, result_cache, strategies
+from .models import PriceSeries
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+INDICATORS = ('SMA', 'RSI', 'MACD', 'BBANDS')
+DEFAULT_THRESHOLD = 0.2
+PERF_SYMBOL = 'PERF'
+
+CASES = {}
+
+
+def case(name):
+    """Register a case factory: factory(n_bars, env) returns the callable to time"""
+    def decorator(factory):
+        CASES[name] = factory
+        return factory
+    return decorator
+
+
+def synthetic_close(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, n_bars)))
+
+
+def _engine_case(indicator, n_bars, env):
+    close = synthetic_close(n_bars)
+    timestamps = np.datetime64('2000-01-03T09:30', 'ns') + np.arange(n_bars) * np.timedelta64(60, 's')
+    strategy = strategies.get_strategy(indicator)
+    params = strategy.parse_params({})
+
+    def run():
+        result = engine.run_strategy(close, strategy, params)
+        start = result['start']
+        engine.extract_trades(timestamps[start:], close[start:], result['position'])
+    return run
+
+
+def _request(view_name, data):
+    from . import views
+
+    view = getattr(views, view_name).as_view()
+    factory = APIRequestFactory()
+
+    def run():
+        # Every repeat has to compute, not return the cached response or indicators
+        caches[result_cache.CACHE_ALIAS].clear()
+        indicator_store.clear()
+        response = view(factory.post('/', data, format='json'))
+        response.render()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{view_name} failed: {response.data}")
+    return run
+
+
+def _view_backtest_case(indicator, n_bars, env):
+    return _request('BacktestView', {**env.store(n_bars), 'indicator': indicator})
+
+
+for _indicator in INDICATORS:
+    CASES[f'engine.{_indicator}'] = functools.partial(_engine_case, _indicator)
+    CASES[f'view.backtest.{_indicator}'] = functools.partial(_view_backtest_case, _indicator)
+
+
+@case('view.benchmark')
+def _view_benchmark_case(n_bars, env):
+    return _request('BenchmarkView', env.store(n_bars))
+
+
+class ViewEnvironment:
+    """Stores synthetic minute bars for the view cases, once per size"""
+
+    def __init__(self):
+        self.provider = providers.SyntheticProvider(seed=0)
+        self.requests = {}
+
+    def prepare(self, n_bars):
+        """Store n_bars one-minute bars; call it outside a transaction, so the store publishes them"""
+        if n_bars not in self.requests:
+            days = math.ceil(n_bars / self.provider.SESSION_MINUTES)
+            end = np.busday_offset(np.datetime64(self.provider.ORIGIN, 'D'), days, roll='forward')
+            minutes = self.provider.download(PERF_SYMBOL, self.provider.ORIGIN, str(end), '1m')
+            # A symbol per size, so each size is its own stored series
+            prices = price_store.PriceArrays(
+                f'{PERF_SYMBOL}{n_bars}', *(getattr(minutes, column)[:n_bars] for column in price_store.COLUMNS)
+            )
+            price_store.write_series(prices, '1m')
+            self.requests[n_bars] = {
+                'symbol': prices.symbol,
+                'interval': '1m',
+                'start_date': str(prices.timestamp[0].astype('datetime64[D]')),
+                'end_date': str(prices.timestamp[-1].astype('datetime64[D]')),
+            }
+
+    def store(self, n_bars):
+        """Request body covering exactly n_bars stored one-minute bars"""
+        if n_bars not in self.requests:
+            raise RuntimeError(f"No {n_bars}-bar series was prepared for the view cases")
+        return self.requests[n_bars]
+
+    def cleanup(self):
+        """Delete the catalog rows of the prepared series"""
+        PriceSeries.objects.filter(symbol__in=[body['symbol'] for body in self.requests.values()]).delete()
+        self.requests.clear()
+
+
+@contextmanager
+def isolated_environment(sizes=()):
+    """A temporary price and indicator store holding a series per size, and a transaction rolled back on exit"""
+    with tempfile.TemporaryDirectory() as root, \
+            override_settings(PRICE_STORE_DIR=root, INDICATOR_CACHE_DIR=os.path.join(root, 'indicators')):
+        env = ViewEnvironment()
+        try:
+            for n_bars in sizes:
+                env.prepare(n_bars)
+            with transaction.atomic():
+                yield env
+                transaction.set_rollback(True)
+        finally:
+            env.cleanup()
+
+
+def measure(run, n_bars, repeat=3):
+    """Time run() repeat times, then run it once more under tracemalloc"""
+    run()  # warm up imports and caches outside the measurement
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        # DRF responses sit in reference cycles; only count what outlives a collection
+        gc.collect()
+        retained = tracemalloc.take_snapshot().compare_to(before, 'filename')
+    finally:
+        tracemalloc.stop()
+
+    best = min(times)
+    return {
+        'bars': n_bars,
+        'seconds': best,
+        'median_seconds': statistics.median(times),
+        'bars_per_second': n_bars / best if best > 0 else math.inf,
+        'peak_memory_bytes': peak,
+        'retained_allocations': sum(stat.count_diff for stat in retained),
+        'retained_bytes': sum(stat.size_diff for stat in retained),
+    }
+
+
+def run_suite(sizes=SIZES, names=None, repeat=3, progress=None):
+    """Measure every selected case at every size: {'<case>/<bars>': result}"""
+    names = [name for name in CASES if names is None or any(name.startswith(prefix) for prefix in names)]
+    results = {}
+    with isolated_environment(sizes if any(name.startswith('view.') for name in names) else ()) as env:
+        for n_bars in sizes:
+            for name in names:
+                results[f'{name}/{n_bars}'] = result = measure(CASES[name](n_bars, env), n_bars, repeat)
+                if progress:
+                    progress(name, result)
+    return results
+
+
+def machine():
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    """Merge results into the baseline file, replacing the cases that were re-run"""
+    baseline = load_baseline(path) or {'results': {}}
+    baseline['results'].update(results)
+    baseline['machine'] = machine()
+    baseline['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return baseline
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Cases whose throughput fell more than threshold (a fraction) below the baseline"""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get('results', {}).get(key)
+        if not reference:
+            continue
+        change = result['bars_per_second'] / reference['bars_per_second'] - 1
+        if change < -threshold:
+            regressions.append({
+                'case': key,
+                'baseline_bars_per_second': reference['bars_per_second'],
+                'bars_per_second': result['bars_per_second'],
+                'change': change,
+            })
+    return regressions
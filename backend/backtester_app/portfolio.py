@@ -0,0 +1,150 @@
+"""Multi-asset portfolio backtests over a (bars x assets) close matrix.
+
+Target weights come from a weighting rule, optionally gated by a registered
+strategy's positions on each asset, and are set at the close of rebalance
+bars. Between rebalances the holdings drift with their own returns, which is
+computed for all assets at once from within-period cumulative growth.
+"""
+import numpy as np
+
+from . import engine, metrics
+from .strategies import IndicatorCache
+
+WEIGHTINGS = ('equal', 'signal', 'inverse_volatility')
+
+
+def asset_returns(close):
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+
+def rolling_volatility(returns, lookback):
+    """Per-asset rolling standard deviation of returns over the trailing lookback bars"""
+    n = len(returns)
+    vol = np.full(returns.shape, np.nan)
+    if lookback < 2 or n < lookback:
+        return vol
+    prefix = np.zeros((n + 1, returns.shape[1]))
+    np.cumsum(returns, axis=0, out=prefix[1:])
+    squares = np.zeros_like(prefix)
+    np.cumsum(returns * returns, axis=0, out=squares[1:])
+
+    sums = prefix[lookback:] - prefix[:-lookback]
+    sq_sums = squares[lookback:] - squares[:-lookback]
+    variance = (sq_sums - sums * sums / lookback) / (lookback - 1)
+    vol[lookback - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return vol
+
+
+def strategy_positions(close, strategy, params):
+    """Run a strategy's signals on every column at once: (bars x assets) positions"""
+    arrays = IndicatorCache(close)
+    arrays.require(strategy.indicator_keys(params))
+    return strategy.signals(arrays, params)
+
+
+def target_weights(close, weighting='equal', positions=None, vol_lookback=63):
+    """Target weights per bar from a weighting rule.
+
+    ``positions`` (bars x assets, -1/0/1) gates and signs the weights; without
+    it every asset is held long. 'equal' gives each asset 1/N (flat assets
+    leave their share in cash), 'signal' spreads the book over the assets with
+    a position, and 'inverse_volatility' does the same in proportion to
+    1 / rolling volatility.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"weighting must be one of {', '.join(WEIGHTINGS)}")
+    n_bars, n_assets = close.shape
+    if positions is None:
+        positions = np.ones((n_bars, n_assets))
+
+    if weighting == 'equal':
+        return positions / n_assets
+
+    raw = positions.astype(np.float64)
+    if weighting == 'inverse_volatility':
+        vol = rolling_volatility(asset_returns(close), vol_lookback)
+        with np.errstate(divide='ignore'):
+            inverse = np.where(vol > 0, 1.0 / vol, 0.0)
+        raw = raw * np.nan_to_num(inverse)
+
+    gross = np.abs(raw).sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(gross > 0, raw / gross, 0.0)
+
+
+def portfolio_returns(close, weights, rebalance_every=1):
+    """Portfolio return per bar for target weights set at the close of rebalance bars.
+
+    Weights chosen at bar t take effect from bar t + 1 (as in the single-asset
+    engine). Inside a rebalance period each holding grows with its cumulative
+    return since the period started, so the period's NAV relative to its start
+    is 1 + sum_i w_i * (G_i - 1).
+    """
+    n_bars = len(close)
+    returns = asset_returns(close)
+    if n_bars < 2:
+        return np.zeros(n_bars), np.zeros_like(weights)
+
+    rebalance_every = max(int(rebalance_every), 1)
+    rebalance_bars = np.arange(0, n_bars, rebalance_every)
+
+    # Period of bar t is the last rebalance bar strictly before t
+    bar = np.arange(n_bars)
+    period = np.searchsorted(rebalance_bars, bar, side='left') - 1
+    period[0] = 0
+    period_start_bar = rebalance_bars[period]
+    held = weights[period_start_bar]
+    held[0] = 0.0
+
+    # Cumulative growth of each asset since the close of its period's rebalance bar
+    growth = np.cumprod(1 + returns, axis=0)
+    growth_since = growth / growth[period_start_bar]
+
+    nav = 1 + np.sum(held * (growth_since - 1), axis=1)
+    prev_nav = np.ones(n_bars)
+    continues = period[1:] == period[:-1]
+    prev_nav[1:][continues] = nav[:-1][continues]
+
+    # Drop bar 0, where nothing is held yet
+    port_returns = nav / prev_nav - 1
+    port_returns[0] = 0.0
+    return port_returns, held
+
+
+def run_portfolio(close, weighting='equal', strategy=None, params=None, rebalance_every=1,
+                  vol_lookback=63, initial_capital=engine.INITIAL_CAPITAL, progress=None):
+    """Backtest a basket; returns the start bar after warmup, curves and metrics.
+
+    ``progress(message)``, if given, is called as each stage starts.
+    """
+    progress = progress or (lambda message: None)
+    close = np.asarray(close, dtype=np.float64)
+    positions = None
+    start = 0
+    if strategy is not None:
+        strategy.check_data(len(close), params)
+        progress(f'Computing {strategy.name} signals on {close.shape[1]} assets')
+        positions = strategy_positions(close, strategy, params)
+        start = strategy.warmup(params)
+    if weighting == 'inverse_volatility':
+        start = max(start, vol_lookback)
+    if len(close) <= start + 1:
+        raise ValueError(f"Not enough data points ({len(close)}) for the warmup period ({start})")
+
+    progress(f'Rebalancing {close.shape[1]} assets over {len(close) - start} bars')
+    weights = target_weights(close, weighting, positions, vol_lookback)[start:]
+    returns, held = portfolio_returns(close[start:], weights, rebalance_every)
+    equity = initial_capital * np.cumprod(1 + returns)
+    drawdown = metrics.drawdown(equity)
+
+    return {
+        'start': start,
+        'returns': returns,
+        'equity': equity,
+        'drawdown': drawdown,
+        'weights': weights[-1],
+        'exposure': float(np.mean(np.abs(held).sum(axis=1))),
+        **engine.performance_metrics(returns, equity, initial_capital),
+    }
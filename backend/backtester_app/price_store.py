@@ -0,0 +1,428 @@
+"""Per-symbol columnar price store.
+
+Every symbol lives in its own directory under ``settings.PRICE_STORE_DIR``
+with one ``.npy`` file per column (timestamp, open, high, low, close, volume).
+Files are opened memory-mapped, so loading a date range is a binary search on
+the timestamp column followed by contiguous array slices - no ORM query and no
+Python object per bar. The ``PriceSeries`` model is the catalog of what is
+stored.
+
+Each interval of a symbol is a set of chunk directories of column files
+listed in a ``chunks.json`` manifest. Daily bars are a single chunk in the
+symbol's directory. Intraday bars, which run to millions of rows, live in a
+subdirectory per interval split into one chunk per calendar month; a load
+only opens the months it overlaps, and an append only rewrites the months it
+touches. New data always goes to new chunk directories and the manifest is
+replaced atomically once the database transaction that updated the catalog
+commits, so a reader never sees a half-written series and a rolled back
+write never leaves files the catalog doesn't describe.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+import logging
+import shutil
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PriceSeries
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Ticker symbols become directory names, so only allow the characters Yahoo uses
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9.\-^=]{1,20}$')
+
+# Bar intervals that can be stored, with their length in seconds
+INTERVALS = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '1d': 86400}
+DAILY = '1d'
+MANIFEST = 'chunks.json'
+
+
+class PriceArrays:
+    """Contiguous OHLCV arrays for one symbol, sorted by timestamp"""
+    __slots__ = COLUMNS + ('symbol',)
+
+    def __init__(self, symbol, timestamp, open, high, low, close, volume):
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def to_frame(self):
+        """Build a DataFrame with the same columns the PriceData table exposes"""
+        return pd.DataFrame({
+            'timestamp': pd.DatetimeIndex(self.timestamp),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume,
+        })
+
+
+def normalize_symbol(symbol):
+    symbol = str(symbol or '').strip().upper()
+    if not SYMBOL_PATTERN.match(symbol):
+        raise ValueError(f"Invalid symbol: {symbol!r}")
+    return symbol
+
+
+def normalize_interval(interval):
+    interval = str(interval or DAILY).strip().lower()
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}. Available: {', '.join(INTERVALS)}")
+    return interval
+
+
+def symbol_dir(symbol):
+    return os.path.join(str(settings.PRICE_STORE_DIR), normalize_symbol(symbol))
+
+
+def series_dir(symbol, interval=DAILY):
+    """Directory holding one interval of a symbol: the symbol's own for daily bars"""
+    interval = normalize_interval(interval)
+    return symbol_dir(symbol) if interval == DAILY else os.path.join(symbol_dir(symbol), interval)
+
+
+def frame_to_arrays(symbol, df):
+    """Convert a yfinance download into PriceArrays.
+
+    Handles the (Price, Ticker) MultiIndex columns yfinance returns, makes the
+    index timezone naive and drops rows with missing prices.
+    """
+    symbol = normalize_symbol(symbol)
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.xs(symbol, axis=1, level=1, drop_level=True)
+
+    df = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(subset=['Close'])
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df = df.set_axis(index).sort_index()
+    df = df[~df.index.duplicated(keep='last')]
+
+    return PriceArrays(
+        symbol=symbol,
+        timestamp=df.index.values.astype('datetime64[ns]'),
+        open=df['Open'].to_numpy(dtype=np.float64),
+        high=df['High'].to_numpy(dtype=np.float64),
+        low=df['Low'].to_numpy(dtype=np.float64),
+        close=df['Close'].to_numpy(dtype=np.float64),
+        volume=df['Volume'].fillna(0).to_numpy(dtype=np.float64),
+    )
+
+
+def _aware(ts):
+    return timezone.make_aware(pd.Timestamp(ts).to_pydatetime(), timezone.utc)
+
+
+def content_hash(prices):
+    """Digest of every column's bytes, used as the version of a stored series"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(prices.symbol.encode())
+    for column in COLUMNS:
+        digest.update(np.ascontiguousarray(getattr(prices, column)).tobytes())
+    return digest.hexdigest()
+
+
+def data_version(symbol, interval=DAILY):
+    """Current content hash of a stored symbol and interval, or None if it was never stored"""
+    return PriceSeries.objects.filter(
+        symbol=normalize_symbol(symbol), interval=normalize_interval(interval)
+    ).values_list('data_hash', flat=True).first() or None
+
+
+def stored_intervals(symbol):
+    return list(PriceSeries.objects.filter(symbol=normalize_symbol(symbol)).values_list('interval', flat=True))
+
+
+def _column_arrays(prices):
+    """The columns of prices as contiguous arrays in their stored dtypes"""
+    return {
+        column: np.ascontiguousarray(getattr(prices, column), dtype='datetime64[ns]' if column == 'timestamp' else np.float64)
+        for column in COLUMNS
+    }
+
+
+def _write_columns(path, columns):
+    os.makedirs(path, exist_ok=True)
+    for column, values in columns.items():
+        # Write to a temporary file first so readers never see a half-written column
+        tmp_path = os.path.join(path, f'.{column}.tmp.npy')
+        np.save(tmp_path, values)
+        os.replace(tmp_path, os.path.join(path, f'{column}.npy'))
+
+
+def _update_catalog(prices, interval, data_hash, first, last, bar_count):
+    catalog, _ = PriceSeries.objects.update_or_create(
+        symbol=prices.symbol,
+        interval=interval,
+        defaults={
+            'first_timestamp': _aware(first) if first is not None else None,
+            'last_timestamp': _aware(last) if last is not None else None,
+            'bar_count': bar_count,
+            'data_hash': data_hash,
+        }
+    )
+    return catalog
+
+
+def _read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _write_chunk(path, prefix, prices):
+    """Write prices to a new chunk directory named by prefix and content; returns its manifest entry"""
+    columns = _column_arrays(prices)
+    chunk_hash = content_hash(PriceArrays(symbol=prices.symbol, **columns))
+    name = f'{prefix}.{chunk_hash[:8]}'
+    _write_columns(os.path.join(path, name), columns)
+    return {
+        'name': name,
+        'first': int(columns['timestamp'][0].astype(np.int64)),
+        'last': int(columns['timestamp'][-1].astype(np.int64)),
+        'bars': len(prices),
+        'hash': chunk_hash,
+    }
+
+
+def _write_chunks(path, prices, keep=()):
+    """Store prices as monthly chunks after the manifest entries in ``keep``; returns the new manifest"""
+    chunks = list(keep)
+    months = np.asarray(prices.timestamp, dtype='datetime64[ns]').astype('datetime64[M]')
+    bounds = np.concatenate([[0], np.flatnonzero(months[1:] != months[:-1]) + 1, [len(months)]])
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if hi > lo:
+            chunks.append(_write_chunk(path, months[lo], PriceArrays(symbol=prices.symbol, **{
+                column: getattr(prices, column)[lo:hi] for column in COLUMNS
+            })))
+    return chunks
+
+
+def _publish(path, chunks):
+    """Replace a series' manifest with chunks, then remove the chunks it no longer lists.
+
+    Chunks are written to new directories beforehand, so swapping the
+    manifest is the one step that changes what readers load.
+    """
+    previous = _read_manifest(path)
+    tmp_path = os.path.join(path, f'.{MANIFEST}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(chunks, f)
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+
+    names = {chunk['name'] for chunk in chunks}
+    for chunk in previous:
+        if chunk['name'] not in names:
+            shutil.rmtree(os.path.join(path, chunk['name']), ignore_errors=True)
+    # Daily columns from before daily series were chunked
+    for column in COLUMNS:
+        legacy = os.path.join(path, f'{column}.npy')
+        if os.path.exists(legacy):
+            os.remove(legacy)
+
+
+def _save_chunks(prices, interval, chunks):
+    """Record chunks in the catalog now and publish them once the surrounding transaction commits.
+
+    A rolled back transaction restores the catalog and leaves the old
+    manifest in place, so the two never disagree.
+    """
+    path = series_dir(prices.symbol, interval)
+    # The series version combines the chunk digests, so an append only hashes the months it rewrote
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{prices.symbol}/{interval}'.encode())
+    for chunk in chunks:
+        digest.update(chunk['hash'].encode())
+    catalog = _update_catalog(
+        prices, interval, digest.hexdigest(),
+        first=np.datetime64(chunks[0]['first'], 'ns') if chunks else None,
+        last=np.datetime64(chunks[-1]['last'], 'ns') if chunks else None,
+        bar_count=sum(chunk['bars'] for chunk in chunks),
+    )
+    transaction.on_commit(functools.partial(_publish, path, chunks))
+    logger.info(f"Stored {len(prices)} {interval} bars for {prices.symbol} in {path} ({len(chunks)} chunks)")
+    return catalog
+
+
+def write_series(prices, interval=DAILY):
+    """Replace the stored history for ``prices.symbol`` at one interval and update the catalog.
+
+    Daily bars are one chunk; intraday bars one chunk per month.
+    """
+    interval = normalize_interval(interval)
+    path = series_dir(prices.symbol, interval)
+    os.makedirs(path, exist_ok=True)
+    if interval != DAILY:
+        return _save_chunks(prices, interval, _write_chunks(path, prices))
+    return _save_chunks(prices, interval, [_write_chunk(path, DAILY, prices)] if len(prices) else [])
+
+
+def append_series(prices, interval=DAILY):
+    """Merge new bars onto the end of a symbol's stored history.
+
+    Stored bars at or after the first new timestamp are replaced, so a delta
+    download that overlaps the last stored bar corrects it instead of
+    duplicating it. Returns ``(catalog, added, replaced)``.
+    """
+    interval = normalize_interval(interval)
+    if interval != DAILY:
+        return _append_chunked(prices, interval)
+
+    existing = load_series(prices.symbol)
+    if existing is None or len(existing) == 0:
+        return write_series(prices), len(prices), 0
+    if len(prices) == 0:
+        return PriceSeries.objects.get(symbol=prices.symbol, interval=interval), 0, 0
+
+    cut = int(np.searchsorted(existing.timestamp, prices.timestamp[0], side='left'))
+    replaced = len(existing) - cut
+    merged = PriceArrays(symbol=prices.symbol, **{
+        column: np.concatenate([getattr(existing, column)[:cut], getattr(prices, column)])
+        for column in COLUMNS
+    })
+    catalog = write_series(merged)
+    return catalog, max(len(prices) - replaced, 0), replaced
+
+
+def _append_chunked(prices, interval):
+    """append_series() for chunked intervals: only the months from the first new bar on are rewritten"""
+    chunks = _read_manifest(series_dir(prices.symbol, interval))
+    if not chunks:
+        return write_series(prices, interval), len(prices), 0
+    if len(prices) == 0:
+        return PriceSeries.objects.get(symbol=prices.symbol, interval=interval), 0, 0
+
+    first_new = int(np.datetime64(prices.timestamp[0], 'ns').astype(np.int64))
+    month = str(np.datetime64(first_new, 'ns').astype('datetime64[M]'))
+    # Chunks of earlier months stay as they are
+    keep = [chunk for chunk in chunks if chunk['name'].split('.')[0] < month]
+    rewrite = chunks[len(keep):]
+
+    replaced = 0
+    head = None
+    if rewrite:
+        existing = load_series(prices.symbol, np.datetime64(rewrite[0]['first'], 'ns'), interval=interval)
+        cut = int(np.searchsorted(existing.timestamp, prices.timestamp[0], side='left'))
+        replaced = len(existing) - cut
+        head = {column: getattr(existing, column)[:cut] for column in COLUMNS}
+    merged = prices if head is None else PriceArrays(symbol=prices.symbol, **{
+        column: np.concatenate([head[column], getattr(prices, column)]) for column in COLUMNS
+    })
+    path = series_dir(prices.symbol, interval)
+    catalog = _save_chunks(merged, interval, _write_chunks(path, merged, keep))
+    return catalog, max(len(prices) - replaced, 0), replaced
+
+
+def _legacy_daily(symbol):
+    """True if a symbol's daily columns are in the layout from before daily series were chunked"""
+    return os.path.exists(os.path.join(symbol_dir(symbol), 'timestamp.npy'))
+
+
+def has_series(symbol, interval=DAILY):
+    interval = normalize_interval(interval)
+    if os.path.exists(os.path.join(series_dir(symbol, interval), MANIFEST)):
+        return True
+    return interval == DAILY and _legacy_daily(symbol)
+
+
+def _bounds(timestamps, start, end):
+    lo = 0 if start is None else int(np.searchsorted(timestamps, np.datetime64(pd.Timestamp(start), 'ns'), side='left'))
+    hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, np.datetime64(pd.Timestamp(end), 'ns'), side='right'))
+    return lo, hi
+
+
+def load_series(symbol, start=None, end=None, interval=DAILY):
+    """Load the [start, end] slice of a symbol's history as memory-mapped arrays.
+
+    Intraday ranges spanning several monthly chunks are concatenated, so only
+    the requested range is ever copied into memory; a daily series is a
+    single chunk and never copied. Returns None if the
+    symbol has never been stored at this interval.
+    """
+    symbol = normalize_symbol(symbol)
+    interval = normalize_interval(interval)
+    if not has_series(symbol, interval):
+        return None
+    path = series_dir(symbol, interval)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        columns = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r') for column in COLUMNS}
+        lo, hi = _bounds(columns['timestamp'], start, end)
+        return PriceArrays(symbol=symbol, **{column: values[lo:hi] for column, values in columns.items()})
+
+    try:
+        return _load_chunks(symbol, path, start, end)
+    except FileNotFoundError:
+        # A writer swapped the manifest and removed the chunks it had listed in between; read the new one
+        return _load_chunks(symbol, path, start, end)
+
+
+def _load_chunks(symbol, path, start, end):
+    lo_ns = None if start is None else int(np.datetime64(pd.Timestamp(start), 'ns').astype(np.int64))
+    hi_ns = None if end is None else int(np.datetime64(pd.Timestamp(end), 'ns').astype(np.int64))
+
+    parts = []
+    for chunk in _read_manifest(path):
+        if (lo_ns is not None and chunk['last'] < lo_ns) or (hi_ns is not None and chunk['first'] > hi_ns):
+            continue
+        columns = {
+            column: np.load(os.path.join(path, chunk['name'], f'{column}.npy'), mmap_mode='r')
+            for column in COLUMNS
+        }
+        lo, hi = _bounds(columns['timestamp'], start, end)
+        parts.append({column: values[lo:hi] for column, values in columns.items()})
+
+    if len(parts) == 1:
+        return PriceArrays(symbol=symbol, **parts[0])
+    if not parts:
+        return PriceArrays(symbol=symbol, timestamp=np.empty(0, dtype='datetime64[ns]'),
+                           **{column: np.empty(0) for column in PRICE_COLUMNS})
+    return PriceArrays(symbol=symbol, **{column: np.concatenate([part[column] for part in parts]) for column in COLUMNS})
+
+
+def load_matrix(symbols, start=None, end=None, column='close'):
+    """Load one column for many symbols as a (bars x assets) matrix.
+
+    Rows are the timestamps every symbol has a bar for. Returns
+    ``(timestamps, matrix, missing)`` where missing lists symbols that were
+    never stored.
+    """
+    series = []
+    missing = []
+    for symbol in symbols:
+        prices = load_series(symbol, start, end)
+        if prices is None:
+            missing.append(normalize_symbol(symbol))
+        else:
+            series.append(prices)
+    if not series:
+        return np.empty(0, dtype='datetime64[ns]'), np.empty((0, 0)), missing
+
+    timestamps = series[0].timestamp
+    for prices in series[1:]:
+        timestamps = np.intersect1d(timestamps, prices.timestamp, assume_unique=True)
+
+    matrix = np.empty((len(timestamps), len(series)))
+    for col, prices in enumerate(series):
+        rows = np.searchsorted(prices.timestamp, timestamps)
+        matrix[:, col] = np.asarray(getattr(prices, column))[rows]
+    return np.asarray(timestamps), matrix, missing
@@ -0,0 +1,115 @@
+"""Bulk reads of daily bars from the PriceData table into arrays.
+
+The columnar store (price_store.py) serves every read path, but daily bars
+are also written to the PriceData table, and databases from before the store
+existed only have them there (migration 0011 gives those rows, which had no
+symbol, ``settings.LEGACY_PRICE_SYMBOL``). ``load_table`` reads a symbol's rows straight
+into typed NumPy arrays: one query over the selected columns, fetched from
+the cursor in chunks, with no model instances, no per-row dicts and no
+per-row timezone handling. Where the backend can, the database returns
+timestamps as seconds since the epoch, so every column arrives as a float.
+Other backends use ``values_list`` and convert the datetimes in one
+vectorized call.
+
+``backfill`` copies a symbol's table rows into the store, which bars.py does
+the first time a symbol that is only in the table is read.
+"""
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.models import FloatField, Func
+
+from . import price_store
+from .models import PriceData
+
+logger = logging.getLogger(__name__)
+
+# Rows per fetchmany() call
+FETCH_ROWS = 10000
+
+
+class EpochSeconds(Func):
+    """A DateTimeField as UTC seconds since the epoch, on the databases listed in ``vendors``"""
+    output_field = FloatField()
+    vendors = ('sqlite', 'postgresql')
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="EXTRACT(EPOCH FROM %(expressions)s)::float8", **extra_context)
+
+
+def _queryset(symbol, start, end):
+    queryset = PriceData.objects.filter(symbol=symbol)
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=price_store._aware(start))
+    if end is not None:
+        queryset = queryset.filter(timestamp__lte=price_store._aware(end))
+    return queryset.order_by('timestamp')
+
+
+def _epoch_rows(queryset):
+    """(rows x 6) float64 array of the price columns and epoch seconds, in that order"""
+    # The compiled SQL selects fields before annotations, so the epoch goes last
+    rows = queryset.annotate(epoch=EpochSeconds('timestamp')).values_list(*price_store.PRICE_COLUMNS, 'epoch')
+    sql, params = rows.query.sql_with_params()
+    width = len(price_store.COLUMNS)
+
+    chunks = []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            fetched = cursor.fetchmany(FETCH_ROWS)
+            if not fetched:
+                break
+            flat = itertools.chain.from_iterable(fetched)
+            chunks.append(np.fromiter(flat, dtype=np.float64, count=len(fetched) * width).reshape(len(fetched), width))
+    return np.concatenate(chunks) if chunks else np.empty((0, width))
+
+
+def _value_rows(queryset):
+    """The same through values_list, for databases EpochSeconds doesn't support"""
+    timestamps = []
+    prices = []
+    rows = queryset.values_list('timestamp', *price_store.PRICE_COLUMNS).iterator(chunk_size=FETCH_ROWS)
+    while True:
+        chunk = list(itertools.islice(rows, FETCH_ROWS))
+        if not chunk:
+            break
+        columns = list(zip(*chunk))
+        timestamps.extend(columns[0])
+        prices.append(np.array(columns[1:], dtype=np.float64).T)
+    seconds = pd.to_datetime(timestamps, utc=True).tz_localize(None).values.astype('datetime64[s]').astype(np.float64)
+    if not prices:
+        return np.empty((0, len(price_store.COLUMNS)))
+    return np.column_stack([np.concatenate(prices), seconds])
+
+
+def load_table(symbol, start=None, end=None):
+    """A symbol's daily PriceData rows in [start, end] as PriceArrays, or None if there are none"""
+    symbol = price_store.normalize_symbol(symbol)
+    queryset = _queryset(symbol, start, end)
+    rows = _epoch_rows(queryset) if connection.vendor in EpochSeconds.vendors else _value_rows(queryset)
+    if len(rows) == 0:
+        return None
+
+    # Bars are stamped on whole seconds; rounding drops the epoch arithmetic's last bits
+    timestamp = (np.round(rows[:, -1]).astype(np.int64) * 10**9).astype('datetime64[ns]')
+    return price_store.PriceArrays(symbol, timestamp, *(np.ascontiguousarray(rows[:, i]) for i in range(5)))
+
+
+def backfill(symbol):
+    """Copy a symbol's table rows into the columnar store if it has none there; returns the bars copied"""
+    symbol = price_store.normalize_symbol(symbol)
+    if price_store.has_series(symbol):
+        return 0
+    prices = load_table(symbol)
+    if prices is None:
+        return 0
+    price_store.write_series(prices)
+    logger.info(f"Copied {len(prices)} {symbol} bars from the PriceData table into the price store")
+    return len(prices)
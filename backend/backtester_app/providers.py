@@ -0,0 +1,261 @@
+"""Market data providers.
+
+A provider turns ``(symbol, start, end, interval)`` into bars as PriceArrays
+(or None when it has nothing for the symbol). ``end`` is exclusive, as in
+yfinance, and intervals are the names in price_store.INTERVALS, which are also
+yfinance's. The ingest path asks ``get_provider()`` for the backend named by
+``settings.PRICE_PROVIDER``:
+
+- ``yfinance``: downloads from Yahoo Finance (the default)
+- ``local``: reads ``<SYMBOL>.parquet`` or ``<SYMBOL>.csv`` files from
+  ``settings.LOCAL_PRICE_DIR``, for air-gapped machines
+- ``synthetic``: a deterministic random walk per symbol, for tests and
+  benchmarks
+"""
+import logging
+import math
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from . import bars, price_store
+from .price_store import DAILY
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = {}
+
+
+def register(cls):
+    PROVIDERS[cls.name] = cls
+    return cls
+
+
+def get_provider(name=None):
+    """Instantiate a provider by name, defaulting to settings.PRICE_PROVIDER"""
+    name = name or settings.PRICE_PROVIDER
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown price provider: {name}. Available: {', '.join(PROVIDERS)}")
+
+
+def _date_range(start, end):
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    return start, end
+
+
+class PriceProvider:
+    name = None
+
+    # Symbols per request in download_many
+    batch_size = 100
+
+    def download(self, symbol, start, end, interval=DAILY):
+        """Bars for ``start <= timestamp < end`` as PriceArrays, or None"""
+        raise NotImplementedError
+
+    def download_many(self, symbols, start, end, interval=DAILY):
+        """Bars for several symbols over one date range: {symbol: PriceArrays}, omitting empty ones"""
+        results = {}
+        for symbol in symbols:
+            prices = self.download(symbol, start, end, interval)
+            if prices is not None and len(prices):
+                results[prices.symbol] = prices
+        return results
+
+
+@register
+class YFinanceProvider(PriceProvider):
+    """Yahoo Finance through yfinance.
+
+    yfinance keeps one process-wide curl_cffi session impersonating Chrome,
+    with a cookie and crumb shared (under a lock) by every thread, so pooled
+    connections and keep-alive come from that session. Concurrent downloads
+    are bounded by ingest holding a concurrency.download_slot().
+    """
+    name = 'yfinance'
+
+    def download(self, symbol, start, end, interval=DAILY):
+        import yfinance as yf
+
+        df = yf.download(symbol, start=start, end=end, interval=interval, progress=False)
+        if df is None or df.empty:
+            return None
+        return price_store.frame_to_arrays(symbol, df)
+
+    def download_many(self, symbols, start, end, interval=DAILY):
+        """One grouped yf.download per batch; the (Price, Ticker) columns are split per symbol"""
+        import yfinance as yf
+
+        results = {}
+        for i in range(0, len(symbols), self.batch_size):
+            batch = list(symbols[i:i + self.batch_size])
+            df = yf.download(batch, start=start, end=end, interval=interval, group_by='column', threads=True, progress=False)
+            if df is None or df.empty:
+                continue
+            for symbol in batch:
+                try:
+                    prices = price_store.frame_to_arrays(symbol, df)
+                except KeyError:
+                    logger.warning(f"No columns for {symbol} in the grouped download")
+                    continue
+                if len(prices):
+                    results[symbol] = prices
+        return results
+
+
+@register
+class LocalFileProvider(PriceProvider):
+    """Reads one file per symbol and interval from a directory.
+
+    Daily bars are read from ``<SYMBOL>.csv`` and intraday bars from
+    ``<SYMBOL>_<interval>.csv`` (or ``.parquet``). Files need a date column (``Date`` or ``timestamp``) or a date index and
+    Open/High/Low/Close/Volume columns in any case. Parquet files need pyarrow
+    or fastparquet installed.
+    """
+    name = 'local'
+    EXTENSIONS = ('.parquet', '.csv')
+
+    def __init__(self, root=None):
+        self.root = str(root or settings.LOCAL_PRICE_DIR)
+
+    def path_for(self, symbol, interval=DAILY):
+        stem = symbol if interval == DAILY else f'{symbol}_{interval}'
+        for extension in self.EXTENSIONS:
+            path = os.path.join(self.root, f'{stem}{extension}')
+            if os.path.exists(path):
+                return path
+        return None
+
+    def read_frame(self, path):
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path)
+
+        date_column = next((c for c in df.columns if str(c).lower() in ('date', 'datetime', 'timestamp')), None)
+        if date_column is not None:
+            df = df.set_index(date_column)
+        df.index = pd.to_datetime(df.index, utc=True)
+        return df.rename(columns={c: str(c).capitalize() for c in df.columns})
+
+    def download(self, symbol, start, end, interval=DAILY):
+        symbol = price_store.normalize_symbol(symbol)
+        path = self.path_for(symbol, interval)
+        if path is None:
+            logger.warning(f"No local {interval} price file for {symbol} in {self.root}")
+            return None
+
+        df = self.read_frame(path)
+        if 'Volume' not in df.columns:
+            df['Volume'] = 0.0
+        prices = price_store.frame_to_arrays(symbol, df)
+        return _slice(prices, *_date_range(start, end))
+
+
+@register
+class SyntheticProvider(PriceProvider):
+    """Geometric random walk per symbol on business days.
+
+    The path is generated from a fixed origin with a seed derived from the
+    symbol, so any date range of a symbol always gets the same bars and an
+    incremental refresh lines up with what was stored before.
+
+    Intraday bars are one-minute steps over a 09:30-16:00 session, drawn per
+    day as a Brownian bridge from the day's open to its close, so they
+    resample back to exactly the daily opens and closes.
+    """
+    name = 'synthetic'
+    ORIGIN = '2000-01-03'
+    DRIFT = 0.0003
+    VOLATILITY = 0.015
+    SESSION_START_MINUTE = 9 * 60 + 30
+    SESSION_MINUTES = 390
+
+    def __init__(self, seed=None):
+        self.seed = settings.SYNTHETIC_SEED if seed is None else seed
+
+    def generate(self, symbol, end):
+        days = np.arange(np.datetime64(self.ORIGIN, 'D'), np.datetime64(pd.Timestamp(end), 'D'))
+        timestamps = days[np.is_busday(days)]
+        n = len(timestamps)
+        # One stream per field, so the first k bars don't depend on how many are generated
+        returns, gaps, highs, lows, volumes = (
+            np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), field]) for field in range(5)
+        )
+
+        close = 100 * np.exp(np.cumsum(returns.normal(self.DRIFT, self.VOLATILITY, n)))
+        open_ = np.concatenate([close[:1], close[:-1]]) * (1 + gaps.normal(0, self.VOLATILITY / 4, n))
+        high = np.maximum(open_, close) * (1 + np.abs(highs.normal(0, self.VOLATILITY / 2, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(lows.normal(0, self.VOLATILITY / 2, n)))
+        volume = np.round(volumes.lognormal(13, 0.4, n))
+
+        return price_store.PriceArrays(
+            symbol=symbol, timestamp=timestamps.astype('datetime64[ns]'),
+            open=open_, high=high, low=low, close=close, volume=volume,
+        )
+
+    def generate_minutes(self, daily):
+        """One-minute bars for each day of a daily series"""
+        n = self.SESSION_MINUTES
+        days = daily.timestamp.astype('datetime64[D]')
+        steps = np.empty((len(days), n))
+        wicks = np.empty((len(days), n))
+        weights = np.empty((len(days), n))
+        crc = zlib.crc32(daily.symbol.encode())
+        for row, day in enumerate((days - np.datetime64(self.ORIGIN, 'D')).astype(np.int64).tolist()):
+            # A stream per day, so a day's bars don't depend on the range requested
+            rng = np.random.default_rng([self.seed, crc, 5, day])
+            steps[row] = rng.standard_normal(n)
+            wicks[row] = np.abs(rng.standard_normal(n))
+            weights[row] = rng.gamma(2.0, size=n)
+
+        step_volatility = self.VOLATILITY / math.sqrt(n)
+        walk = np.cumsum(steps, axis=1) * step_volatility
+        t = np.arange(1, n + 1) / n
+        log_open = np.log(daily.open)[:, None]
+        log_close = np.log(daily.close)[:, None]
+        close = np.exp(log_open + t * (log_close - log_open) + walk - t * walk[:, -1:])
+        open_ = np.concatenate([daily.open[:, None], close[:, :-1]], axis=1)
+        high = np.maximum(open_, close) * (1 + wicks * step_volatility / 2)
+        low = np.minimum(open_, close) * (1 - wicks * step_volatility / 2)
+        volume = daily.volume[:, None] * weights / weights.sum(axis=1, keepdims=True)
+
+        minutes = np.arange(self.SESSION_START_MINUTE, self.SESSION_START_MINUTE + n).astype('timedelta64[m]')
+        timestamps = days.astype('datetime64[m]')[:, None] + minutes
+        return price_store.PriceArrays(
+            symbol=daily.symbol, timestamp=timestamps.ravel().astype('datetime64[ns]'),
+            open=open_.ravel(), high=high.ravel(), low=low.ravel(), close=close.ravel(), volume=volume.ravel(),
+        )
+
+    def download(self, symbol, start, end, interval=DAILY):
+        symbol = price_store.normalize_symbol(symbol)
+        start, end = _date_range(start, end)
+        end = end if end is not None else pd.Timestamp.now().normalize()
+        if interval == DAILY:
+            return _slice(self.generate(symbol, end), start, end)
+
+        # Only the days in range need minutes generated
+        daily = _slice(self.generate(symbol, end), start.normalize() if start is not None else None, end)
+        if daily is None:
+            return None
+        minutes = _slice(self.generate_minutes(daily), start, end)
+        if minutes is None or interval == '1m':
+            return minutes
+        return bars.resample(minutes, interval)
+
+
+def _slice(prices, start, end):
+    """Bars with start <= timestamp < end, or None if there are none"""
+    lo = 0 if start is None else int(np.searchsorted(prices.timestamp, np.datetime64(start, 'ns'), side='left'))
+    hi = len(prices) if end is None else int(np.searchsorted(prices.timestamp, np.datetime64(end, 'ns'), side='left'))
+    if hi <= lo:
+        return None
+    return price_store.PriceArrays(symbol=prices.symbol, **{
+        column: getattr(prices, column)[lo:hi] for column in price_store.COLUMNS
+    })
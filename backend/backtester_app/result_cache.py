@@ -0,0 +1,34 @@
+"""Content-addressed cache for backtest and benchmark responses.
+
+Keys hash the symbol, the stored series' content hash (see
+``price_store.data_version``), the indicator and its parsed parameters, and
+the date range. Re-fetching a symbol changes its content hash, so entries
+computed from older data are simply never looked up again and age out of the
+size-bounded ``results`` cache.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'results'
+
+
+def make_key(kind, symbol, data_version, **parts):
+    """Stable key for a response of ``kind`` computed from one version of a symbol's data"""
+    payload = json.dumps({'symbol': symbol, 'data_version': data_version, **parts}, sort_keys=True, default=str)
+    return f"{kind}:{hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()}"
+
+
+def get(key):
+    value = caches[CACHE_ALIAS].get(key)
+    if value is not None:
+        logger.info(f"Result cache hit for {key}")
+    return value
+
+
+def set(key, value):
+    caches[CACHE_ALIAS].set(key, value)
@@ -1,14 +1,62 @@
+import numpy as np
 from rest_framework import serializers
-from .models import PriceData, BacktestResult
+from . import bars, codec
+from .models import PriceData, BacktestResult, StrategyMonitor
+
+# How compact (?compact=1) curves are encoded: base64 of zlib-compressed .npy bytes
+COMPACT_ENCODING = 'npy+zlib+base64'
 
 class PriceDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = PriceData
-        fields = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        fields = ['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+class BacktestSummarySerializer(serializers.ModelSerializer):
+    """A stored result without its curves, for listing history"""
+    class Meta:
+        model = BacktestResult
+        fields = ['id', 'created_at', 'symbol', 'interval', 'indicator', 'short_window', 'long_window',
+                 'start_date', 'end_date', 'total_return', 'max_drawdown', 'sharpe_ratio', 'metrics', 'costs']
 
 class BacktestResultSerializer(serializers.ModelSerializer):
+    """A stored result with its curves decoded to lists, or left packed with context={'compact': True}"""
+    equity_curve = serializers.SerializerMethodField()
+    portfolio_dates = serializers.SerializerMethodField()
+    trades = serializers.SerializerMethodField()
+
     class Meta:
         model = BacktestResult
-        fields = ['id', 'created_at', 'indicator', 'short_window', 'long_window',
+        fields = ['id', 'created_at', 'symbol', 'interval', 'indicator', 'short_window', 'long_window',
                  'start_date', 'end_date', 'total_return', 'max_drawdown',
-                 'sharpe_ratio', 'equity_curve', 'trades'] 
\ No newline at end of file
+                 'sharpe_ratio', 'metrics', 'costs', 'equity_curve', 'portfolio_dates', 'trades']
+
+    def compact(self):
+        return self.context.get('compact', False)
+
+    def get_equity_curve(self, obj):
+        if self.compact():
+            return {'encoding': COMPACT_ENCODING, 'data': codec.to_base64(obj.equity_curve)}
+        return codec.decode_curve(obj.equity_curve).tolist()
+
+    def get_portfolio_dates(self, obj):
+        if obj.curve_dates is None:
+            return []
+        if self.compact():
+            # Gaps between consecutive dates in `unit`, the first counted from midnight of start
+            return {'encoding': COMPACT_ENCODING, 'start': obj.curve_start, 'unit': bars.date_unit(obj.interval),
+                    'calendar': obj.calendar, 'data': codec.to_base64(obj.curve_dates)}
+        unit = bars.date_unit(obj.interval)
+        return np.datetime_as_string(codec.decode_dates(obj.curve_start, obj.curve_dates, unit), unit=unit).tolist()
+
+    def get_trades(self, obj):
+        if self.compact():
+            return {'encoding': COMPACT_ENCODING, 'data': codec.to_base64(obj.trades)}
+        return codec.decode_trades(obj.trades, bars.date_unit(obj.interval))
+
+class StrategyMonitorSerializer(serializers.ModelSerializer):
+    """A saved strategy's latest position and figures, without its checkpoint"""
+    class Meta:
+        model = StrategyMonitor
+        fields = ['id', 'created_at', 'updated_at', 'symbol', 'interval', 'indicator', 'params', 'costs',
+                 'start_date', 'last_timestamp', 'bar_count', 'position', 'portfolio_value',
+                 'total_return', 'max_drawdown', 'sharpe_ratio']
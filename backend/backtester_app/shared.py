@@ -0,0 +1,116 @@
+"""Arrays handed to worker processes through shared memory instead of pickles.
+
+``SharedArrays`` copies a set of named arrays once into a single
+``multiprocessing.shared_memory`` block. Its ``handle`` is a small picklable
+description of the block (its name and each array's key, dtype, shape and
+offset) that goes to the workers in place of the arrays. A worker's
+``attach`` maps the block and returns read-only views into it, so however
+many workers a pool starts, the data exists once in physical memory.
+
+The process that created the block owns it: use ``SharedArrays`` as a
+context manager around the pool (or call ``close``) and the block is
+unlinked when the pool is done. A worker keeps its mapping until it calls
+``detach`` or exits; the block's pages are freed once the owner has
+unlinked it and every worker has let go.
+
+Pool workers are spawned fresh interpreters that import this module without
+``django.setup()``, so it must not import the models, even indirectly: the
+price_store helpers import it only when they are called.
+"""
+import logging
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Every array starts on a cache line
+ALIGN = 64
+
+Handle = namedtuple('Handle', 'name nbytes layout')
+
+# Blocks this process has attached to, by name: (SharedMemory, {key: view})
+_attached = {}
+
+
+class SharedArrays:
+    """Named arrays copied into one shared memory block owned by this process"""
+
+    def __init__(self, arrays):
+        arrays = {key: np.ascontiguousarray(values) for key, values in arrays.items() if values is not None}
+        layout = []
+        offset = 0
+        for key, values in arrays.items():
+            layout.append((key, values.dtype.str, values.shape, offset))
+            offset += -(-values.nbytes // ALIGN) * ALIGN
+
+        # A zero-length block can't be created
+        self._memory = shared_memory.SharedMemory(create=True, size=max(offset, ALIGN))
+        for (key, dtype, shape, start), values in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype, buffer=self._memory.buf, offset=start)[...] = values
+        self.handle = Handle(self._memory.name, offset, tuple(layout))
+        logger.info(f"Shared {len(layout)} arrays ({offset / 2**20:.1f} MiB) in {self._memory.name}")
+
+    def close(self):
+        """Unlink the block; workers still attached keep their mapping until they detach"""
+        if self._memory is None:
+            return
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def share_prices(series, columns=None):
+    """SharedArrays of several symbols' PriceArrays, keyed by (symbol, column)"""
+    from .price_store import COLUMNS
+
+    columns = columns or COLUMNS
+    return SharedArrays({
+        (prices.symbol, column): getattr(prices, column) for prices in series for column in columns
+    })
+
+
+def attach(handle):
+    """Read-only views of a handle's arrays, {key: ndarray}; attaching twice reuses the mapping"""
+    if handle.name not in _attached:
+        memory = shared_memory.SharedMemory(name=handle.name)
+        views = {}
+        for key, dtype, shape, start in handle.layout:
+            view = np.ndarray(shape, dtype, buffer=memory.buf, offset=start)
+            view.flags.writeable = False
+            views[key] = view
+        _attached[handle.name] = (memory, views)
+    return _attached[handle.name][1]
+
+
+def detach(handle):
+    """Drop this process's mapping of a block; views from attach() must no longer be used"""
+    memory, views = _attached.pop(handle.name, (None, None))
+    if memory is None:
+        return
+    views.clear()
+    try:
+        memory.close()
+    except BufferError:
+        # Someone still holds a view; the mapping goes when they do
+        logger.warning(f"Views of {handle.name} are still in use; leaving it mapped")
+
+
+def attached_prices(handle):
+    """{symbol: PriceArrays} over the views of a block made by share_prices"""
+    from .price_store import COLUMNS, PriceArrays
+
+    columns = {}
+    for (symbol, column), values in attach(handle).items():
+        columns.setdefault(symbol, {})[column] = values
+    return {
+        symbol: PriceArrays(symbol, **{column: values.get(column) for column in COLUMNS})
+        for symbol, values in columns.items()
+    }
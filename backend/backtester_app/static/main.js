@@ -174,6 +174,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 },
                 body: JSON.stringify({
                     ...strategy.params,
+                    symbol: ticker,
                     start_date: startDate,
                     end_date: endDate
                 })
@@ -250,14 +251,14 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('maxDrawdown').textContent = `${(data.max_drawdown * 100).toFixed(2)}%`;
         document.getElementById('sharpeRatio').textContent = data.sharpe_ratio.toFixed(2);
 
-        // Parse portfolio value, dates, and trades from JSON strings
-        const portfolioValue = JSON.parse(data.equity_curve);
-        const trades = JSON.parse(data.trades);
+        // The backtest API returns portfolio value, dates, and trades as arrays
+        const portfolioValue = data.equity_curve;
+        const trades = data.trades;
 
         // Ensure we get the portfolio dates
         let portfolioDates = null;
-        if (data.portfolio_dates) {
-            portfolioDates = JSON.parse(data.portfolio_dates);
+        if (data.portfolio_dates && data.portfolio_dates.length) {
+            portfolioDates = data.portfolio_dates;
             console.log("Portfolio dates loaded:", portfolioDates.length, "dates");
         } else {
             console.warn("No portfolio dates available in data");
@@ -273,10 +274,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 document.getElementById('spyDrawdown').textContent = `${(spyData.max_drawdown * 100).toFixed(2)}%`;
                 document.getElementById('spySharpe').textContent = spyData.sharpe_ratio.toFixed(2);
 
-                // Parse SPY portfolio value and dates for chart
-                spyPortfolioValue = JSON.parse(spyData.equity_curve);
+                // SPY portfolio value and dates for chart
+                spyPortfolioValue = spyData.equity_curve;
                 if (spyData.portfolio_dates) {
-                    spyDates = JSON.parse(spyData.portfolio_dates);
+                    spyDates = spyData.portfolio_dates;
                 }
                 console.log("SPY data loaded for comparison, portfolio values:", spyPortfolioValue.length);
             } catch (e) {
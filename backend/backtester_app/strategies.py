@@ -0,0 +1,288 @@
+"""Strategy registry.
+
+A strategy declares its parameters, its warmup period, the indicator arrays it
+needs and a vectorized ``signals()`` that turns those arrays into a position
+series (-1, 0 or 1 per bar), plus ``stream()``, the same signal as a
+streaming.py object updated one bar at a time. Indicator arrays are requested by key and
+computed through an IndicatorCache, which batches every key of the same kind
+into one kernel call, so a sweep or a multi-strategy run computes each
+indicator variant once.
+"""
+import numpy as np
+
+from . import indicators, streaming
+
+STRATEGIES = {}
+
+
+def register(cls):
+    STRATEGIES[cls.name] = cls()
+    return cls
+
+
+def get_strategy(name):
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f'Unsupported indicator: {name}')
+
+
+def available():
+    """Registry listing for the indicators endpoint"""
+    return [strategy.describe() for strategy in STRATEGIES.values()]
+
+
+def _bollinger_batch(close, keys):
+    windows = sorted({window for window, _ in keys})
+    middle = indicators.rolling_mean(close, windows)
+    std = indicators.rolling_std(close, windows)
+    rows = {window: row for row, window in enumerate(windows)}
+    return [
+        (middle[rows[window]] + std[rows[window]] * num_std_dev,
+         middle[rows[window]] - std[rows[window]] * num_std_dev)
+        for window, num_std_dev in keys
+    ]
+
+
+def _macd_batch(close, keys):
+    fast, slow, signal = zip(*keys)
+    macd_lines, signal_lines = indicators.macd(close, fast, slow, signal)
+    return list(zip(macd_lines, signal_lines))
+
+
+# Indicator kinds: each kernel takes the close array and a list of argument
+# tuples and returns one value per tuple
+KERNELS = {
+    'sma': lambda close, keys: list(indicators.rolling_mean(close, [window for window, in keys])),
+    'rsi': lambda close, keys: list(indicators.rsi(close, [period for period, in keys])),
+    'bbands': _bollinger_batch,
+    'macd': _macd_batch,
+}
+
+# Kinds whose value at a bar depends only on a trailing window of bars: past the
+# leading bars this gives (still filling the window, or for RSI taking a zero
+# change on the first bar), an indicator over a slice is that slice of the same
+# indicator over the whole series. EMAs depend on where the series starts.
+WINDOWED = {
+    'sma': lambda window: window - 1,
+    'rsi': lambda period: period,
+    'bbands': lambda window, num_std_dev: window - 1,
+}
+
+
+class IndicatorCache:
+    """Indicator arrays for one close series, keyed by (kind, *args).
+
+    ``close`` may also be a (bars x assets) matrix, as in portfolio.py: every
+    kernel then runs over all assets at once and each array has its shape.
+
+    With a ``store`` (an indicator_store.SeriesIndicators for the same
+    series), keys are looked up there before being computed, and computed
+    ones are added to it.
+    """
+
+    def __init__(self, close, store=None):
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.store = store
+        # Keys computed here rather than found in the store
+        self.computed = 0
+        self._arrays = {}
+
+    def require(self, keys):
+        """Compute every missing key, one kernel call per indicator kind"""
+        missing = {}
+        for key in keys:
+            if key in self._arrays:
+                continue
+            stored = self.store.get(key) if self.store is not None else None
+            if stored is not None:
+                self._arrays[key] = stored
+            else:
+                missing.setdefault(key[0], []).append(key[1:])
+        for kind, args in missing.items():
+            args = list(dict.fromkeys(args))
+            for arg, values in zip(args, KERNELS[kind](self.close, args)):
+                self._arrays[(kind,) + arg] = values
+                self.computed += 1
+                if self.store is not None:
+                    self.store.put((kind,) + arg, values)
+
+    def __getitem__(self, key):
+        if key not in self._arrays:
+            self.require([key])
+        return self._arrays[key]
+
+    def __len__(self):
+        return len(self._arrays)
+
+
+class Strategy:
+    name = None
+    label = ''
+    # Parameter name -> (type, default)
+    params = {}
+
+    def parse_params(self, data):
+        """Pick this strategy's parameters out of request data, applying defaults"""
+        return {name: cast(data.get(name, default)) for name, (cast, default) in self.params.items()}
+
+    def valid_params(self, params):
+        """Reject parameter combinations that cannot produce a meaningful strategy"""
+        return True
+
+    def check_data(self, n_bars, params):
+        """Raise ValueError if n_bars is too short for the strategy"""
+
+    def warmup(self, params):
+        raise NotImplementedError
+
+    def indicator_keys(self, params):
+        """IndicatorCache keys that signals() reads"""
+        raise NotImplementedError
+
+    def signals(self, arrays, params):
+        """Position per bar (-1, 0 or 1) as a float array shaped like arrays.close"""
+        raise NotImplementedError
+
+    def stream(self, params):
+        """A streaming object whose update(close) returns the position signals() gives that bar"""
+        raise NotImplementedError
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'label': self.label,
+            'params': {name: default for name, (_, default) in self.params.items()},
+        }
+
+
+def _threshold_positions(buy, sell):
+    """1 where buy, -1 where sell (sell wins ties), 0 otherwise"""
+    position = np.zeros(buy.shape)
+    position[buy] = 1
+    position[sell] = -1
+    return position
+
+
+@register
+class SMACrossStrategy(Strategy):
+    name = 'SMA'
+    label = 'Moving average crossover'
+    params = {'short_window': (int, 50), 'long_window': (int, 200)}
+
+    def valid_params(self, params):
+        return 0 < params['short_window'] < params['long_window']
+
+    def check_data(self, n_bars, params):
+        # Reduce from 1.5 to 1.1 to make it work with less data
+        min_required_points = params['long_window'] * 1.1
+        if n_bars < min_required_points:
+            raise ValueError(f"Insufficient data points for reliable analysis. This strategy requires at least {int(min_required_points)} days of data, but only {n_bars} days are available in the selected date range. Please extend your date range or choose a strategy with a shorter lookback period.")
+
+    def warmup(self, params):
+        return params['long_window']
+
+    def indicator_keys(self, params):
+        return [('sma', params['short_window']), ('sma', params['long_window'])]
+
+    def signals(self, arrays, params):
+        short_ma = arrays[('sma', params['short_window'])]
+        long_ma = arrays[('sma', params['long_window'])]
+
+        # Buy when the short MA crosses above the long MA, sell when it crosses below
+        curr_diff = short_ma - long_ma
+        prev_diff = np.empty_like(curr_diff)
+        prev_diff[0] = np.nan
+        prev_diff[1:] = curr_diff[:-1]
+        with np.errstate(invalid='ignore'):
+            signal = _threshold_positions((prev_diff < 0) & (curr_diff > 0), (prev_diff > 0) & (curr_diff < 0))
+
+        # Maintain the position until the next crossover (forward fill non-zero signals)
+        bars = np.arange(len(signal)).reshape((-1,) + (1,) * (signal.ndim - 1))
+        last_signal = np.maximum.accumulate(np.where(signal != 0, bars, 0), axis=0)
+        position = np.take_along_axis(signal, last_signal, axis=0)
+
+        # Set the position up to the first valid bar from the MAs there (per asset for a matrix)
+        valid = ~np.isnan(short_ma) & ~np.isnan(long_ma)
+        first_valid = np.expand_dims(np.argmax(valid, axis=0), 0)
+        opening = np.where(np.take_along_axis(short_ma, first_valid, axis=0)
+                           > np.take_along_axis(long_ma, first_valid, axis=0), 1.0, 0.0)
+        return np.where((bars <= first_valid) & valid.any(axis=0), opening, position)
+
+    def stream(self, params):
+        return streaming.SMACrossSignal(params['short_window'], params['long_window'])
+
+
+@register
+class RSIStrategy(Strategy):
+    name = 'RSI'
+    label = 'RSI reversal'
+    params = {'rsi_period': (int, 14), 'overbought': (int, 70), 'oversold': (int, 30)}
+
+    def valid_params(self, params):
+        return params['rsi_period'] > 0 and params['oversold'] < params['overbought']
+
+    def warmup(self, params):
+        return params['rsi_period'] * 3  # Allow enough time for RSI to stabilize
+
+    def indicator_keys(self, params):
+        return [('rsi', params['rsi_period'])]
+
+    def signals(self, arrays, params):
+        rsi = arrays[('rsi', params['rsi_period'])]
+        # Buy when RSI is oversold, sell when it is overbought
+        with np.errstate(invalid='ignore'):
+            return _threshold_positions(rsi < params['oversold'], rsi > params['overbought'])
+
+    def stream(self, params):
+        return streaming.RSISignal(params['rsi_period'], params['overbought'], params['oversold'])
+
+
+@register
+class MACDStrategy(Strategy):
+    name = 'MACD'
+    label = 'MACD signal line cross'
+    params = {'fast_period': (int, 12), 'slow_period': (int, 26), 'signal_period': (int, 9)}
+
+    def valid_params(self, params):
+        return 0 < params['fast_period'] < params['slow_period'] and params['signal_period'] > 0
+
+    def warmup(self, params):
+        return max(params['fast_period'], params['slow_period'], params['signal_period']) * 3
+
+    def indicator_keys(self, params):
+        return [('macd', params['fast_period'], params['slow_period'], params['signal_period'])]
+
+    def signals(self, arrays, params):
+        macd, signal_line = arrays[self.indicator_keys(params)[0]]
+        # Long while MACD is above its signal line, short while below
+        return _threshold_positions(macd > signal_line, macd < signal_line)
+
+    def stream(self, params):
+        return streaming.MACDSignal(params['fast_period'], params['slow_period'], params['signal_period'])
+
+
+@register
+class BollingerStrategy(Strategy):
+    name = 'BBANDS'
+    label = 'Bollinger band bounce'
+    params = {'window': (int, 20), 'num_std_dev': (float, 2.0)}
+
+    def valid_params(self, params):
+        return params['window'] > 1 and params['num_std_dev'] > 0
+
+    def warmup(self, params):
+        return params['window'] * 3
+
+    def indicator_keys(self, params):
+        return [('bbands', params['window'], params['num_std_dev'])]
+
+    def signals(self, arrays, params):
+        upper_band, lower_band = arrays[self.indicator_keys(params)[0]]
+        close = arrays.close
+        # Buy below the lower band, sell above the upper band
+        with np.errstate(invalid='ignore'):
+            return _threshold_positions(close < lower_band, close > upper_band)
+
+    def stream(self, params):
+        return streaming.BollingerSignal(params['window'], params['num_std_dev'])
@@ -0,0 +1,332 @@
+"""Streaming indicators and strategy runs, updated one bar at a time.
+
+The kernels in indicators.py recompute a whole series; the classes here keep
+just enough state to take the next close in O(1): a ring buffer with running
+sums for rolling means and deviations, numerator and weight for EMAs. They
+reproduce the batch kernels' values (to rounding) and the strategies'
+positions bar for bar, so a run can be checkpointed and carried forward as
+new bars arrive instead of being recomputed over its whole history.
+
+Every class keeps its state in ``__slots__``. ``state()`` turns an object,
+including the indicators nested in it, into plain JSON-compatible values, and
+``restore()`` rebuilds it; a missing value is None rather than NaN so the
+state can be stored in a JSON column.
+"""
+import math
+
+from . import metrics
+
+_CLASSES = {}
+
+
+class Streaming:
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _CLASSES[cls.__name__] = cls
+
+    def state(self):
+        return {'type': type(self).__name__, **{name: _dump(getattr(self, name)) for name in self.__slots__}}
+
+
+def _dump(value):
+    if isinstance(value, Streaming):
+        return value.state()
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def restore(state):
+    """Rebuild a Streaming object from its state()"""
+    cls = _CLASSES[state['type']]
+    obj = cls.__new__(cls)
+    for name in cls.__slots__:
+        value = state[name]
+        setattr(obj, name, restore(value) if isinstance(value, dict) and 'type' in value else value)
+    return obj
+
+
+class RollingWindow(Streaming):
+    """Mean and sample deviation of the last ``window`` values.
+
+    Sums are kept relative to a center so deviations stay small, and are
+    recomputed from the buffer (around a fresh center) once per ``window``
+    updates, so rounding errors can't build up over a long run.
+    """
+    __slots__ = ('window', 'values', 'head', 'center', 'total', 'squares', 'updates')
+
+    def __init__(self, window):
+        self.window = int(window)
+        self.values = []
+        self.head = 0
+        self.center = 0.0
+        self.total = 0.0
+        self.squares = 0.0
+        self.updates = 0
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def update(self, value):
+        value = float(value)
+        if not self.values:
+            self.center = value
+        if self.full:
+            old = self.values[self.head] - self.center
+            self.total -= old
+            self.squares -= old * old
+            self.values[self.head] = value
+            self.head = (self.head + 1) % self.window
+        else:
+            self.values.append(value)
+        deviation = value - self.center
+        self.total += deviation
+        self.squares += deviation * deviation
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resum()
+
+    def _resum(self):
+        self.center = math.fsum(self.values) / len(self.values)
+        deviations = [value - self.center for value in self.values]
+        self.total = math.fsum(deviations)
+        self.squares = math.fsum(deviation * deviation for deviation in deviations)
+
+    def mean(self):
+        if not self.full:
+            return math.nan
+        return self.total / self.window + self.center
+
+    def std(self, ddof=1):
+        if not self.full or self.window <= ddof:
+            return math.nan
+        variance = (self.squares - self.total * self.total / self.window) / (self.window - ddof)
+        return math.sqrt(max(variance, 0.0))
+
+
+class SMA(Streaming):
+    __slots__ = ('window',)
+
+    def __init__(self, window):
+        self.window = RollingWindow(window)
+
+    def update(self, value):
+        self.window.update(value)
+        return self.window.mean()
+
+
+class RSI(Streaming):
+    """indicators.rsi(): simple rolling averages of gains and losses"""
+    __slots__ = ('gains', 'losses', 'previous')
+
+    def __init__(self, period):
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+        self.previous = None
+
+    def update(self, close):
+        # The first bar has no change
+        delta = 0.0 if self.previous is None else close - self.previous
+        self.previous = float(close)
+        self.gains.update(delta if delta > 0 else 0.0)
+        self.losses.update(-delta if delta < 0 else 0.0)
+
+        gain, loss = self.gains.mean(), self.losses.mean()
+        if math.isnan(gain) or math.isnan(loss):
+            return math.nan
+        if loss == 0:
+            return math.nan if gain == 0 else 100.0
+        return 100 - 100 / (1 + gain / loss)
+
+
+class EMA(Streaming):
+    """pandas ewm(span).mean() with adjust=True: a decaying weighted sum over the sum of the weights"""
+    __slots__ = ('decay', 'numerator', 'weight')
+
+    def __init__(self, span):
+        self.decay = 1.0 - 2.0 / (span + 1.0)
+        self.numerator = 0.0
+        self.weight = 0.0
+
+    def update(self, value):
+        self.numerator = value + self.decay * self.numerator
+        self.weight = 1.0 + self.decay * self.weight
+        return self.numerator / self.weight
+
+
+class MACD(Streaming):
+    """MACD line and its signal line, as indicators.macd()"""
+    __slots__ = ('fast', 'slow', 'signal')
+
+    def __init__(self, fast_period, slow_period, signal_period):
+        self.fast = EMA(fast_period)
+        self.slow = EMA(slow_period)
+        self.signal = EMA(signal_period)
+
+    def update(self, close):
+        line = self.fast.update(close) - self.slow.update(close)
+        return line, self.signal.update(line)
+
+
+class Bollinger(Streaming):
+    """Upper and lower bands, as strategies' bbands indicator"""
+    __slots__ = ('window', 'num_std_dev')
+
+    def __init__(self, window, num_std_dev=2.0):
+        self.window = RollingWindow(window)
+        self.num_std_dev = float(num_std_dev)
+
+    def update(self, close):
+        self.window.update(close)
+        middle = self.window.mean()
+        width = self.window.std() * self.num_std_dev
+        return middle + width, middle - width
+
+
+def _threshold_position(buy, sell):
+    """strategies._threshold_positions() for one bar"""
+    if sell:
+        return -1.0
+    return 1.0 if buy else 0.0
+
+
+class SMACrossSignal(Streaming):
+    """SMACrossStrategy.signals(), one bar at a time.
+
+    Positions before the long average is full are reported as 0; the batch
+    version back-fills them, but they fall inside the warmup either way.
+    """
+    __slots__ = ('short', 'long', 'previous_diff', 'position', 'started')
+
+    def __init__(self, short_window, long_window):
+        self.short = SMA(short_window)
+        self.long = SMA(long_window)
+        self.previous_diff = None
+        self.position = 0.0
+        self.started = False
+
+    def update(self, close):
+        short_ma, long_ma = self.short.update(close), self.long.update(close)
+        if math.isnan(short_ma) or math.isnan(long_ma):
+            return 0.0
+        diff = short_ma - long_ma
+        previous, self.previous_diff = self.previous_diff, diff
+
+        if not self.started:
+            # The first valid bar takes the side of the averages; the crossover position starts flat
+            self.started = True
+            return 1.0 if short_ma > long_ma else 0.0
+        if previous < 0 < diff:
+            self.position = 1.0
+        elif previous > 0 > diff:
+            self.position = -1.0
+        return self.position
+
+
+class RSISignal(Streaming):
+    __slots__ = ('rsi', 'overbought', 'oversold')
+
+    def __init__(self, rsi_period, overbought, oversold):
+        self.rsi = RSI(rsi_period)
+        self.overbought = overbought
+        self.oversold = oversold
+
+    def update(self, close):
+        rsi = self.rsi.update(close)
+        return _threshold_position(rsi < self.oversold, rsi > self.overbought)
+
+
+class MACDSignal(Streaming):
+    __slots__ = ('macd',)
+
+    def __init__(self, fast_period, slow_period, signal_period):
+        self.macd = MACD(fast_period, slow_period, signal_period)
+
+    def update(self, close):
+        line, signal = self.macd.update(close)
+        return _threshold_position(line > signal, line < signal)
+
+
+class BollingerSignal(Streaming):
+    __slots__ = ('bands',)
+
+    def __init__(self, window, num_std_dev):
+        self.bands = Bollinger(window, num_std_dev)
+
+    def update(self, close):
+        upper, lower = self.bands.update(close)
+        return _threshold_position(close < lower, close > upper)
+
+
+class StrategyRun(Streaming):
+    """A strategy's position, portfolio value and running metrics, carried forward one bar at a time.
+
+    Matches engine.run_strategy() over the same bars: the run starts after
+    ``warmup`` bars with ``initial_capital``, the position held at the close
+    of a bar earns the next bar's return, and a fixed cost rate (see
+    costs.CostModel.fixed_rate) is charged on every change of position.
+    Sharpe ratio inputs are kept as Welford running moments.
+    """
+    __slots__ = ('signal', 'warmup', 'bars', 'initial_capital', 'cost_rate', 'periods_per_year',
+                 'last_close', 'position', 'value', 'peak', 'max_drawdown', 'count', 'mean', 'm2')
+
+    def __init__(self, signal, warmup, initial_capital, cost_rate=0.0, periods_per_year=metrics.TRADING_DAYS):
+        self.signal = signal
+        self.warmup = int(warmup)
+        self.bars = 0
+        self.initial_capital = float(initial_capital)
+        self.cost_rate = float(cost_rate)
+        self.periods_per_year = periods_per_year
+        self.last_close = None
+        self.position = 0.0
+        self.value = None
+        self.peak = None
+        self.max_drawdown = 0.0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, close):
+        """Take the next close; returns the new position"""
+        close = float(close)
+        position = self.signal.update(close)
+        if self.bars >= self.warmup:
+            if self.bars == self.warmup:
+                # The first bar of the run earns nothing
+                held_return, value, previous_position = 0.0, self.initial_capital, 0.0
+            else:
+                held_return = self.position * (close / self.last_close - 1)
+                value, previous_position = self.value, self.position
+            if self.cost_rate:
+                held_return = (1 + held_return) * (1 - abs(position - previous_position) * self.cost_rate) - 1
+            self.value = value * (1 + held_return)
+            self._record(held_return)
+
+        self.position = position
+        self.last_close = close
+        self.bars += 1
+        return position
+
+    def _record(self, held_return):
+        self.count += 1
+        delta = held_return - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (held_return - self.mean)
+        self.peak = self.value if self.peak is None else max(self.peak, self.value)
+        self.max_drawdown = min(self.max_drawdown, self.value / self.peak - 1)
+
+    def metrics(self):
+        """Total return, max drawdown and Sharpe ratio so far, as engine.performance_metrics()"""
+        if self.count == 0:
+            return {'total_return': 0.0, 'max_drawdown': 0.0, 'sharpe_ratio': 0.0}
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        sharpe = math.sqrt(self.periods_per_year) * self.mean / std if std > 0 else 0.0
+        return {
+            'total_return': self.value / self.initial_capital - 1,
+            'max_drawdown': self.max_drawdown,
+            'sharpe_ratio': sharpe,
+        }
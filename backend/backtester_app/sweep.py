@@ -0,0 +1,174 @@
+"""Parameter sweeps: evaluate every parameter combination of one strategy.
+
+The close series is loaded once by the caller and placed in shared memory;
+each worker process attaches to it once in the pool initializer, and tasks
+only carry parameter dicts. Each worker keeps one IndicatorCache and computes every
+indicator a chunk needs in batched kernel calls before running it.
+"""
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import engine, shared, strategies
+
+logger = logging.getLogger(__name__)
+
+MAX_COMBINATIONS = 10000
+# Below this many combinations, starting worker processes costs more than it saves
+INLINE_THRESHOLD = 500
+# Progress reports per inline sweep
+PROGRESS_STEPS = 10
+RANK_METRICS = ('total_return', 'max_drawdown', 'sharpe_ratio', 'sortino_ratio', 'calmar_ratio', 'annualized_return')
+# Reported for every combination besides the rank metrics
+ROW_METRICS = RANK_METRICS + ('volatility', 'max_drawdown_duration', 'turnover', 'average_exposure')
+
+_worker_arrays = None
+_worker_volume = None
+
+
+def expand_range(name, spec, cast):
+    """Turn a sweep spec into a list of values.
+
+    Accepts a list of values, a ``{"start", "stop", "step"}`` dict (stop is
+    inclusive) or a single value.
+    """
+    if isinstance(spec, (list, tuple)):
+        values = list(spec)
+    elif isinstance(spec, dict):
+        try:
+            start, stop = spec['start'], spec['stop']
+        except KeyError:
+            raise ValueError(f"Range for {name} needs 'start' and 'stop'")
+        step = spec.get('step', 1)
+        if step <= 0:
+            raise ValueError(f"Range step for {name} must be positive")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        values = [start + i * step for i in range(max(count, 0))]
+        if cast is float:
+            values = [round(v, 10) for v in values]
+    else:
+        values = [spec]
+    return [cast(v) for v in values]
+
+
+def build_grid(indicator, ranges):
+    """Cartesian product of the requested ranges, with defaults for unswept parameters"""
+    strategy = strategies.get_strategy(indicator)
+    spec = strategy.params
+
+    unknown = set(ranges) - set(spec)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {indicator}: {', '.join(sorted(unknown))}")
+
+    names = list(spec)
+    axes = [
+        expand_range(name, ranges[name], cast) if name in ranges else [cast(default)]
+        for name, (cast, default) in spec.items()
+    ]
+    total = math.prod(len(axis) for axis in axes)
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"Sweep has {total} combinations; the limit is {MAX_COMBINATIONS}")
+
+    grid = [dict(zip(names, values)) for values in itertools.product(*axes)]
+    return [params for params in grid if strategy.valid_params(params)]
+
+
+def _init_worker(close, volume=None):
+    global _worker_arrays, _worker_volume
+    _worker_arrays = strategies.IndicatorCache(close) if close is not None else None
+    _worker_volume = volume
+
+
+def _attach_worker(handle):
+    arrays = shared.attach(handle)
+    _init_worker(arrays['close'], arrays.get('volume'))
+
+
+def _evaluate_chunk(indicator, param_sets, initial_capital, costs=None, periods_per_year=engine.TRADING_DAYS,
+                    arrays=None, volume=None):
+    """Run param_sets over ``arrays``, or in a pool worker over the arrays its initializer attached"""
+    strategy = strategies.get_strategy(indicator)
+    if arrays is None:
+        arrays, volume = _worker_arrays, _worker_volume
+    arrays.require([key for params in param_sets for key in strategy.indicator_keys(params)])
+
+    rows = []
+    for params in param_sets:
+        row = dict(params)
+        try:
+            run = engine.run_strategy(arrays.close, strategy, params, arrays, initial_capital, periods_per_year,
+                                      costs=costs, volume=volume)
+            row.update({metric: run[metric] for metric in ROW_METRICS})
+        except ValueError as e:
+            row['error'] = str(e)
+        rows.append(row)
+    return rows
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_sweep(close, indicator, param_sets, max_workers=None, rank_by='sharpe_ratio',
+              initial_capital=engine.INITIAL_CAPITAL, costs=None, volume=None, periods_per_year=engine.TRADING_DAYS,
+              progress=None):
+    """Evaluate param_sets over a close series and return the rows ranked best-first by rank_by.
+
+    Every combination is charged the same costs.CostModel, if given; models
+    that use volume need the bar ``volume`` aligned with close. Metrics are
+    annualized over periods_per_year bars. ``progress(done, total)``, if
+    given, is called as combinations are evaluated. Rows that
+    failed (for example not enough data for a long window) are returned
+    after the ranked rows with an 'error' key instead of metrics.
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"rank_by must be one of {', '.join(RANK_METRICS)}")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if len(param_sets) <= INLINE_THRESHOLD or max_workers == 1:
+        # Views run on a thread pool: an inline sweep keeps its arrays to itself
+        arrays = strategies.IndicatorCache(np.asarray(close, dtype=np.float64))
+        if progress is None:
+            rows = _evaluate_chunk(indicator, param_sets, initial_capital, costs, periods_per_year, arrays, volume)
+        else:
+            # Compute every indicator in one batch, as a single chunk would, then report between chunks
+            strategy = strategies.get_strategy(indicator)
+            arrays.require([key for params in param_sets for key in strategy.indicator_keys(params)])
+            rows = []
+            for chunk in _chunks(param_sets, max(1, math.ceil(len(param_sets) / PROGRESS_STEPS))):
+                rows.extend(_evaluate_chunk(indicator, chunk, initial_capital, costs, periods_per_year, arrays, volume))
+                progress(len(rows), len(param_sets))
+    else:
+        workers = min(max_workers, len(param_sets))
+        # A few chunks per worker keeps the pool busy without one task per combination
+        chunk_size = max(1, math.ceil(len(param_sets) / (workers * 4)))
+        chunks = list(_chunks(param_sets, chunk_size))
+        # spawn rather than fork: the web server may have threads holding locks
+        context = multiprocessing.get_context('spawn')
+        with shared.SharedArrays({'close': np.asarray(close, dtype=np.float64), 'volume': volume}) as arrays, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                    initializer=_attach_worker, initargs=(arrays.handle,)) as pool:
+            results = pool.map(_evaluate_chunk, [indicator] * len(chunks), chunks,
+                               [initial_capital] * len(chunks), [costs] * len(chunks), [periods_per_year] * len(chunks))
+            rows = []
+            for chunk in results:
+                rows.extend(chunk)
+                if progress is not None:
+                    progress(len(rows), len(param_sets))
+
+    ok = [row for row in rows if 'error' not in row]
+    failed = [row for row in rows if 'error' in row]
+
+    order = np.argsort([-row[rank_by] for row in ok], kind='stable')
+    ranked = [ok[i] for i in order]
+    for rank, row in enumerate(ranked, start=1):
+        row['rank'] = rank
+
+    logger.info(f"Sweep of {len(param_sets)} {indicator} combinations: {len(ok)} evaluated, {len(failed)} failed")
+    return ranked + failed
@@ -1,3 +1,1656 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps as django_apps
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import transaction
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from . import bars, codec, concurrency, costs, curves, engine, indicator_store, indicators, ingest, jobs, metrics, montecarlo, perf, portfolio, price_store, price_table, providers, result_cache, shared, strategies, streaming, sweep, timing, universes, views, walkforward
+from .engine import extract_trades
+from .models import BacktestResult, Job, PriceData, PriceSeries
+
+
+def loop_trades(df, initial_capital=10000.0):
+    """The original iterrows() trade loop from BacktestView, kept as the reference.
+
+    The end-of-data check uses the row's position rather than its index label,
+    which is the fix for frames sliced after the warmup period.
+    """
+    trades = []
+    position = 0
+    entry_price = 0
+    entry_date = None
+
+    for i, (idx, row) in enumerate(df.iterrows()):
+        current_position = row['position']
+
+        if position == 0 and current_position != 0:
+            position = current_position
+            entry_price = row['close']
+            entry_date = row['timestamp']
+
+        elif position != 0 and (current_position != position or i == len(df) - 1):
+            exit_price = row['close']
+            exit_date = row['timestamp']
+
+            if position == 1:
+                percent_pnl = (exit_price - entry_price) / entry_price * 100
+            else:
+                percent_pnl = (entry_price - exit_price) / entry_price * 100
+
+            position_size = initial_capital / entry_price
+            dollar_pnl = (exit_price - entry_price) * position * position_size
+
+            trades.append({
+                'entry_date': entry_date.strftime('%Y-%m-%d'),
+                'exit_date': exit_date.strftime('%Y-%m-%d'),
+                'entry_price': float(entry_price),
+                'exit_price': float(exit_price),
+                'position': int(position),
+                'percent_pnl': float(percent_pnl),
+                'dollar_pnl': float(dollar_pnl)
+            })
+
+            if current_position != 0 and current_position != position:
+                position = current_position
+                entry_price = exit_price
+                entry_date = exit_date
+            else:
+                position = 0
+
+    return trades
+
+
+def make_frame(positions, seed=0, warmup=0):
+    rng = np.random.default_rng(seed)
+    n = len(positions) + warmup
+    df = pd.DataFrame({
+        'timestamp': pd.bdate_range('2015-01-02', periods=n),
+        'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+        'position': np.concatenate([np.zeros(warmup), positions]),
+    })
+    # Slice the same way BacktestView skips the warmup period
+    return df.iloc[warmup:]
+
+
+class ExtractTradesTests(SimpleTestCase):
+    def assert_matches_loop(self, df):
+        expected = loop_trades(df)
+        actual = extract_trades(df['timestamp'].to_numpy(), df['close'].to_numpy(), df['position'].to_numpy())
+        self.assertEqual(actual, expected)
+
+    def test_matches_loop_on_random_positions(self):
+        for seed in range(20):
+            rng = np.random.default_rng(seed)
+            positions = rng.choice([-1, 0, 1], size=500, p=[0.2, 0.5, 0.3]).astype(float)
+            with self.subTest(seed=seed):
+                self.assert_matches_loop(make_frame(positions, seed=seed, warmup=60))
+
+    def test_matches_loop_on_sticky_positions(self):
+        # Long runs with reversals, like SMA crossovers
+        rng = np.random.default_rng(42)
+        positions = np.repeat(rng.choice([-1, 0, 1], size=40), rng.integers(1, 30, size=40)).astype(float)
+        self.assert_matches_loop(make_frame(positions, warmup=200))
+
+    def test_open_position_is_closed_on_last_bar_after_warmup(self):
+        df = make_frame(np.array([0, 1, 1, 1, 1], dtype=float), warmup=10)
+        trades = extract_trades(df['timestamp'].to_numpy(), df['close'].to_numpy(), df['position'].to_numpy())
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0]['entry_date'], df['timestamp'].iloc[1].strftime('%Y-%m-%d'))
+        self.assertEqual(trades[0]['exit_date'], df['timestamp'].iloc[-1].strftime('%Y-%m-%d'))
+
+    def test_edge_cases(self):
+        self.assert_matches_loop(make_frame(np.array([], dtype=float)))
+        self.assert_matches_loop(make_frame(np.array([1], dtype=float)))
+        self.assert_matches_loop(make_frame(np.array([0, 0, 0, 1], dtype=float)))
+        self.assert_matches_loop(make_frame(np.array([1, -1, 1, -1], dtype=float)))
+        self.assert_matches_loop(make_frame(np.zeros(10)))
+
+
+class IndicatorKernelTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, 3000)))
+        self.series = pd.Series(self.close)
+
+    def test_rolling_mean_matches_pandas(self):
+        windows = [1, 5, 50, 200, 3000, 3100]
+        result = indicators.rolling_mean(self.close, windows)
+        self.assertEqual(result.shape, (len(windows), len(self.close)))
+        for row, window in enumerate(windows):
+            expected = self.series.rolling(window).mean().to_numpy()
+            np.testing.assert_allclose(result[row], expected, rtol=1e-12)
+
+    def test_rolling_std_matches_exact_std(self):
+        windows = [5, 20, 200]
+        result = indicators.rolling_std(self.close, windows)
+        for row, window in enumerate(windows):
+            exact = np.lib.stride_tricks.sliding_window_view(self.close, window).std(axis=1, ddof=1)
+            self.assertTrue(np.isnan(result[row, :window - 1]).all())
+            np.testing.assert_allclose(result[row, window - 1:], exact, rtol=1e-7)
+
+    def test_rsi_matches_rolling_gain_loss(self):
+        delta = self.series.diff()
+        for row, period in enumerate([2, 14, 30]):
+            gain = delta.where(delta > 0, 0).rolling(window=period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+            expected = (100 - (100 / (1 + gain / loss))).to_numpy()
+            np.testing.assert_allclose(indicators.rsi(self.close, [2, 14, 30])[row], expected, rtol=1e-9)
+
+    def test_ema_matches_pandas_ewm(self):
+        spans = [1, 2, 9, 12, 26, 500]
+        for adjust in (True, False):
+            result = indicators.ema(self.close, spans, adjust=adjust)
+            for row, span in enumerate(spans):
+                expected = self.series.ewm(span=span, adjust=adjust).mean().to_numpy()
+                np.testing.assert_allclose(result[row], expected, rtol=1e-10)
+
+    def test_macd_matches_pandas_ewm(self):
+        macd_lines, signal_lines = indicators.macd(self.close, [12, 5], [26, 35], [9, 5])
+        for row, (fast, slow, signal) in enumerate([(12, 26, 9), (5, 35, 5)]):
+            macd = self.series.ewm(span=fast).mean() - self.series.ewm(span=slow).mean()
+            np.testing.assert_allclose(macd_lines[row], macd.to_numpy(), atol=1e-9)
+            np.testing.assert_allclose(signal_lines[row], macd.ewm(span=signal).mean().to_numpy(), atol=1e-9)
+
+    def test_kernels_over_a_matrix_match_each_column(self):
+        # Bars along axis 0 as in a portfolio, or along axis 1
+        matrix = np.column_stack([self.close, self.close[::-1], self.close * 0.5 + 10])
+        for axis, bars in ((0, matrix), (1, matrix.T)):
+            column = (lambda values, col: values[:, :, col]) if axis == 0 else (lambda values, col: values[:, col])
+            results = {
+                'mean': indicators.rolling_mean(bars, [5, 600], axis=axis),
+                'std': indicators.rolling_std(bars, [5, 600], axis=axis),
+                'rsi': indicators.rsi(bars, [14], axis=axis),
+                'macd': indicators.macd(bars, [12], [26], [9], axis=axis)[1],
+            }
+            for col in range(matrix.shape[1]):
+                expected = {
+                    'mean': indicators.rolling_mean(matrix[:, col], [5, 600]),
+                    'std': indicators.rolling_std(matrix[:, col], [5, 600]),
+                    'rsi': indicators.rsi(matrix[:, col], [14]),
+                    'macd': indicators.macd(matrix[:, col], [12], [26], [9])[1],
+                }
+                for name, result in results.items():
+                    with self.subTest(axis=axis, column=col, kernel=name):
+                        np.testing.assert_array_equal(column(result, col), expected[name])
+
+
+def baseline_backtest(close, indicator, params, initial_capital=10000.0):
+    """The if/elif signal chain and pandas metrics the backtest view used before the strategy registry"""
+    df = pd.DataFrame({'close': close}, index=pd.date_range('2000-01-03', periods=len(close), freq='B'))
+    if indicator == 'SMA':
+        df['short_ma'] = df['close'].rolling(window=params['short_window']).mean()
+        df['long_ma'] = df['close'].rolling(window=params['long_window']).mean()
+        df['curr_diff'] = df['short_ma'] - df['long_ma']
+        df['prev_diff'] = df['curr_diff'].shift(1)
+        df['signal'] = 0
+        df.loc[(df['prev_diff'] < 0) & (df['curr_diff'] > 0), 'signal'] = 1
+        df.loc[(df['prev_diff'] > 0) & (df['curr_diff'] < 0), 'signal'] = -1
+        # signal.replace(to_replace=0, method='ffill') without the deprecated keyword
+        df['position'] = df['signal'].mask(df['signal'] == 0).ffill()
+        first_valid_idx = df.dropna(subset=['short_ma', 'long_ma']).index[0]
+        if df.loc[first_valid_idx, 'short_ma'] > df.loc[first_valid_idx, 'long_ma']:
+            df.loc[:first_valid_idx, 'position'] = 1
+        else:
+            df.loc[:first_valid_idx, 'position'] = 0
+        df['position'] = df['position'].fillna(0)
+        warmup_period = params['long_window']
+    elif indicator == 'RSI':
+        delta = df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=params['rsi_period']).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=params['rsi_period']).mean()
+        df['rsi'] = 100 - (100 / (1 + gain / loss))
+        df['position'] = 0
+        df.loc[df['rsi'] < params['oversold'], 'position'] = 1
+        df.loc[df['rsi'] > params['overbought'], 'position'] = -1
+        warmup_period = params['rsi_period'] * 3
+    elif indicator == 'MACD':
+        macd = df['close'].ewm(span=params['fast_period']).mean() - df['close'].ewm(span=params['slow_period']).mean()
+        signal_line = macd.ewm(span=params['signal_period']).mean()
+        df['position'] = 0
+        df.loc[macd > signal_line, 'position'] = 1
+        df.loc[macd < signal_line, 'position'] = -1
+        warmup_period = max(params['fast_period'], params['slow_period'], params['signal_period']) * 3
+    elif indicator == 'BBANDS':
+        sma = df['close'].rolling(window=params['window']).mean()
+        std = df['close'].rolling(window=params['window']).std()
+        df['position'] = 0
+        df.loc[df['close'] < sma - std * params['num_std_dev'], 'position'] = 1
+        df.loc[df['close'] > sma + std * params['num_std_dev'], 'position'] = -1
+        warmup_period = params['window'] * 3
+
+    positions = df['position'].to_numpy(dtype=np.float64)
+    df = df.iloc[warmup_period:]
+    returns = df['close'].pct_change().fillna(0)
+    strategy_returns = df['position'].shift(1).fillna(0) * returns
+    portfolio_value = initial_capital * (1 + strategy_returns).cumprod()
+    std_dev = strategy_returns.std()
+    return {
+        'position': positions,
+        'warmup': warmup_period,
+        'total_return': portfolio_value.iloc[-1] / initial_capital - 1,
+        'max_drawdown': (portfolio_value / portfolio_value.cummax() - 1).min(),
+        'sharpe_ratio': 0.0 if std_dev == 0 else np.sqrt(252) * strategy_returns.mean() / std_dev,
+    }
+
+
+class StrategyParityTests(SimpleTestCase):
+    """The registry strategies against the signal chain they replaced"""
+    CASES = [
+        ('SMA', {'short_window': 50, 'long_window': 200}),
+        ('SMA', {'short_window': 10, 'long_window': 30}),
+        ('RSI', {'rsi_period': 14, 'overbought': 70, 'oversold': 30}),
+        ('RSI', {'rsi_period': 5, 'overbought': 80, 'oversold': 20}),
+        ('MACD', {'fast_period': 12, 'slow_period': 26, 'signal_period': 9}),
+        ('MACD', {'fast_period': 5, 'slow_period': 35, 'signal_period': 5}),
+        ('BBANDS', {'window': 20, 'num_std_dev': 2.0}),
+        ('BBANDS', {'window': 10, 'num_std_dev': 1.5}),
+    ]
+
+    def setUp(self):
+        self.closes = []
+        for seed, drift in enumerate((0.001, -0.001, 0.0003, -0.0003)):
+            rng = np.random.default_rng(seed)
+            self.closes.append(100 * np.exp(np.cumsum(rng.normal(drift, 0.015, 1200))))
+
+    def test_strategies_match_the_signal_chain(self):
+        for indicator, params in self.CASES:
+            strategy = strategies.get_strategy(indicator)
+            for seed, close in enumerate(self.closes):
+                with self.subTest(indicator=indicator, params=params, seed=seed):
+                    expected = baseline_backtest(close, indicator, params)
+                    arrays = strategies.IndicatorCache(close)
+                    arrays.require(strategy.indicator_keys(params))
+                    np.testing.assert_array_equal(strategy.signals(arrays, params), expected['position'])
+                    self.assertEqual(strategy.warmup(params), expected['warmup'])
+
+                    run = engine.run_strategy(close, strategy, params)
+                    np.testing.assert_array_equal(run['position'], expected['position'][expected['warmup']:])
+                    for metric in ('total_return', 'max_drawdown', 'sharpe_ratio'):
+                        self.assertAlmostEqual(run[metric], expected[metric], places=10)
+
+    def test_sma_starts_from_the_first_valid_bar(self):
+        strategy = strategies.get_strategy('SMA')
+        params = {'short_window': 50, 'long_window': 200}
+        starts = set()
+        for close in self.closes:
+            arrays = strategies.IndicatorCache(close)
+            arrays.require(strategy.indicator_keys(params))
+            position = strategy.signals(arrays, params)
+            expected = baseline_backtest(close, 'SMA', params)['position']
+            # Everything up to the first bar with both averages takes that bar's side
+            np.testing.assert_array_equal(position[:200], expected[:200])
+            self.assertEqual(len(set(position[:200])), 1)
+            starts.add(position[0])
+        # The rising walks open long and the falling ones flat
+        self.assertEqual(starts, {0.0, 1.0})
+
+
+class ResultCacheKeyTests(SimpleTestCase):
+    def test_key_ignores_parameter_order(self):
+        first = result_cache.make_key('backtest', 'AAPL', 'v1', params={'short_window': 20, 'long_window': 50})
+        second = result_cache.make_key('backtest', 'AAPL', 'v1', params={'long_window': 50, 'short_window': 20})
+        self.assertEqual(first, second)
+
+    def test_key_changes_with_data_version(self):
+        self.assertNotEqual(
+            result_cache.make_key('backtest', 'AAPL', 'v1', params={}),
+            result_cache.make_key('backtest', 'AAPL', 'v2', params={}),
+        )
+
+
+class ProviderTests(SimpleTestCase):
+    def test_synthetic_bars_do_not_depend_on_the_requested_range(self):
+        provider = providers.SyntheticProvider(seed=3)
+        full = provider.download('AAA', '2015-01-01', '2020-01-01')
+        tail = provider.download('AAA', '2019-06-03', '2021-01-01')
+        overlap = np.searchsorted(full.timestamp, tail.timestamp[0])
+        np.testing.assert_array_equal(full.timestamp[overlap:], tail.timestamp[:len(full) - overlap])
+        np.testing.assert_array_equal(full.close[overlap:], tail.close[:len(full) - overlap])
+        self.assertFalse(np.array_equal(full.close, provider.download('BBB', '2015-01-01', '2020-01-01').close))
+        self.assertTrue((full.low <= np.minimum(full.open, full.close)).all())
+        self.assertTrue((full.high >= np.maximum(full.open, full.close)).all())
+
+    def test_local_csv_round_trip(self):
+        bars = providers.SyntheticProvider(seed=1).download('AAA', '2020-01-01', '2020-03-01')
+        with tempfile.TemporaryDirectory() as root:
+            frame = bars.to_frame().rename(columns={'timestamp': 'Date'})
+            frame.to_csv(os.path.join(root, 'AAA.csv'), index=False)
+            loaded = providers.LocalFileProvider(root).download('aaa', '2020-02-01', '2020-03-01')
+            self.assertIsNone(providers.LocalFileProvider(root).download('ZZZ', None, None))
+
+        expected = bars.timestamp >= np.datetime64('2020-02-01')
+        np.testing.assert_array_equal(loaded.timestamp, bars.timestamp[expected])
+        np.testing.assert_allclose(loaded.close, bars.close[expected])
+
+
+class IntervalTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = providers.SyntheticProvider(seed=2)
+        self.minutes = self.provider.download('AAA', '2021-03-01', '2021-05-01', '1m')
+
+    def test_minute_bars_resample_to_the_daily_bars(self):
+        daily = self.provider.download('AAA', '2021-03-01', '2021-05-01')
+        resampled = bars.resample(self.minutes, '1d')
+        np.testing.assert_array_equal(resampled.timestamp, daily.timestamp)
+        np.testing.assert_allclose(resampled.open, daily.open)
+        np.testing.assert_allclose(resampled.close, daily.close)
+        np.testing.assert_allclose(resampled.volume, daily.volume)
+
+    def test_resample_matches_pandas(self):
+        hourly = bars.resample(self.minutes, '1h')
+        frame = self.minutes.to_frame().set_index('timestamp').resample('1h').agg(
+            {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+        ).dropna()
+        np.testing.assert_array_equal(hourly.timestamp, frame.index.values)
+        for column in ('open', 'high', 'low', 'close', 'volume'):
+            np.testing.assert_allclose(getattr(hourly, column), frame[column].to_numpy())
+
+    def test_periods_per_year_follow_the_session(self):
+        self.assertEqual(bars.periods_per_year(self.minutes.timestamp, '1d'), engine.TRADING_DAYS)
+        self.assertEqual(bars.periods_per_year(self.minutes.timestamp, '1m'), engine.TRADING_DAYS * 390)
+        hourly = bars.resample(self.minutes, '1h')
+        self.assertEqual(bars.periods_per_year(hourly.timestamp, '1h'), engine.TRADING_DAYS * 7)
+
+
+class UniverseTests(SimpleTestCase):
+    def test_parse_symbols(self):
+        text = "aapl, MSFT\n# comment line\nspy  brk-b  AAPL  # trailing comment\n"
+        self.assertEqual(universes.parse_symbols(text), ['AAPL', 'MSFT', 'SPY', 'BRK-B'])
+
+    def test_builtin_universe(self):
+        self.assertEqual(len(universes.get_universe('dow30')), 30)
+        with self.assertRaises(ValueError):
+            universes.get_universe('../etc/passwd')
+
+
+class WalkForwardTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 1500)))
+        self.strategy = strategies.get_strategy('SMA')
+        self.grid = [{'short_window': short, 'long_window': long} for short in (10, 30) for long in (100, 150)]
+
+    def test_window_metrics_match_engine(self):
+        returns, _ = walkforward.strategy_return_matrix(self.close, self.strategy, self.grid)
+        for row, params in enumerate(self.grid):
+            run = engine.run_strategy(self.close, self.strategy, params)
+            metrics = walkforward.window_metrics(returns[row, run['start']:])
+            for name in ('total_return', 'max_drawdown', 'sharpe_ratio'):
+                self.assertAlmostEqual(metrics[name][0], run[name], places=10)
+
+    def test_return_matrix_is_net_of_costs(self):
+        cost_model = costs.CostModel(commission_bps=10, spread_bps=4, slippage_bps=2)
+        returns, _ = walkforward.strategy_return_matrix(self.close, self.strategy, self.grid, cost_model)
+        for row, params in enumerate(self.grid):
+            run = engine.run_strategy(self.close, self.strategy, params, costs=cost_model)
+            # The run's first bar also pays for entering; after it, fixed-rate charges don't depend on equity
+            np.testing.assert_allclose(returns[row, run['start'] + 1:], run['strategy_returns'][1:], rtol=1e-12, atol=1e-15)
+
+    def test_costs_charge_every_change_of_the_stitched_position(self):
+        cost_model = costs.CostModel(commission_bps=10, spread_bps=4)
+        gross = walkforward.run_walk_forward(self.close, 'SMA', self.grid[:1], 300, 100, max_workers=1)
+        net = walkforward.run_walk_forward(self.close, 'SMA', self.grid[:1], 300, 100, max_workers=1, costs=cost_model)
+
+        arrays = strategies.IndicatorCache(self.close)
+        held = self.strategy.signals(arrays, self.grid[0])[net['start'] - 1:]
+        turnover = np.abs(np.diff(held, prepend=0.0))
+        expected = (1 + gross['returns']) * (1 - cost_model.fixed_rate * turnover[1:])
+        expected[0] *= 1 - cost_model.fixed_rate * turnover[0]
+        np.testing.assert_allclose(net['returns'], expected - 1, rtol=1e-12, atol=1e-15)
+        self.assertLess(net['total_return'], gross['total_return'])
+
+    def test_rank_by_is_limited_to_the_fold_metrics(self):
+        for rank_by in ('sortino_ratio', 'calmar_ratio', 'annualized_return'):
+            with self.subTest(rank_by=rank_by), self.assertRaisesMessage(ValueError, 'rank_by must be one of'):
+                walkforward.run_walk_forward(self.close, 'SMA', self.grid, 300, 100, rank_by=rank_by)
+        for rank_by in walkforward.RANK_METRICS:
+            run = walkforward.run_walk_forward(self.close, 'SMA', self.grid, 300, 100, rank_by=rank_by, max_workers=1)
+            self.assertTrue(all(fold['params'] in self.grid for fold in run['folds']))
+
+    def test_test_windows_tile_the_range(self):
+        folds = walkforward.make_folds(1000, 150, 300, 100)
+        self.assertEqual(folds[0], (150, 450, 550))
+        self.assertEqual([test_start for _, test_start, _ in folds], list(range(450, 1000, 100)))
+        self.assertEqual(folds[-1][2], 1000)
+        self.assertEqual({train_start for train_start, _, _ in walkforward.make_folds(1000, 150, 300, 100, anchored=True)}, {150})
+
+    def test_stitched_returns_follow_the_chosen_parameters(self):
+        run = walkforward.run_walk_forward(self.close, 'SMA', self.grid, 300, 100)
+        returns, _ = walkforward.strategy_return_matrix(self.close, self.strategy, self.grid)
+        expected = np.concatenate([
+            returns[self.grid.index(fold['params']), fold['train_end']:fold['test_end']] for fold in run['folds']
+        ])
+        np.testing.assert_allclose(run['returns'], expected)
+        self.assertEqual(run['start'], 150 + 300)
+
+
+def holdings_loop(close, weights, rebalance_every):
+    """Per-bar portfolio returns from cash and per-asset holdings, rebalanced to the weights at the close of every rebalance_every-th bar"""
+    cash, holdings = 1.0, np.zeros(close.shape[1])
+    returns = np.zeros(len(close))
+    for t in range(len(close)):
+        nav = cash + holdings.sum()
+        if t > 0:
+            holdings = holdings * close[t] / close[t - 1]
+            returns[t] = (cash + holdings.sum()) / nav - 1
+            nav = cash + holdings.sum()
+        if t % rebalance_every == 0:
+            holdings = nav * weights[t]
+            cash = nav - holdings.sum()
+    return returns
+
+
+class PortfolioTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(12)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (400, 3)), axis=0))
+        # Sticky long, flat and short positions per asset
+        self.positions = np.column_stack([
+            np.repeat(rng.choice([-1.0, 0.0, 1.0], size=40), 10) for _ in range(3)
+        ])
+
+    def test_weights_follow_their_definitions(self):
+        equal = portfolio.target_weights(self.close, 'equal', self.positions)
+        np.testing.assert_array_equal(equal, self.positions / 3)
+
+        signal = portfolio.target_weights(self.close, 'signal', self.positions)
+        gross = np.abs(self.positions).sum(axis=1)
+        for t in range(len(self.close)):
+            expected = self.positions[t] / gross[t] if gross[t] else np.zeros(3)
+            np.testing.assert_allclose(signal[t], expected)
+
+        inverse = portfolio.target_weights(self.close, 'inverse_volatility', self.positions, vol_lookback=20)
+        vol = pd.DataFrame(portfolio.asset_returns(self.close)).rolling(20).std().to_numpy()
+        for t in range(19, len(self.close)):
+            raw = self.positions[t] / vol[t]
+            expected = raw / np.abs(raw).sum() if np.abs(raw).sum() else np.zeros(3)
+            np.testing.assert_allclose(inverse[t], expected, rtol=1e-7)
+
+    def test_returns_match_a_holdings_loop(self):
+        for weighting in portfolio.WEIGHTINGS:
+            weights = np.nan_to_num(portfolio.target_weights(self.close, weighting, self.positions, vol_lookback=20))
+            for rebalance_every in (1, 5, 21):
+                with self.subTest(weighting=weighting, rebalance_every=rebalance_every):
+                    returns, held = portfolio.portfolio_returns(self.close, weights, rebalance_every)
+                    np.testing.assert_allclose(returns, holdings_loop(self.close, weights, rebalance_every), atol=1e-12)
+
+    def test_holdings_drift_between_rebalances(self):
+        weights = np.full(self.close.shape, 0.5)
+        weights[:, 2] = 0.0
+        returns, _ = portfolio.portfolio_returns(self.close, weights, 50)
+        expected = holdings_loop(self.close, weights, 50)
+        np.testing.assert_allclose(returns, expected, atol=1e-12)
+        # Fixed weights held for the whole period would have given a different path
+        fixed = np.r_[0.0, (portfolio.asset_returns(self.close)[1:] * weights[:-1]).sum(axis=1)]
+        self.assertGreater(np.abs(returns - fixed).max(), 1e-4)
+
+    def test_run_portfolio_starts_after_the_warmup(self):
+        strategy = strategies.get_strategy('SMA')
+        params = strategy.parse_params({'short_window': 10, 'long_window': 30})
+        run = portfolio.run_portfolio(self.close, 'signal', strategy, params, rebalance_every=10)
+        start = strategy.warmup(params)
+        weights = portfolio.target_weights(self.close, 'signal', portfolio.strategy_positions(self.close, strategy, params))
+        expected = holdings_loop(self.close[start:], weights[start:], 10)
+        self.assertEqual(run['start'], start)
+        np.testing.assert_allclose(run['returns'], expected, atol=1e-12)
+        np.testing.assert_allclose(run['equity'], engine.INITIAL_CAPITAL * np.cumprod(1 + expected))
+
+    def test_positions_of_the_matrix_match_each_asset(self):
+        for name, data in (('SMA', {'short_window': 10, 'long_window': 30}), ('RSI', {}), ('MACD', {}), ('BBANDS', {})):
+            strategy = strategies.get_strategy(name)
+            params = strategy.parse_params(data)
+            positions = portfolio.strategy_positions(self.close, strategy, params)
+            self.assertEqual(positions.shape, self.close.shape)
+            for col in range(self.close.shape[1]):
+                arrays = strategies.IndicatorCache(self.close[:, col])
+                with self.subTest(strategy=name, column=col):
+                    np.testing.assert_array_equal(positions[:, col], strategy.signals(arrays, params))
+
+
+class SweepTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 800)))
+
+    def test_expand_range_specs(self):
+        self.assertEqual(sweep.expand_range('w', [5, 10], int), [5, 10])
+        self.assertEqual(sweep.expand_range('w', {'start': 10, 'stop': 30, 'step': 10}, int), [10, 20, 30])
+        self.assertEqual(sweep.expand_range('k', {'start': 1.0, 'stop': 2.0, 'step': 0.1}, float)[-1], 2.0)
+        self.assertEqual(len(sweep.expand_range('k', {'start': 1.0, 'stop': 2.0, 'step': 0.1}, float)), 11)
+        self.assertEqual(sweep.expand_range('w', '7', int), [7])
+        with self.assertRaisesMessage(ValueError, "needs 'start' and 'stop'"):
+            sweep.expand_range('w', {'start': 1}, int)
+        with self.assertRaisesMessage(ValueError, 'must be positive'):
+            sweep.expand_range('w', {'start': 1, 'stop': 5, 'step': 0}, int)
+
+    def test_grid_fills_defaults_and_drops_invalid_combinations(self):
+        grid = sweep.build_grid('SMA', {'short_window': [10, 50, 100], 'long_window': [50, 100]})
+        self.assertEqual(grid, [{'short_window': 10, 'long_window': 50}, {'short_window': 10, 'long_window': 100},
+                                {'short_window': 50, 'long_window': 100}])
+        grid = sweep.build_grid('RSI', {'rsi_period': [7, 14]})
+        self.assertEqual(grid, [{'rsi_period': 7, 'overbought': 70, 'oversold': 30},
+                                {'rsi_period': 14, 'overbought': 70, 'oversold': 30}])
+        with self.assertRaisesMessage(ValueError, 'Unknown parameters for SMA: window'):
+            sweep.build_grid('SMA', {'window': [5]})
+
+    def test_combination_limit(self):
+        # 2,000 combinations, the size sweeps were built for, are within the limit
+        grid = sweep.build_grid('BBANDS', {'window': {'start': 2, 'stop': 201}, 'num_std_dev': {'start': 0.5, 'stop': 5.0, 'step': 0.5}})
+        self.assertEqual(len(grid), 2000)
+        over = int(math.sqrt(sweep.MAX_COMBINATIONS)) + 1
+        with self.assertRaisesMessage(ValueError, f'the limit is {sweep.MAX_COMBINATIONS}'):
+            sweep.build_grid('SMA', {'short_window': {'start': 1, 'stop': over}, 'long_window': {'start': 1, 'stop': over}})
+
+    def test_rows_are_ranked_best_first_with_failures_last(self):
+        grid = sweep.build_grid('SMA', {'short_window': [5, 10, 20], 'long_window': [40, 80, 1000]})
+        strategy = strategies.get_strategy('SMA')
+        for rank_by in sweep.RANK_METRICS:
+            with self.subTest(rank_by=rank_by):
+                rows = sweep.run_sweep(self.close, 'SMA', grid, max_workers=1, rank_by=rank_by)
+                ranked = [row for row in rows if 'error' not in row]
+                self.assertEqual(len(ranked), 6)
+                self.assertEqual([row['rank'] for row in ranked], list(range(1, 7)))
+                values = [row[rank_by] for row in ranked]
+                self.assertEqual(values, sorted(values, reverse=True))
+                self.assertEqual([row['long_window'] for row in rows[6:]], [1000] * 3)
+                self.assertTrue(all('Insufficient data' in row['error'] for row in rows[6:]))
+                for row in ranked:
+                    params = {'short_window': row['short_window'], 'long_window': row['long_window']}
+                    self.assertAlmostEqual(row[rank_by], engine.run_strategy(self.close, strategy, params)[rank_by], places=12)
+        with self.assertRaisesMessage(ValueError, 'rank_by must be one of'):
+            sweep.run_sweep(self.close, 'SMA', grid, rank_by='profit')
+
+
+class MonteCarloTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.held = np.repeat(rng.choice([-1.0, 0.0, 1.0], size=30), rng.integers(1, 40, size=30))
+        self.returns = self.held * rng.normal(0.0005, 0.01, len(self.held))
+
+    def test_trade_shuffle_keeps_every_segment(self):
+        starts, lengths = montecarlo.segments(self.held)
+        indices = montecarlo.trade_shuffle_indices(starts, lengths, 20, np.random.default_rng(0))
+        for row in indices:
+            np.testing.assert_array_equal(np.sort(row), np.arange(len(self.held)))
+        simulated = montecarlo.simulate(self.returns, 'trade_shuffle', 500, held=self.held, seed=1)
+        expected = np.prod(1 + self.returns) - 1
+        np.testing.assert_allclose(simulated['total_return'], expected, rtol=1e-9)
+
+    def test_block_bootstrap_is_chunked_and_reproducible(self):
+        first = montecarlo.simulate(self.returns, 'block_bootstrap', 3000, block_size=15, seed=5)
+        second = montecarlo.simulate(self.returns, 'block_bootstrap', 3000, block_size=15, seed=5)
+        np.testing.assert_array_equal(first['sharpe_ratio'], second['sharpe_ratio'])
+        self.assertEqual(len(first['max_drawdown']), 3000)
+        self.assertTrue((first['max_drawdown'] <= 0).all())
+
+
+class CodecTests(SimpleTestCase):
+    def test_dates_and_trades_round_trip(self):
+        timestamps = pd.bdate_range('2020-01-01', periods=300)
+        start, blob = codec.encode_dates(timestamps)
+        np.testing.assert_array_equal(codec.decode_dates(start, blob), timestamps.values.astype('datetime64[D]'))
+
+        rng = np.random.default_rng(4)
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.01, 300))
+        position = np.repeat(rng.choice([-1.0, 0.0, 1.0], size=20), 15)
+        trades = extract_trades(timestamps.values, close, position, engine.INITIAL_CAPITAL)
+        self.assertEqual(codec.decode_trades(codec.encode_trades(trades)), trades)
+
+        minutes = timestamps.values + np.timedelta64(570, 'm')
+        start, blob = codec.encode_dates(minutes, 'm')
+        np.testing.assert_array_equal(codec.decode_dates(start, blob, 'm'), minutes.astype('datetime64[m]'))
+        trades = extract_trades(minutes, close, position, engine.INITIAL_CAPITAL, unit='m')
+        self.assertEqual(trades[0]['entry_date'][-6:], 'T09:30')
+        self.assertEqual(codec.decode_trades(codec.encode_trades(trades, 'm'), 'm'), trades)
+
+    def test_float32_curve_is_within_a_cent(self):
+        curve = 10000 * np.cumprod(1 + np.random.default_rng(2).normal(0, 0.02, 2520))
+        decoded = codec.decode_curve(codec.encode_curve(curve, 'float32'))
+        self.assertLess(np.abs(decoded - curve).max(), 0.01)
+
+
+class CurveDeliveryTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        self.curve = (10000 * np.cumprod(1 + rng.normal(0, 0.01, 12000))).tolist()
+        self.dates = np.datetime_as_string(np.arange(12000) + np.datetime64('1990-01-01'), unit='D').tolist()
+
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        kept = curves.lttb_indices(self.curve, 500)
+        self.assertEqual(len(kept), 500)
+        self.assertEqual((kept[0], kept[-1]), (0, len(self.curve) - 1))
+        self.assertTrue((np.diff(kept) > 0).all())
+        self.assertIn(int(np.argmax(self.curve)), kept)
+        self.assertIn(int(np.argmin(self.curve)), kept)
+
+    def test_downsample_keeps_series_aligned(self):
+        thinned = curves.downsample({'equity_curve': self.curve, 'portfolio_dates': self.dates}, 100)
+        self.assertEqual(thinned['downsampled_from'], 12000)
+        for date, value in zip(thinned['portfolio_dates'], thinned['equity_curve']):
+            self.assertEqual(self.curve[self.dates.index(date)], value)
+
+    def test_ndjson_chunks_reassemble(self):
+        data = {'total_return': 0.5, 'equity_curve': self.curve, 'portfolio_dates': self.dates,
+                'trades': [{'dollar_pnl': float(i)} for i in range(7)]}
+        lines = [json.loads(line) for line in curves.ndjson_lines(data, chunk_points=5000)]
+        self.assertEqual(lines[0]['type'], 'summary')
+        self.assertEqual(lines[0]['counts'], {'equity_curve': 12000, 'portfolio_dates': 12000, 'trades': 7})
+        self.assertEqual(lines[-1], {'type': 'end'})
+        series = [line for line in lines if line['type'] == 'series']
+        self.assertEqual(len(series), 3)
+        self.assertEqual([value for line in series for value in line['equity_curve']], self.curve)
+        self.assertEqual([t for line in lines if line['type'] == 'trades' for t in line['trades']], data['trades'])
+
+    def test_stream_is_async_under_asgi(self):
+        data = {'total_return': 0.5, 'equity_curve': self.curve, 'portfolio_dates': self.dates}
+        expected = list(curves.ndjson_lines(data))
+        for factory, is_async in ((RequestFactory(), False), (AsyncRequestFactory(), True)):
+            request = Request(factory.get('/api/backtest/', {'stream': '1'}))
+            response = views._curve_response(request, data, 200)
+            self.assertEqual(response.is_async, is_async)
+
+        async def read():
+            return [chunk.decode() async for chunk in response]
+
+        self.assertEqual(async_to_sync(read)(), expected)
+
+
+class PerfSuiteTests(SimpleTestCase):
+    def test_measure_engine_case(self):
+        result = perf.measure(perf.CASES['engine.SMA'](1000, None), 1000, repeat=1)
+        self.assertEqual(result['bars'], 1000)
+        self.assertGreater(result['bars_per_second'], 0)
+        self.assertGreater(result['peak_memory_bytes'], 0)
+
+    def test_compare_flags_drops_beyond_threshold(self):
+        baseline = {'results': {'engine.SMA/1000': {'bars_per_second': 100.0},
+                                'engine.RSI/1000': {'bars_per_second': 100.0}}}
+        results = {'engine.SMA/1000': {'bars_per_second': 85.0},
+                   'engine.RSI/1000': {'bars_per_second': 70.0},
+                   'engine.MACD/1000': {'bars_per_second': 1.0}}
+        regressions = perf.compare(results, baseline, threshold=0.2)
+        self.assertEqual([r['case'] for r in regressions], ['engine.RSI/1000'])
+        self.assertAlmostEqual(regressions[0]['change'], -0.3)
+
+    def test_save_baseline_merges(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'baseline.json')
+            perf.save_baseline(path, {'a/1': {'bars_per_second': 1.0}})
+            perf.save_baseline(path, {'b/1': {'bars_per_second': 2.0}})
+            self.assertEqual(sorted(perf.load_baseline(path)['results']), ['a/1', 'b/1'])
+
+
+class PerfViewCaseTests(TransactionTestCase):
+    # The fixture series only reach the store when their catalog rows commit
+    def test_view_cases_run_against_committed_fixtures(self):
+        results = perf.run_suite([1000], ['view.backtest.SMA', 'view.benchmark'], repeat=1)
+        self.assertEqual(sorted(results), ['view.backtest.SMA/1000', 'view.benchmark/1000'])
+        for result in results.values():
+            self.assertGreater(result['bars_per_second'], 0)
+        self.assertFalse(PriceSeries.objects.exists())
+        self.assertFalse(BacktestResult.objects.exists())
+
+
+class StageTimingTests(SimpleTestCase):
+    def setUp(self):
+        timing.reset()
+        self.addCleanup(timing.reset)
+
+    def test_server_timing_header_and_metrics(self):
+        timer = timing.StageTimer()
+        with timer.stage('load'):
+            pass
+        timer.add('strategy', 0.0125)
+        response = timing.finish(Response({'total_return': 0.1}), 'backtest', timer)
+        self.assertRegex(response['Server-Timing'], r'^load;dur=\d+\.\d\d, strategy;dur=12\.50, view;dur=')
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = 'application/json'
+        response.renderer_context = {}
+        response.render()
+        self.assertIn('render;dur=', response['Server-Timing'])
+        stages = timing.metrics()['backtest']
+        self.assertEqual(stages['strategy']['count'], 1)
+        self.assertAlmostEqual(stages['strategy']['p95_ms'], 12.5)
+        self.assertEqual(set(stages), {'load', 'strategy', 'view', 'render'})
+
+    def test_profile_summary_is_attached(self):
+        timer = timing.StageTimer()
+        with timing.profiled(True) as profiler:
+            sorted(range(1000), key=lambda i: -i)
+        response = timing.finish(Response({'total_return': 0.1}), 'backtest', timer, profiler)
+        rows = response.data['profile']
+        self.assertTrue(rows)
+        self.assertEqual(rows, sorted(rows, key=lambda row: row['cumulative_ms'], reverse=True))
+
+
+class ConcurrencyTests(SimpleTestCase):
+    def test_single_flight_shares_one_call(self):
+        flight = concurrency.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_download():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'added': 3}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('SPY', slow_download))) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        # Give the followers time to reach the running call before it returns
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'added': 3}] * 4)
+        self.assertEqual(flight.running(), 0)
+
+    def test_single_flight_errors_reach_every_caller_and_clear(self):
+        flight = concurrency.SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('SPY', lambda: int('x'))
+        self.assertEqual(flight.do('SPY', lambda: 1), 1)
+
+    def test_async_view_runs_on_a_pool(self):
+        handler = concurrency.async_view(views.IndicatorsView, 'compute')
+        response = async_to_sync(handler)(RequestFactory().get('/api/indicators/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_rendered)
+        self.assertIn('SMA', json.loads(response.content)['indicators'])
+
+    def run_interleaved(self, closes, run, module, name):
+        """run(close) for each close on its own thread; both pause at their first call of module.name.
+
+        The pause lines the threads up after each has set up its run, which is
+        where a run that kept its data in module globals would pick up the
+        other thread's.
+        """
+        barrier = threading.Barrier(len(closes), timeout=10)
+        paused = threading.local()
+        original = getattr(module, name)
+
+        def pausing(*args, **kwargs):
+            if not getattr(paused, 'done', False):
+                paused.done = True
+                barrier.wait()
+            return original(*args, **kwargs)
+
+        results = [None] * len(closes)
+        errors = []
+
+        def work(i):
+            try:
+                results[i] = run(closes[i])
+            except Exception as e:
+                errors.append(e)
+
+        setattr(module, name, pausing)
+        try:
+            threads = [threading.Thread(target=work, args=(i,)) for i in range(len(closes))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+        finally:
+            setattr(module, name, original)
+        self.assertEqual(errors, [])
+        return results
+
+    def test_concurrent_inline_sweeps_keep_their_own_prices(self):
+        closes = [100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0.0003, 0.015, 600))) for seed in (1, 2)]
+        grid = sweep.build_grid('SMA', {'short_window': [5, 10, 20], 'long_window': [50, 100]})
+        expected = [sweep.run_sweep(close, 'SMA', grid, max_workers=1) for close in closes]
+
+        results = self.run_interleaved(closes, lambda close: sweep.run_sweep(close, 'SMA', grid, max_workers=1),
+                                       strategies, 'get_strategy')
+        self.assertEqual(results, expected)
+
+    def test_concurrent_inline_walk_forwards_keep_their_own_returns(self):
+        closes = [100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0.0003, 0.015, 800))) for seed in (3, 4)]
+        grid = sweep.build_grid('SMA', {'short_window': [5, 20], 'long_window': [50, 100]})
+
+        def run(close):
+            return walkforward.run_walk_forward(close, 'SMA', grid, 200, 100, max_workers=1)['returns']
+
+        expected = [run(close) for close in closes]
+        results = self.run_interleaved(closes, run, walkforward, 'window_metrics')
+        for returns, expected_returns in zip(results, expected):
+            np.testing.assert_array_equal(returns, expected_returns)
+
+
+class SharedArraysTests(SimpleTestCase):
+    def test_attach_returns_read_only_views_of_the_copied_arrays(self):
+        close = np.linspace(100, 110, 11)
+        volume = np.arange(11, dtype=np.int64)
+        with shared.SharedArrays({'close': close, 'volume': volume, 'missing': None}) as block:
+            self.assertEqual([key for key, *_ in block.handle.layout], ['close', 'volume'])
+            arrays = shared.attach(block.handle)
+            np.testing.assert_array_equal(arrays['close'], close)
+            self.assertEqual(arrays['volume'].dtype, np.int64)
+            self.assertFalse(arrays['close'].flags.writeable)
+            self.assertIs(shared.attach(block.handle)['close'], arrays['close'])
+            del arrays
+            shared.detach(block.handle)
+        # Closing the owner unlinks the block, so nothing new can attach
+        with self.assertRaises(FileNotFoundError):
+            shared.attach(block.handle)
+
+    def test_pool_sweep_matches_inline_sweep(self):
+        # Spawned workers import sweep.py without django.setup(), so nothing it imports may load the models
+        rng = np.random.default_rng(5)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 400)))
+        grid = sweep.build_grid('RSI', {'rsi_period': {'start': 2, 'stop': 26}, 'oversold': {'start': 10, 'stop': 34}})
+        self.assertGreater(len(grid), sweep.INLINE_THRESHOLD)
+        pooled = sweep.run_sweep(close, 'RSI', grid, max_workers=2)
+        self.assertEqual(pooled, sweep.run_sweep(close, 'RSI', grid, max_workers=1))
+
+    def test_pool_walk_forward_matches_inline_walk_forward(self):
+        rng = np.random.default_rng(6)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 800)))
+        grid = [{'short_window': short, 'long_window': long} for short in (10, 20) for long in (50, 100)]
+        inline = walkforward.run_walk_forward(close, 'SMA', grid, 200, 100, max_workers=1)
+        self.addCleanup(setattr, walkforward, 'INLINE_CELLS', walkforward.INLINE_CELLS)
+        walkforward.INLINE_CELLS = 0
+        pooled = walkforward.run_walk_forward(close, 'SMA', grid, 200, 100, max_workers=2)
+        self.assertEqual([fold['params'] for fold in pooled['folds']], [fold['params'] for fold in inline['folds']])
+        np.testing.assert_array_equal(pooled['returns'], inline['returns'])
+
+    def test_share_prices_round_trips_every_column(self):
+        prices = [providers.SyntheticProvider(seed=1).download(symbol, '2020-01-01', '2021-01-01') for symbol in ('AAA', 'BBB')]
+        with shared.share_prices(prices) as block:
+            attached = shared.attached_prices(block.handle)
+            self.addCleanup(shared.detach, block.handle)
+            self.assertEqual(set(attached), {'AAA', 'BBB'})
+            for original in prices:
+                copy = attached[original.symbol]
+                self.assertEqual(len(copy), len(original))
+                np.testing.assert_array_equal(copy.timestamp, original.timestamp)
+                np.testing.assert_array_equal(copy.close, original.close)
+
+
+class StreamingTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 1500)))
+
+    def test_indicators_match_the_batch_kernels(self):
+        sma, rsi, macd, bands = streaming.SMA(30), streaming.RSI(14), streaming.MACD(12, 26, 9), streaming.Bollinger(20, 2.0)
+        rows = [(sma.update(c), rsi.update(c), *macd.update(c), *bands.update(c)) for c in self.close]
+        values = np.array(rows).T
+        np.testing.assert_allclose(values[0], indicators.rolling_mean(self.close, [30])[0], rtol=1e-10)
+        np.testing.assert_allclose(values[1], indicators.rsi(self.close, [14])[0], rtol=1e-9)
+        macd_line, signal_line = indicators.macd(self.close, [12], [26], [9])
+        np.testing.assert_allclose(values[2], macd_line[0], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(values[3], signal_line[0], rtol=1e-9, atol=1e-9)
+        upper, lower = strategies.KERNELS['bbands'](self.close, [(20, 2.0)])[0]
+        np.testing.assert_allclose(values[4], upper, rtol=1e-10)
+        np.testing.assert_allclose(values[5], lower, rtol=1e-10)
+
+    def test_checkpointed_run_matches_run_strategy(self):
+        cost_model = costs.CostModel(commission_bps=5, spread_bps=2)
+        for name, strategy in strategies.STRATEGIES.items():
+            params = strategy.parse_params({'short_window': 20, 'long_window': 60})
+            with self.subTest(strategy=name):
+                expected = engine.run_strategy(self.close, strategy, params, costs=cost_model)
+                run = streaming.StrategyRun(strategy.stream(params), strategy.warmup(params),
+                                            engine.INITIAL_CAPITAL, cost_model.fixed_rate)
+                positions = [run.update(c) for c in self.close[:1000]]
+                # Through JSON and back, as a StrategyMonitor stores it
+                run = streaming.restore(json.loads(json.dumps(run.state())))
+                positions += [run.update(c) for c in self.close[1000:]]
+
+                np.testing.assert_array_equal(positions[expected['start']:], expected['position'])
+                self.assertAlmostEqual(run.value, expected['portfolio_value'][-1], delta=1e-8)
+                for metric, value in run.metrics().items():
+                    self.assertAlmostEqual(value, expected[metric], places=10)
+
+
+class IndicatorStoreTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings = override_settings(INDICATOR_CACHE_DIR=root.name, INDICATOR_CACHE_MEMORY_MB=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        indicator_store.clear()
+        self.addCleanup(indicator_store.clear)
+
+        rng = np.random.default_rng(4)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+        self.timestamps = np.datetime64('2015-01-02', 'ns') + np.arange(2000) * np.timedelta64(1, 'D')
+        self.keys = [('sma', 50), ('rsi', 14), ('bbands', 20, 2.0), ('macd', 12, 26, 9)]
+
+    def store(self, version='v1', timestamps=None):
+        return indicator_store.for_series('AAA', '1d', version, self.timestamps if timestamps is None else timestamps)
+
+    def assert_same(self, expected, actual):
+        for key in self.keys:
+            for want, got in zip(np.atleast_2d(expected[key]), np.atleast_2d(actual[key])):
+                np.testing.assert_array_equal(want, got)
+
+    def test_second_cache_reads_what_the_first_computed(self):
+        first = strategies.IndicatorCache(self.close, store=self.store())
+        first.require(self.keys)
+        self.assertEqual(first.computed, 4)
+
+        # From the memory tier, then from disk alone
+        for _ in range(2):
+            second = strategies.IndicatorCache(self.close, store=self.store())
+            second.require(self.keys)
+            self.assertEqual(second.computed, 0)
+            self.assert_same(first, second)
+            with indicator_store._lock:
+                indicator_store._memory.clear()
+                indicator_store._memory_bytes = 0
+
+    def test_other_versions_and_slices_are_separate_entries(self):
+        strategies.IndicatorCache(self.close, store=self.store()).require(self.keys)
+        for store in (self.store('v2'), self.store(timestamps=self.timestamps[:1999])):
+            arrays = strategies.IndicatorCache(self.close, store=store)
+            arrays.require(self.keys)
+            self.assertEqual(arrays.computed, 4)
+
+    def test_invalidate_drops_memory_and_disk(self):
+        strategies.IndicatorCache(self.close, store=self.store()).require(self.keys)
+        indicator_store.invalidate('aaa')
+        self.assertFalse(os.path.exists(indicator_store.symbol_dir('AAA')))
+        self.assertEqual(indicator_store._memory_bytes, 0)
+        self.assertIsNone(self.store().get(('sma', 50)))
+
+    def test_memory_tier_is_bounded(self):
+        store = self.store()
+        for window in range(2, 200):
+            store.put(('sma', window), np.zeros(2000))
+        self.assertLessEqual(indicator_store._memory_bytes, 2**20)
+        # Evicted entries are still on disk
+        np.testing.assert_array_equal(store.get(('sma', 2)), np.zeros(2000))
+
+    def history(self):
+        prices = price_store.PriceArrays('AAA', self.timestamps, self.close, self.close, self.close, self.close,
+                                         np.ones(len(self.close)))
+        return lambda: prices
+
+    def test_windowed_indicators_are_cut_from_the_whole_series(self):
+        for lo, hi in ((300, 1700), (0, 2000), (1000, 1030), (500, 1500)):
+            with self.subTest(lo=lo, hi=hi):
+                store = self.store(timestamps=self.timestamps[lo:hi])
+                store.history = self.history()
+                arrays = strategies.IndicatorCache(self.close[lo:hi], store=store)
+                arrays.require(self.keys)
+                # The whole series is computed once; after that only MACD, which depends on the start
+                self.assertEqual(store.computed, 3 if lo == 300 else 0)
+                self.assertEqual(arrays.computed, 1)
+                fresh = strategies.IndicatorCache(self.close[lo:hi])
+                fresh.require(self.keys)
+                for key in self.keys:
+                    for want, got in zip(np.atleast_2d(fresh[key]), np.atleast_2d(arrays[key])):
+                        np.testing.assert_allclose(got, want, rtol=1e-9)
+
+        # One file per windowed key for the whole series, not one per date range
+        names = os.listdir(indicator_store.symbol_dir('AAA'))
+        self.assertEqual(len(names), 2 + 3 + 4)
+
+    def test_windowed_indicators_need_a_slice_of_the_history(self):
+        timestamps = self.timestamps[100:200] + np.timedelta64(1, 'h')
+        store = self.store(timestamps=timestamps)
+        store.history = self.history()
+        self.assertIsNone(store.get(('sma', 50)))
+
+    def test_disk_tier_drops_least_recently_used_files(self):
+        with override_settings(INDICATOR_CACHE_DISK_MB=1):
+            store = self.store()
+            for window in range(2, 200):
+                store.put(('sma', window), np.zeros(2000))
+            stored = sum(os.path.getsize(os.path.join(indicator_store.symbol_dir('AAA'), name))
+                         for name in os.listdir(indicator_store.symbol_dir('AAA')))
+            self.assertLessEqual(stored, 2**20)
+            self.assertFalse(os.path.exists(store.path(('sma', 2))))
+            self.assertTrue(os.path.exists(store.path(('sma', 199))))
+
+
+class IndicatorPrewarmTests(TransactionTestCase):
+    def setUp(self):
+        use_temporary_store(self)
+        price_store.write_series(providers.SyntheticProvider(seed=2).download('AAA', '2010-01-01', '2020-01-01'))
+
+    def test_prewarm_runs_on_the_pool_and_serves_narrower_backtests(self):
+        keys = [('sma', 20), ('sma', 50), ('rsi', 14)]
+        with override_settings(INDICATOR_PREWARM=keys):
+            indicator_store.prewarm_later(['AAA']).result()
+        files = set(os.listdir(indicator_store.symbol_dir('AAA')))
+        self.assertEqual(len(files), 2 + len(keys))
+
+        data = {'symbol': 'AAA', 'indicator': 'SMA', 'short_window': 20, 'long_window': 50,
+                'start_date': '2015-01-01', 'end_date': '2018-01-01'}
+        response = views.BacktestView.as_view()(APIRequestFactory().post('/api/backtest/', data, format='json'))
+        self.assertEqual(response.status_code, 201)
+        # Read from the prewarmed whole series, without adding files for this date range
+        self.assertEqual(set(os.listdir(indicator_store.symbol_dir('AAA'))), files)
+
+        prices = price_store.load_series('AAA', '2015-01-01', '2018-01-01')
+        strategy = strategies.get_strategy('SMA')
+        expected = engine.run_strategy(prices.close, strategy, strategy.parse_params(data))
+        self.assertAlmostEqual(response.data['total_return'], expected['total_return'], places=10)
+        self.assertAlmostEqual(response.data['sharpe_ratio'], expected['sharpe_ratio'], places=10)
+
+
+class CostModelTests(SimpleTestCase):
+    def setUp(self):
+        self.close = np.full(6, 50.0)
+        self.position = np.array([0, 1, 1, 0, 0, 0], dtype=float)
+
+    def test_free_model_matches_plain_run(self):
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(4).normal(0, 0.01, 500)))
+        strategy = strategies.get_strategy('RSI')
+        params = strategy.parse_params({})
+        plain = engine.run_strategy(close, strategy, params)
+        free = engine.run_strategy(close, strategy, params, costs=costs.CostModel())
+        np.testing.assert_array_equal(plain['portfolio_value'], free['portfolio_value'])
+        self.assertIsNone(free['cost_rate'])
+
+    def test_fixed_costs_charge_entry_and_exit(self):
+        model = costs.CostModel(commission_bps=5, spread_bps=6, slippage_bps=2)
+        exposure, charges, rate = engine.apply_costs(self.close, self.position, model)
+        _, value = engine.simulate(self.close, exposure, 10000.0, charges)
+        self.assertAlmostEqual(value[-1], 10000.0 * (1 - 0.001) ** 2)
+
+        trades = extract_trades(np.arange(6) + np.datetime64('2024-01-01'), self.close, self.position,
+                                equity=value, exposure=exposure, cost_rate=rate)
+        self.assertEqual(len(trades), 1)
+        self.assertAlmostEqual(trades[0]['percent_pnl'], -0.2)
+
+    def test_participation_cap_scales_the_run(self):
+        model = costs.CostModel(max_participation=0.1)
+        # Entering 10000 of equity at 50 is 200 shares; 0.1 of 500 allows 50 of them
+        volume = np.full(6, 500.0)
+        exposure, _, _ = engine.apply_costs(self.close, self.position, model, volume)
+        np.testing.assert_allclose(exposure, [0, 0.25, 0.25, 0, 0, 0])
+
+    def test_trades_compound_from_equity(self):
+        # The second trade is sized from the 20000 the first one left
+        close = np.array([10.0, 20.0, 20.0, 20.0, 40.0, 40.0])
+        position = np.array([1, 0, 0, 1, 0, 0], dtype=float)
+        _, value = engine.simulate(close, position)
+        trades = extract_trades(np.arange(6) + np.datetime64('2024-01-01'), close, position, equity=value)
+        self.assertEqual([t['dollar_pnl'] for t in trades], [10000.0, 20000.0])
+
+    def test_request_validation(self):
+        self.assertTrue(costs.CostModel.from_request(None).free)
+        with self.assertRaises(ValueError):
+            costs.CostModel.from_request({'fee': 1})
+        with self.assertRaises(ValueError):
+            costs.CostModel(spread_bps=-1)
+        with self.assertRaises(ValueError):
+            costs.CostModel(max_participation=2)
+        with self.assertRaises(ValueError):
+            engine.apply_costs(self.close, self.position, costs.CostModel(impact_bps=10))
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(12)
+        self.returns = rng.normal(0.0004, 0.012, 3000)
+        self.returns[0] = 0.0
+        self.values = 10000 * np.cumprod(1 + self.returns)
+
+    def test_rolling_kernels_match_pandas(self):
+        values = pd.Series(self.values)
+        returns = pd.Series(self.returns)
+        for window in (5, 63, 700):
+            np.testing.assert_array_equal(metrics.rolling_max(self.values, window),
+                                          values.rolling(window, min_periods=1).max().to_numpy())
+            expected = returns.rolling(window).mean() / returns.rolling(window).std() * np.sqrt(252)
+            np.testing.assert_allclose(metrics.rolling_sharpe(self.returns, window), expected.to_numpy(),
+                                       rtol=1e-7, equal_nan=True)
+
+    def test_drawdown_duration_counts_bars_since_peak(self):
+        values = np.array([1.0, 2.0, 1.5, 1.8, 2.0, 2.5, 2.4])
+        np.testing.assert_array_equal(metrics.drawdown_duration(values), [0, 0, 1, 2, 0, 0, 1])
+
+    def test_summary_ratios(self):
+        values = np.array([100.0, 110.0, 99.0, 121.0])
+        returns = metrics.bar_returns(values)
+        result = metrics.summary(returns, values, 100.0, periods_per_year=4, exposure=[1, 1, 0, 1])
+        downside = np.sqrt(0.1 ** 2 / 4)
+        self.assertAlmostEqual(result['sortino_ratio'], 2 * returns.mean() / downside)
+        self.assertAlmostEqual(result['annualized_return'], 0.21)
+        self.assertAlmostEqual(result['calmar_ratio'], 0.21 / 0.1)
+        self.assertEqual(result['max_drawdown_duration'], 1)
+        self.assertAlmostEqual(result['turnover'], 3.0)
+        self.assertAlmostEqual(result['average_exposure'], 0.75)
+
+    def test_with_rolling_aligns_series(self):
+        data = {'interval': '1d', 'equity_curve': self.values.tolist(),
+                'portfolio_dates': np.datetime_as_string(np.arange(3000) + np.datetime64('2000-01-03'), unit='D').tolist()}
+        extended = curves.with_rolling(data, 21)
+        for name in curves.ROLLING_FIELDS:
+            self.assertEqual(len(extended[name]), 3000)
+        self.assertIsNone(extended['rolling_sharpe'][19])
+        self.assertIsNotNone(extended['rolling_sharpe'][20])
+
+
+def use_temporary_store(test):
+    """Point the price store and indicator cache of a test at a temporary directory"""
+    root = tempfile.TemporaryDirectory()
+    test.addCleanup(root.cleanup)
+    # Prewarming runs on a pool thread, outside the test's transaction and settings
+    settings = override_settings(PRICE_STORE_DIR=os.path.join(root.name, 'prices'),
+                                 INDICATOR_CACHE_DIR=os.path.join(root.name, 'indicators'), INDICATOR_PREWARM=[])
+    settings.enable()
+    test.addCleanup(settings.disable)
+    indicator_store.clear()
+    test.addCleanup(indicator_store.clear)
+
+
+class PriceTableTests(TestCase):
+    def setUp(self):
+        use_temporary_store(self)
+        self.prices = providers.SyntheticProvider(seed=6).download('AAA', '2019-01-01', '2021-01-01')
+
+    def insert(self, symbol, prices, tz='UTC'):
+        # Aware datetimes in any zone are the same instants as the naive UTC store timestamps
+        timestamps = pd.DatetimeIndex(prices.timestamp).tz_localize('UTC').tz_convert(tz).to_pydatetime()
+        PriceData.objects.bulk_create([
+            PriceData(symbol=symbol, timestamp=timestamp, open=o, high=h, low=lo, close=c, volume=v)
+            for timestamp, o, h, lo, c, v in zip(timestamps, prices.open, prices.high, prices.low, prices.close, prices.volume)
+        ])
+
+    def assert_same_prices(self, actual, expected):
+        for column in price_store.COLUMNS:
+            np.testing.assert_array_equal(getattr(actual, column), getattr(expected, column))
+
+    def test_epoch_and_values_list_paths_read_the_same_rows(self):
+        self.insert('AAA', self.prices, tz='America/New_York')
+        queryset = price_table._queryset('AAA', None, None)
+        np.testing.assert_array_equal(price_table._epoch_rows(queryset), price_table._value_rows(queryset))
+        self.assert_same_prices(price_table.load_table('aaa'), self.prices)
+
+        start, end = self.prices.timestamp[10], self.prices.timestamp[20]
+        window = price_table.load_table('AAA', start, end)
+        np.testing.assert_array_equal(window.timestamp, self.prices.timestamp[10:21])
+        self.assertIsNone(price_table.load_table('BBB'))
+        self.assertEqual(len(price_table._value_rows(price_table._queryset('BBB', None, None))), 0)
+
+    @override_settings(LEGACY_PRICE_SYMBOL='aaa')
+    def test_legacy_rows_are_assigned_and_backfilled(self):
+        migration = importlib.import_module('backtester_app.migrations.0011_legacy_price_symbol')
+        self.insert('', self.prices)
+        # The last bars were fetched again under the symbol after the upgrade
+        self.insert('AAA', price_store.PriceArrays('AAA', *(getattr(self.prices, c)[-5:] for c in price_store.COLUMNS)))
+
+        migration.assign_legacy_symbol(django_apps, None)
+        self.assertFalse(PriceData.objects.filter(symbol='').exists())
+        self.assertEqual(PriceData.objects.filter(symbol='AAA').count(), len(self.prices))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bars.source_interval('AAA', '1d'), '1d')
+        self.assert_same_prices(price_store.load_series('AAA'), self.prices)
+        self.assertEqual(price_table.backfill('AAA'), 0)
+
+
+class JobStreamTests(TransactionTestCase):
+    """The job status stream served by Django's ASGI handler"""
+
+    def setUp(self):
+        for name, value in (('JOB_STREAM_INTERVAL', 0.02), ('JOB_STREAM_TIMEOUT', 3)):
+            self.addCleanup(setattr, views, name, getattr(views, name))
+            setattr(views, name, value)
+
+    async def get(self, path, query, sent):
+        request_read = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal request_read
+            if not request_read:
+                request_read = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'root_path': '', 'query_string': query, 'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        }
+        try:
+            await ASGIHandler()(scope, receive, sent.put)
+        finally:
+            disconnected.set()
+
+    def test_asgi_stream_sends_status_before_the_job_finishes(self):
+        job = jobs.enqueue('backtest', {'symbol': 'AAA'})
+
+        async def run():
+            sent = asyncio.Queue()
+            request = asyncio.create_task(self.get(f'/api/jobs/{job.pk}/', b'stream=1', sent))
+            start = await asyncio.wait_for(sent.get(), 5)
+            self.assertEqual(start['status'], 200)
+            first = await asyncio.wait_for(sent.get(), 5)
+            self.assertTrue(first['more_body'])
+            self.assertEqual(json.loads(first['body'])['status'], Job.QUEUED)
+
+            await sync_to_async(Job.objects.filter(pk=job.pk).update)(status=Job.FAILED, error='No data', message='Failed')
+            lines = []
+            while True:
+                message = await asyncio.wait_for(sent.get(), 5)
+                lines.extend(json.loads(line) for line in message.get('body', b'').splitlines())
+                if not message.get('more_body'):
+                    break
+            await asyncio.wait_for(request, 5)
+            self.assertEqual(lines[-1]['status'], Job.FAILED)
+            self.assertEqual(lines[-1]['error'], 'No data')
+
+        asyncio.run(run())
+
+
+class CurveEndpointTests(TestCase):
+    def setUp(self):
+        use_temporary_store(self)
+        provider = providers.SyntheticProvider(seed=9)
+        with self.captureOnCommitCallbacks(execute=True):
+            for symbol in ('AAA', 'BBB'):
+                price_store.write_series(provider.download(symbol, '2015-01-01', '2020-01-01'))
+
+    def post(self, view, query, data):
+        request = APIRequestFactory().post(f'/api/?{query}', data, format='json')
+        response = view.as_view()(request)
+        response.render()
+        return response
+
+    def assert_plain_curves(self, data, fields):
+        for field in fields:
+            self.assertIsInstance(data[field], list)
+        self.assertEqual(len(data['equity_curve']), len(data['portfolio_dates']))
+
+    def test_walk_forward_and_portfolio_return_curves_as_lists(self):
+        body = {'start_date': '2015-01-01', 'end_date': '2020-01-01'}
+        walk_forward = {**body, 'symbol': 'AAA', 'indicator': 'SMA', 'train_bars': 252, 'test_bars': 63,
+                        'params': {'short_window': [10, 20], 'long_window': [50, 100]}}
+        portfolio = {**body, 'symbols': ['AAA', 'BBB'], 'weighting': 'equal'}
+        for view, data, fields in ((views.WalkForwardView, walk_forward, ('equity_curve', 'portfolio_dates')),
+                                   (views.PortfolioView, portfolio, ('equity_curve', 'drawdown_curve', 'portfolio_dates'))):
+            with self.subTest(view=view.__name__):
+                full = json.loads(self.post(view, '', data).content)
+                self.assert_plain_curves(full, fields)
+
+                thinned = json.loads(self.post(view, 'max_points=50', data).content)
+                self.assert_plain_curves(thinned, fields)
+                self.assertEqual(len(thinned['equity_curve']), 50)
+                self.assertEqual(thinned['downsampled_from'], len(full['equity_curve']))
+
+
+    def test_walk_forward_rejects_sweep_only_rank_metrics(self):
+        data = {'start_date': '2015-01-01', 'end_date': '2020-01-01', 'symbol': 'AAA', 'indicator': 'SMA',
+                'train_bars': 252, 'test_bars': 63, 'rank_by': 'calmar_ratio',
+                'params': {'short_window': [10, 20], 'long_window': [50, 100]}}
+        response = self.post(views.WalkForwardView, '', data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rank_by must be one of', response.data['error'])
+
+    def test_walk_forward_reads_resampled_intraday_bars(self):
+        minutes = providers.SyntheticProvider(seed=3).download('CCC', '2020-01-01', '2020-03-01', '1m')
+        with self.captureOnCommitCallbacks(execute=True):
+            price_store.write_series(minutes, '1m')
+        data = {'start_date': '2020-01-01', 'end_date': '2020-03-01', 'symbol': 'CCC', 'indicator': 'SMA',
+                'interval': '15m', 'train_bars': 200, 'test_bars': 100, 'costs': {'commission_bps': 5},
+                'params': {'short_window': [5, 10], 'long_window': [20, 40]}}
+        response = self.post(views.WalkForwardView, '', data)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['interval'], '15m')
+        self.assertEqual(response.data['costs']['commission_bps'], 5.0)
+        self.assertIn('T', response.data['portfolio_dates'][0])
+
+        prices = bars.load_bars('CCC', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-03-01 23:59'), '15m')
+        expected = walkforward.run_walk_forward(
+            prices.close, 'SMA', sweep.build_grid('SMA', data['params']), 200, 100, max_workers=1,
+            periods_per_year=bars.periods_per_year(prices.timestamp, '15m'), costs=costs.CostModel(commission_bps=5)
+        )
+        self.assertAlmostEqual(response.data['sharpe_ratio'], expected['sharpe_ratio'], places=10)
+        self.assertEqual(len(response.data['equity_curve']), len(expected['equity']))
+
+class LoadBarsEndpointTests(TransactionTestCase):
+    """Sweep and Monte Carlo requests read bars the way a backtest does"""
+    # A backfill publishes the copied bars on commit, which in autocommit is before the view reads them
+    def setUp(self):
+        use_temporary_store(self)
+
+    def post(self, view, data):
+        return view.as_view()(APIRequestFactory().post('/api/', data, format='json'))
+
+    def test_legacy_table_symbol_is_backfilled(self):
+        prices = providers.SyntheticProvider(seed=4).download('OLD', '2018-01-01', '2021-01-01')
+        PriceData.objects.bulk_create([
+            PriceData(symbol='OLD', timestamp=timestamp, open=o, high=h, low=lo, close=c, volume=v)
+            for timestamp, o, h, lo, c, v in zip(pd.DatetimeIndex(prices.timestamp).tz_localize('UTC').to_pydatetime(),
+                                                 prices.open, prices.high, prices.low, prices.close, prices.volume)
+        ])
+        body = {'symbol': 'OLD', 'indicator': 'SMA', 'start_date': '2018-01-01', 'end_date': '2021-01-01'}
+        response = self.post(views.SweepView, {**body, 'params': {'short_window': [10, 20], 'long_window': [50, 100]}})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['evaluated'], 4)
+        response = self.post(views.MonteCarloView, {**body, 'short_window': 10, 'long_window': 50, 'n_sims': 50, 'seed': 1})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['bars'], len(prices) - 50)
+
+    def test_intraday_interval_is_resampled_and_annualized(self):
+        minutes = providers.SyntheticProvider(seed=5).download('MIN', '2020-01-01', '2020-02-01', '1m')
+        price_store.write_series(minutes, '1m')
+        prices = bars.load_bars('MIN', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-02-01 23:59'), '5m')
+        periods = bars.periods_per_year(prices.timestamp, '5m')
+        strategy = strategies.get_strategy('RSI')
+        params = strategy.parse_params({})
+        expected = engine.run_strategy(prices.close, strategy, params, periods_per_year=periods)
+
+        body = {'symbol': 'MIN', 'indicator': 'RSI', 'interval': '5m', 'start_date': '2020-01-01', 'end_date': '2020-02-01'}
+        response = self.post(views.SweepView, {**body, 'params': {'rsi_period': [14]}})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['interval'], '5m')
+        self.assertAlmostEqual(response.data['results'][0]['sharpe_ratio'], expected['sharpe_ratio'], places=10)
+
+        response = self.post(views.MonteCarloView, {**body, 'n_sims': 50, 'seed': 1})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['bars'], len(expected['strategy_returns']))
+        self.assertAlmostEqual(response.data['sharpe_ratio'], expected['sharpe_ratio'], places=10)
+
+
+def slice_prices(prices, lo=None, hi=None):
+    return price_store.PriceArrays(prices.symbol, *(getattr(prices, column)[lo:hi] for column in price_store.COLUMNS))
+
+
+class PriceStoreTests(TestCase):
+    def setUp(self):
+        use_temporary_store(self)
+        self.prices = providers.SyntheticProvider(seed=5).download('AAA', '2018-01-01', '2021-01-01')
+
+    def write(self, prices, interval='1d'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return price_store.write_series(prices, interval)
+
+    def append(self, prices, interval='1d'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return price_store.append_series(prices, interval)
+
+    def assert_same_prices(self, actual, expected):
+        for column in price_store.COLUMNS:
+            np.testing.assert_array_equal(getattr(actual, column), getattr(expected, column))
+
+    def chunk_dirs(self, path):
+        return sorted(entry for entry in os.listdir(path) if os.path.isdir(os.path.join(path, entry)))
+
+    def test_round_trip_and_catalog(self):
+        catalog = self.write(self.prices)
+        self.assert_same_prices(price_store.load_series('aaa'), self.prices)
+        self.assertEqual(catalog.bar_count, len(self.prices))
+        self.assertEqual(catalog.last_timestamp, price_store._aware(self.prices.timestamp[-1]))
+        self.assertEqual(price_store.data_version('AAA'), catalog.data_hash)
+
+        start, end = self.prices.timestamp[100], self.prices.timestamp[199]
+        self.assert_same_prices(price_store.load_series('AAA', start, end), slice_prices(self.prices, 100, 200))
+        self.assertIsNone(price_store.load_series('BBB'))
+
+    def test_append_replaces_the_overlap(self):
+        self.write(slice_prices(self.prices, None, 500))
+        first_version = price_store.data_version('AAA')
+        # The last stored bar comes back revised with the new ones
+        tail = slice_prices(self.prices, 499)
+        tail.close = tail.close.copy()
+        tail.close[0] += 1.0
+        catalog, added, replaced = self.append(tail)
+
+        self.assertEqual((added, replaced), (len(self.prices) - 500, 1))
+        self.assertEqual(catalog.bar_count, len(self.prices))
+        self.assertNotEqual(price_store.data_version('AAA'), first_version)
+        stored = price_store.load_series('AAA')
+        self.assertEqual(stored.close[499], self.prices.close[499] + 1.0)
+        self.assert_same_prices(slice_prices(stored, 500), slice_prices(self.prices, 500))
+        # The replaced chunk is removed once the new manifest is in place
+        self.assertEqual(len(self.chunk_dirs(price_store.symbol_dir('AAA'))), 1)
+
+    def test_intraday_append_rewrites_only_the_touched_months(self):
+        minutes = providers.SyntheticProvider(seed=5).download('AAA', '2021-01-25', '2021-03-05', '1m')
+        cut = int(np.searchsorted(minutes.timestamp, np.datetime64('2021-02-15', 'ns')))
+        self.write(slice_prices(minutes, None, cut), '1m')
+        path = price_store.series_dir('AAA', '1m')
+        january = [name for name in self.chunk_dirs(path) if name.startswith('2021-01')]
+
+        catalog, added, replaced = self.append(slice_prices(minutes, cut - 10), '1m')
+        self.assertEqual((added, replaced), (len(minutes) - cut, 10))
+        self.assertEqual(catalog.bar_count, len(minutes))
+        self.assert_same_prices(price_store.load_series('AAA', interval='1m'), minutes)
+        self.assertEqual([name.split('.')[0] for name in self.chunk_dirs(path)], ['2021-01', '2021-02', '2021-03'])
+        self.assertEqual([name for name in self.chunk_dirs(path) if name.startswith('2021-01')], january)
+
+    def test_rolled_back_write_leaves_files_and_catalog_as_they_were(self):
+        self.write(slice_prices(self.prices, None, 300))
+        version = price_store.data_version('AAA')
+        with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                price_store.write_series(self.prices)
+                raise RuntimeError('rolled back')
+
+        self.assertEqual(price_store.data_version('AAA'), version)
+        self.assert_same_prices(price_store.load_series('AAA'), slice_prices(self.prices, None, 300))
+
+    def test_columns_in_the_old_daily_layout_are_read_and_replaced(self):
+        path = price_store.symbol_dir('AAA')
+        price_store._write_columns(path, price_store._column_arrays(self.prices))
+        self.assertTrue(price_store.has_series('AAA'))
+        self.assert_same_prices(price_store.load_series('AAA'), self.prices)
+
+        self.write(slice_prices(self.prices, None, 100))
+        self.assertFalse(os.path.exists(os.path.join(path, 'timestamp.npy')))
+        self.assert_same_prices(price_store.load_series('AAA'), slice_prices(self.prices, None, 100))
+
+
+class FixedDatetime(datetime):
+    """datetime whose now() is a Wednesday, for ingest's notion of today"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 3, 13, 12, 0)
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        use_temporary_store(self)
+        self.addCleanup(setattr, ingest, 'datetime', ingest.datetime)
+        ingest.datetime = FixedDatetime
+        self.provider = providers.SyntheticProvider(seed=3)
+        # Every bar a refresh on the fixed day can see: up to the Tuesday before it
+        self.history = self.provider.download('AAA', ingest.HISTORY_START, '2024-03-13')
+
+    def refresh(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            results, missing = ingest.refresh_many(['AAA'], provider=self.provider, **kwargs)
+        self.assertEqual(missing, [])
+        return results[0]
+
+    def assert_stored_history(self):
+        stored = price_store.load_series('AAA')
+        for column in price_store.COLUMNS:
+            np.testing.assert_array_equal(getattr(stored, column), getattr(self.history, column))
+        table = price_table.load_table('AAA')
+        np.testing.assert_array_equal(table.timestamp, self.history.timestamp)
+        np.testing.assert_array_equal(table.close, self.history.close)
+
+    def test_first_refresh_stores_the_full_history(self):
+        result = self.refresh()
+        self.assertEqual((result['mode'], result['added'], result['replaced']), ('full', len(self.history), 0))
+        self.assertEqual(result['count'], len(self.history))
+        self.assert_stored_history()
+
+    def test_incremental_refresh_replaces_the_overlapping_bar(self):
+        stored = slice_prices(self.history, None, -15)
+        # The last stored bar was a partial day and has been revised since
+        stored.close = stored.close.copy()
+        stored.close[-1] *= 1.05
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest.store_prices(stored)
+
+        result = self.refresh()
+        self.assertEqual((result['mode'], result['added'], result['replaced']), ('incremental', 15, 1))
+        self.assertEqual(result['first_new'], str(self.history.timestamp[-15].astype('datetime64[D]')))
+        self.assertEqual(result['count'], len(self.history))
+        self.assert_stored_history()
+
+    def test_up_to_date_and_full_refreshes(self):
+        self.refresh()
+        version = price_store.data_version('AAA')
+        result = self.refresh()
+        self.assertEqual((result['mode'], result['added'], result['replaced']), ('up_to_date', 0, 0))
+        self.assertEqual(price_store.data_version('AAA'), version)
+
+        result = self.refresh(full=True)
+        self.assertEqual((result['mode'], result['added']), ('full', len(self.history)))
+        self.assertEqual(PriceData.objects.filter(symbol='AAA').count(), len(self.history))
+        self.assert_stored_history()
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        use_temporary_store(self)
+        with self.captureOnCommitCallbacks(execute=True):
+            price_store.write_series(providers.SyntheticProvider(seed=4).download('AAA', '2018-01-01', '2021-01-01'))
+        self.sweep = {'symbol': 'AAA', 'indicator': 'SMA', 'start_date': '2018-01-01', 'end_date': '2021-01-01',
+                      'params': {'short_window': [10, 20], 'long_window': [50, 100]}}
+
+    def test_each_job_is_claimed_once(self):
+        first = jobs.enqueue('sweep', self.sweep)
+        second = jobs.enqueue('sweep', self.sweep)
+        claims = [jobs.claim_next(f'worker-{i}') for i in range(3)]
+        self.assertEqual([job.pk if job else None for job in claims], [first.pk, second.pk, None])
+        self.assertEqual(claims[0].status, Job.RUNNING)
+        self.assertEqual(claims[0].worker, 'worker-0')
+        self.assertEqual(Job.objects.get(pk=second.pk).worker, 'worker-1')
+
+    def test_queued_sweep_runs_through_the_worker(self):
+        request = APIRequestFactory().post('/api/backtest/sweep/', {**self.sweep, 'async': True}, format='json')
+        response = views.SweepView.as_view()(request)
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual((job.kind, job.status), ('sweep', Job.QUEUED))
+        self.assertNotIn('async', job.payload)
+
+        call_command('run_jobs', '--burst', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(len(job.result['results']), 4)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failures_are_recorded_on_the_job(self):
+        job = jobs.enqueue('backtest', {'symbol': 'ZZZ', 'indicator': 'SMA', 'start_date': '2018-01-01', 'end_date': '2021-01-01'})
+        self.assertEqual(jobs.run_worker(burst=True, worker='test'), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('ZZZ', job.error)
+        self.assertTrue(job.message.startswith('Failed'))
+        self.assertIsNone(job.result)
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = jobs.enqueue('sweep', self.sweep)
+        fresh = jobs.enqueue('sweep', self.sweep)
+        jobs.claim_next('lost-worker')
+        jobs.claim_next('live-worker')
+        Job.objects.filter(pk=stale.pk).update(started_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(jobs.requeue_stale(3600), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.worker, stale.started_at), (Job.QUEUED, '', None))
+        self.assertEqual((fresh.status, fresh.worker), (Job.RUNNING, 'live-worker'))
+        self.assertEqual(jobs.claim_next('next-worker').pk, stale.pk)
+
+    def test_form_bodies_keep_repeated_fields(self):
+        request = APIRequestFactory().post('/api/portfolio/', {'symbols': ['AAA', 'BBB'], 'weighting': 'equal', 'async': 'true'})
+        response = views.PortfolioView.as_view()(request)
+        self.assertEqual(response.status_code, 202)
+        payload = Job.objects.get(pk=response.data['id']).payload
+        self.assertEqual(payload['symbols'], ['AAA', 'BBB'])
+        self.assertEqual(payload['weighting'], 'equal')
+        self.assertNotIn('async', payload)
+
+    def record_messages(self):
+        self.addCleanup(setattr, jobs, 'JOB_PROGRESS_INTERVAL', jobs.JOB_PROGRESS_INTERVAL)
+        jobs.JOB_PROGRESS_INTERVAL = 0
+        messages = []
+        record_progress = jobs.record_progress
+
+        def record(job, message):
+            record_progress(job, message)
+            messages.append(Job.objects.get(pk=job.pk).message)
+
+        self.addCleanup(setattr, jobs, 'record_progress', record_progress)
+        jobs.record_progress = record
+        return messages
+
+    def test_sweep_jobs_report_progress(self):
+        messages = self.record_messages()
+        job = jobs.enqueue('sweep', self.sweep)
+        jobs.run_worker(burst=True, worker='test')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(messages[-1], 'Evaluated 4 of 4 combinations')
+        self.assertTrue(job.message.startswith('Finished'))
+
+    def test_portfolio_jobs_report_progress(self):
+        messages = self.record_messages()
+        with self.captureOnCommitCallbacks(execute=True):
+            price_store.write_series(providers.SyntheticProvider(seed=5).download('BBB', '2018-01-01', '2021-01-01'))
+        job = jobs.enqueue('portfolio', {'symbols': ['AAA', 'BBB'], 'indicator': 'SMA', 'weighting': 'signal',
+                                         'start_date': '2018-01-01', 'end_date': '2021-01-01'})
+        jobs.run_worker(burst=True, worker='test')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED, job.error)
+        self.assertEqual(messages[0], 'Loading prices of 2 symbols')
+        self.assertIn('Computing SMA signals on 2 assets', messages)
+        self.assertTrue(messages[-1].startswith('Rebalancing 2 assets'))
+
+    def test_progress_is_throttled_and_skips_finished_jobs(self):
+        job = jobs.enqueue('sweep', self.sweep)
+        jobs.claim_next('test')
+        request = jobs.JobRequest({}, job)
+        request.report_progress('First')
+        request.report_progress('Too soon')
+        self.assertEqual(Job.objects.get(pk=job.pk).message, 'First')
+
+        Job.objects.filter(pk=job.pk).update(status=Job.SUCCEEDED, message='Finished in 1.00s')
+        jobs.record_progress(job, 'Late')
+        self.assertEqual(Job.objects.get(pk=job.pk).message, 'Finished in 1.00s')
+
+    def test_sync_stream_ends_after_a_few_seconds(self):
+        for name, value in (('JOB_STREAM_INTERVAL', 0.01), ('JOB_STREAM_SYNC_TIMEOUT', 0.05)):
+            self.addCleanup(setattr, views, name, getattr(views, name))
+            setattr(views, name, value)
+        job = jobs.enqueue('sweep', self.sweep)
+        response = views.JobDetailView.as_view()(RequestFactory().get(f'/api/jobs/{job.pk}/?stream=1'), job_id=job.pk)
+        started = time.monotonic()
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual([line['status'] for line in lines], [Job.QUEUED])
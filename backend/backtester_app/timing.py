@@ -0,0 +1,149 @@
+"""Per-stage request timing and on-demand profiling.
+
+A ``StageTimer`` measures named phases of one request (loading prices,
+running the strategy, extracting trades, saving, serializing, rendering).
+``finish`` reports them to the client in a ``Server-Timing`` header, which
+browser dev tools show under the request's timing tab, and adds them to
+process-wide statistics served by ``/api/metrics/``.
+
+With ``?profile=1`` (allowed when ``settings.REQUEST_PROFILING`` is on) the
+request also runs under cProfile and the JSON response carries a
+``profile`` list of the functions with the most cumulative time.
+"""
+import cProfile
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from rest_framework.response import Response
+
+# Recent durations kept per stage for the percentiles in metrics()
+SAMPLES = 1000
+PROFILE_ROWS = 30
+
+_lock = threading.Lock()
+_durations = defaultdict(lambda: defaultdict(lambda: deque(maxlen=SAMPLES)))
+_counts = defaultdict(lambda: defaultdict(int))
+
+
+class StageTimer:
+    """Wall time of the named stages of one request, in milliseconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        # A stage entered more than once (e.g. per symbol) accumulates
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def total(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        return ', '.join(f'{name};dur={ms:.2f}' for name, ms in self.stages.items())
+
+
+def record(view, stages):
+    """Add one request's stage durations to the process-wide statistics"""
+    with _lock:
+        for name, ms in stages.items():
+            _durations[view][name].append(ms)
+            _counts[view][name] += 1
+
+
+def metrics():
+    """{view: {stage: count, mean and percentiles in ms}} over the recent samples of this process"""
+    with _lock:
+        snapshot = {view: {name: (np.array(samples), _counts[view][name]) for name, samples in stages.items()}
+                    for view, stages in _durations.items()}
+    return {
+        view: {
+            name: {
+                'count': count,
+                'mean_ms': float(samples.mean()),
+                'p50_ms': float(np.percentile(samples, 50)),
+                'p95_ms': float(np.percentile(samples, 95)),
+                'max_ms': float(samples.max()),
+            }
+            for name, (samples, count) in stages.items()
+        }
+        for view, stages in snapshot.items()
+    }
+
+
+def reset():
+    with _lock:
+        _durations.clear()
+        _counts.clear()
+
+
+def profiling_allowed():
+    return settings.REQUEST_PROFILING
+
+
+@contextmanager
+def profiled(enabled):
+    """Run the block under cProfile if enabled; yields the profiler or None"""
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+
+
+def profile_summary(profiler, limit=PROFILE_ROWS):
+    """The functions with the most cumulative time, as JSON-friendly rows"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f'{filename}:{line}({function})',
+            'calls': calls,
+            'own_ms': own * 1000,
+            'cumulative_ms': cumulative * 1000,
+        })
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+
+def finish(response, view, timer, profiler=None):
+    """Attach the timings (and profile) to a view's response and record them.
+
+    DRF responses are rendered after the view returns, so rendering is timed
+    by a post-render callback that adds its stage to the header and metrics.
+    Streamed responses are encoded as they are sent and have no render stage.
+    """
+    timer.add('view', timer.total() / 1000)
+    if profiler is not None and isinstance(response, Response) and isinstance(response.data, dict):
+        response.data = {**response.data, 'profile': profile_summary(profiler)}
+    response['Server-Timing'] = timer.server_timing()
+    record(view, timer.stages)
+
+    if isinstance(response, Response) and not response.is_rendered:
+        returned = time.perf_counter()
+
+        def time_render(rendered):
+            # Only middleware runs between the view returning and rendering
+            timer.add('render', time.perf_counter() - returned)
+            rendered['Server-Timing'] = timer.server_timing()
+            record(view, {'render': timer.stages['render']})
+
+        response.add_post_render_callback(time_render)
+    return response
@@ -0,0 +1,55 @@
+"""Named lists of symbols for batch fetches.
+
+A few small universes are built in. Others are plain text files in
+``settings.UNIVERSE_DIR`` named ``<name>.txt`` with symbols separated by
+newlines, commas or spaces (``#`` starts a comment), so a list such as the
+S&P 500 constituents can be kept up to date without a code change. A file
+takes precedence over a built-in universe of the same name.
+"""
+import os
+import re
+
+from django.conf import settings
+
+from . import price_store
+
+BUILTIN = {
+    'dow30': [
+        'AAPL', 'AMGN', 'AMZN', 'AXP', 'BA', 'CAT', 'CRM', 'CSCO', 'CVX', 'DIS',
+        'GS', 'HD', 'HON', 'IBM', 'JNJ', 'JPM', 'KO', 'MCD', 'MMM', 'MRK',
+        'MSFT', 'NKE', 'NVDA', 'PG', 'SHW', 'TRV', 'UNH', 'V', 'VZ', 'WMT',
+    ],
+    'sector_etfs': ['XLB', 'XLC', 'XLE', 'XLF', 'XLI', 'XLK', 'XLP', 'XLRE', 'XLU', 'XLV', 'XLY'],
+    'benchmarks': ['SPY', 'QQQ', 'IWM', 'DIA'],
+}
+
+NAME_PATTERN = re.compile(r'^[a-z0-9_\-]{1,50}$')
+
+
+def _path(name):
+    return os.path.join(str(settings.UNIVERSE_DIR), f'{name}.txt')
+
+
+def parse_symbols(text):
+    """Symbols from free-form text, normalized and de-duplicated in order"""
+    text = re.sub(r'#.*', '', text)
+    return list(dict.fromkeys(price_store.normalize_symbol(s) for s in re.split(r'[\s,]+', text) if s))
+
+
+def available():
+    names = set(BUILTIN)
+    if os.path.isdir(str(settings.UNIVERSE_DIR)):
+        names.update(f[:-4] for f in os.listdir(str(settings.UNIVERSE_DIR)) if f.endswith('.txt'))
+    return sorted(names)
+
+
+def get_universe(name):
+    name = str(name or '').strip().lower()
+    if not NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid universe name: {name!r}")
+    if os.path.exists(_path(name)):
+        with open(_path(name)) as f:
+            return parse_symbols(f.read())
+    if name in BUILTIN:
+        return list(BUILTIN[name])
+    raise ValueError(f"Unknown universe: {name}. Available: {', '.join(available())}")
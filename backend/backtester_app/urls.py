@@ -1,8 +1,21 @@
 from django.urls import path
-from .views import DataFetchView, IndicatorsView, BacktestView
+from .concurrency import async_view
+from .views import DataFetchView, BatchFetchView, IndicatorsView, BacktestView, BacktestHistoryView, BacktestDetailView, SweepView, WalkForwardView, MonteCarloView, PortfolioView, MetricsView, MonitorListView, MonitorDetailView, JobListView, JobDetailView
 
 urlpatterns = [
-    path('fetch-data/', DataFetchView.as_view(), name='fetch-data'),
+    path('fetch-data/', async_view(DataFetchView, 'io'), name='fetch-data'),
+    path('fetch-data/batch/', async_view(BatchFetchView, 'io'), name='fetch-data-batch'),
     path('indicators/', IndicatorsView.as_view(), name='indicators'),
-    path('backtest/', BacktestView.as_view(), name='backtest'),
+    path('backtest/', async_view(BacktestView, 'compute'), name='backtest'),
+    path('backtest/results/', BacktestHistoryView.as_view(), name='backtest-results'),
+    path('backtest/results/<int:result_id>/', BacktestDetailView.as_view(), name='backtest-result-detail'),
+    path('backtest/sweep/', async_view(SweepView, 'compute'), name='backtest-sweep'),
+    path('backtest/walk-forward/', async_view(WalkForwardView, 'compute'), name='backtest-walk-forward'),
+    path('backtest/monte-carlo/', async_view(MonteCarloView, 'compute'), name='backtest-monte-carlo'),
+    path('portfolio/', async_view(PortfolioView, 'compute'), name='portfolio'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('monitors/', MonitorListView.as_view(), name='monitors'),
+    path('monitors/<int:monitor_id>/', MonitorDetailView.as_view(), name='monitor-detail'),
+    path('jobs/', JobListView.as_view(), name='jobs'),
+    path('jobs/<int:job_id>/', JobDetailView.as_view(), name='job-detail'),
 ] 
\ No newline at end of file
@@ -7,106 +7,168 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from .models import PriceData, BacktestResult
-from .serializers import PriceDataSerializer, BacktestResultSerializer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from .models import BacktestResult, Job, StrategyMonitor
+from .serializers import BacktestResultSerializer, BacktestSummarySerializer, StrategyMonitorSerializer
+from . import bars, codec, concurrency, costs, curves, engine, indicator_store, ingest, jobs, metrics, monitors, montecarlo, portfolio, price_store, result_cache, strategies, sweep, timing, universes, walkforward
+import asyncio
+import functools
 import logging
 import json
 import os
+import time
 from dotenv import load_dotenv
-import yfinance as yf  # Import yfinance
-from curl_cffi.requests import Session  # Import Session from curl_cffi
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# Configure yfinance to use curl_cffi to avoid rate limiting
-try:
-    session = Session()
-    session.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'})
-    yf.base.set_session(session)
-    logger.info("Successfully configured yfinance with curl_cffi session")
-except Exception as e:
-    logger.warning(f"Could not configure yfinance with curl_cffi: {str(e)}")
-
 # StockData.org API key (kept for reference, no longer used)
 STOCKDATA_API_KEY = os.getenv('STOCKDATA_API_KEY', 'your_api_key_here')
 
+# Seconds between job status checks while streaming progress
+JOB_STREAM_INTERVAL = 0.5
+JOB_STREAM_TIMEOUT = 600
+# A sync stream holds a web worker thread, so it ends early and the client polls again
+JOB_STREAM_SYNC_TIMEOUT = 5
+
+def _wants_job(request):
+    """True if the client asked for the request to be queued instead of run inline"""
+    return str(request.data.get('async', '')).lower() in ('1', 'true', 'yes')
+
+def _progress(request):
+    """The job's progress callback when the run_jobs worker runs this request, else None"""
+    return getattr(request, 'report_progress', None)
+
+def _load_end(end_date, interval):
+    """Last timestamp to load for an end date: the date itself for daily bars, its last minute for intraday ones"""
+    if interval == price_store.DAILY:
+        return end_date
+    return end_date.normalize() + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+
+def _query_flag(request, name):
+    """True if a ?name=1 style switch is set on the query string"""
+    return str(request.query_params.get(name, '')).lower() in ('1', 'true', 'yes')
+
+def _curve_response(request, data, status_code, headers=None):
+    """Response for a result with per-bar curves.
+
+    ?rolling_window=N adds rolling metric series over N bars, ?max_points=N
+    downsamples the curves for charting and ?stream=1 sends the result as
+    NDJSON chunks instead of one JSON document.
+    """
+    rolling_window = request.query_params.get('rolling_window')
+    if rolling_window:
+        data = curves.with_rolling(data, int(rolling_window))
+    max_points = request.query_params.get('max_points')
+    if max_points:
+        data = curves.downsample(data, int(max_points))
+    if _query_flag(request, 'stream'):
+        lines = curves.ndjson_lines(data)
+        if concurrency.is_asgi(request):
+            lines = concurrency.iterate_async(lines)
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson', status=status_code)
+        for name, value in (headers or {}).items():
+            response[name] = value
+        return response
+    return Response(data, status=status_code, headers=headers)
+
+def _queue_job(kind, data):
+    """Queue a request body for the run_jobs worker and answer 202 with the job"""
+    if hasattr(data, 'lists'):
+        # A form body is a QueryDict: keep repeated fields (symbols=A&symbols=B) as lists
+        data = {key: values if len(values) > 1 else values[0] for key, values in data.lists()}
+    else:
+        data = dict(data)
+    data.pop('async', None)
+    job = jobs.enqueue(kind, data)
+    return Response({**jobs.describe(job), 'url': f'/api/jobs/{job.pk}/'}, status=status.HTTP_202_ACCEPTED)
+
 # Create your views here.
 
 class DataFetchView(APIView):
     def post(self, request):
         try:
-            symbol = request.data.get('symbol', 'AAPL')  # Default to AAPL if not provided
+            if _wants_job(request):
+                return _queue_job('fetch', request.data)
             
-            logger.info(f"Fetching data for symbol: {symbol}")
+            symbol = price_store.normalize_symbol(request.data.get('symbol', 'AAPL'))  # Default to AAPL if not provided
             
-            # Use yfinance to fetch historical data
-            start_date = "2015-01-01"  # Get data from 2015 onwards
-            end_date = datetime.now().strftime('%Y-%m-%d')
+            logger.info(f"Fetching data for symbol: {symbol}")
             
-            logger.info(f"Fetching historical data for {symbol} from {start_date} to {end_date}")
-            df = yf.download(symbol, start=start_date, end=end_date)
+            # Only the bars after the last stored one are downloaded unless a full reload is requested
+            full_reload = str(request.data.get('full', '')).lower() in ('1', 'true', 'yes')
+            interval = price_store.normalize_interval(request.data.get('interval'))
+            changes = ingest.refresh_symbol(symbol, full=full_reload, interval=interval)
             
-            if df.empty:
+            if changes is None:
                 error_msg = f"No data found for symbol: {symbol}"
                 logger.error(error_msg)
                 return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
             
-            logger.info(f"Successfully fetched {len(df)} data points for {symbol}")
-            
-            # Process the data
-            price_data_objects = []
-            
-            for date, row in df.iterrows():
-                try:
-                    # Ensure date is timezone naive
-                    date_naive = date.replace(tzinfo=None)
-                    
-                    price_data_objects.append(PriceData(
-                        timestamp=date_naive,
-                        open=float(row['Open']),
-                        high=float(row['High']),
-                        low=float(row['Low']),
-                        close=float(row['Close']),
-                        volume=float(row['Volume']),
-                    ))
-                except (ValueError, KeyError) as e:
-                    logger.error(f"Error processing data point {date}: {str(e)}")
-                    continue
-            
-            if not price_data_objects:
-                error_msg = "No valid price data points found"
-                logger.error(error_msg)
-                return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Sort by date (oldest first)
-            price_data_objects.sort(key=lambda x: x.timestamp)
-            
-            # Clear existing data for this symbol
-            PriceData.objects.all().delete()
-            
-            # Bulk create objects
-            PriceData.objects.bulk_create(price_data_objects)
-            
-            logger.info(f"Successfully stored {len(price_data_objects)} data points for {symbol}")
+            logger.info(f"Fetch for {symbol} ({changes['mode']}): {changes['added']} new bars, {changes['replaced']} revised")
             return Response({
                 'message': f'Successfully fetched and stored data for {symbol}',
-                'count': len(price_data_objects)
+                **changes
             }, status=status.HTTP_201_CREATED)
             
         except Exception as e:
             logger.exception(f"Unexpected error in DataFetchView: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class BatchFetchView(APIView):
+    """Fetch many symbols (a list or a named universe) in grouped downloads"""
+    def get(self, request):
+        return Response({'universes': universes.available()})
+    
+    def post(self, request):
+        try:
+            if _wants_job(request):
+                return _queue_job('fetch_batch', request.data)
+            
+            symbols = request.data.get('symbols') or []
+            if isinstance(symbols, str):
+                symbols = universes.parse_symbols(symbols)
+            if request.data.get('universe'):
+                symbols = list(symbols) + universes.get_universe(request.data['universe'])
+            if not symbols:
+                return Response({'error': "Provide 'symbols' or a 'universe'"}, status=status.HTTP_400_BAD_REQUEST)
+            
+            full_reload = str(request.data.get('full', '')).lower() in ('1', 'true', 'yes')
+            interval = price_store.normalize_interval(request.data.get('interval'))
+            started = time.perf_counter()
+            results, missing = ingest.refresh_many(symbols, full=full_reload, interval=interval)
+            elapsed = time.perf_counter() - started
+            
+            added = sum(result['added'] for result in results)
+            logger.info(f"Batch fetch of {len(symbols)} symbols: {added} new bars, {len(missing)} without data, {elapsed:.2f}s")
+            return Response({
+                'message': f'Fetched {len(results)} of {len(results) + len(missing)} symbols',
+                'added': added,
+                'missing': missing,
+                'elapsed_seconds': elapsed,
+                'results': results
+            }, status=status.HTTP_201_CREATED)
+            
+        except Exception as e:
+            logger.exception(f"Unexpected error in BatchFetchView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
 class IndicatorsView(APIView):
     def get(self, request):
-        indicators = ['SMA', 'EMA', 'RSI']
-        return Response({'indicators': indicators})
+        return Response({
+            'indicators': list(strategies.STRATEGIES),
+            'strategies': strategies.available()
+        })
 
 class BenchmarkView(APIView):
     """Calculate buy-and-hold performance for a symbol (like SPY) without applying any strategy"""
     def post(self, request):
         try:
+            if _wants_job(request):
+                return _queue_job('benchmark', request.data)
+            
             symbol = request.data.get('symbol', 'SPY')
             start_date = pd.to_datetime(request.data.get('start_date'))
             end_date = pd.to_datetime(request.data.get('end_date'))
@@ -122,106 +184,65 @@ class BenchmarkView(APIView):
             
             logger.info(f"Calculating buy-and-hold performance for {symbol} from {start_date} to {end_date}")
             
-            # Format dates for yfinance
             start_date_str = start_date.strftime('%Y-%m-%d')
             end_date_str = end_date.strftime('%Y-%m-%d')
             
-            # Fetch data for symbol from yfinance
-            df = yf.download(symbol, start=start_date_str, end=end_date_str)
+            # Load from the price store, downloading only what is missing from the stored daily history
+            symbol = price_store.normalize_symbol(symbol)
+            interval = price_store.normalize_interval(request.data.get('interval'))
+            if interval == price_store.DAILY:
+                ingest.ensure_covered(symbol, end_date)
+            source = bars.source_interval(symbol, interval)
+            
+            # Same symbol, data and range as an earlier request: return the stored response
+            data_version = price_store.data_version(symbol, source) if source else None
+            cache_key = result_cache.make_key(
+                'benchmark', symbol, data_version, start=start_date_str, end=end_date_str, interval=interval
+            )
+            cached = result_cache.get(cache_key) if data_version else None
+            if cached is not None:
+                return _curve_response(request, cached, status.HTTP_200_OK, headers={'X-Cache': 'HIT'})
             
-            if df.empty:
+            prices = bars.load_bars(symbol, start_date, _load_end(end_date, interval), interval, source)
+            
+            if prices is None or len(prices) == 0:
                 error_msg = f"No data found for symbol: {symbol}"
                 logger.error(error_msg)
                 return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Log column names to debug the issue
-            logger.info(f"DataFrame columns from yfinance: {list(df.columns)}")
-            
-            # Handle MultiIndex columns if present
-            if isinstance(df.columns, pd.MultiIndex):
-                logger.info("MultiIndex columns detected, flattening DataFrame")
-                # Select only the columns for the requested symbol
-                df = df.xs(symbol, axis=1, level=1, drop_level=True)
-            
-            # Process data into the format we need
-            df.reset_index(inplace=True)  # Move Date from index to column
-            
-            # Ensure dates are timezone naive
-            df['Date'] = df['Date'].apply(lambda x: x.replace(tzinfo=None))
-            
-            logger.info(f"Found {len(df)} data points for {symbol} between {start_date_str} and {end_date_str}")
+            logger.info(f"Found {len(prices)} data points for {symbol} between {start_date_str} and {end_date_str}")
+            logger.info(f"{symbol} buy-and-hold from {float(prices.close[0]):.2f} to {float(prices.close[-1]):.2f}")
             
-            # Use the actual column name for adjusted close
-            adjusted_close_col = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
-            logger.info(f"Using {adjusted_close_col} column for adjusted close prices")
-            
-            # Since SPY has been up significantly since 2020, we should see positive returns
-            # Let's double-check the start and end prices are realistic
-            start_price = float(df[adjusted_close_col].iloc[0])
-            end_price = float(df[adjusted_close_col].iloc[-1])
-            logger.info(f"SPY buy-and-hold from {start_price:.2f} to {end_price:.2f}")
-            
-            # Calculate buy-and-hold performance
-            initial_capital = 10000.0
-            
-            # Calculate actual daily returns instead of smoothed returns
-            df['daily_returns'] = df[adjusted_close_col].pct_change().fillna(0)
-            
-            # Calculate portfolio value using actual returns
-            df['portfolio_value'] = initial_capital * (1 + df['daily_returns']).cumprod()
-            
-            # Calculate total return directly
-            total_return = (df[adjusted_close_col].iloc[-1] / df[adjusted_close_col].iloc[0]) - 1
-            
-            # Set index back to Date for calculations
-            df.set_index('Date', inplace=True)
-            
-            # Calculate drawdown and other metrics
-            df['peak'] = df['portfolio_value'].cummax()
-            df['drawdown'] = (df['portfolio_value'] / df['peak'] - 1)
-            max_drawdown = df['drawdown'].min()
-            
-            # Calculate Sharpe Ratio (annualized)
-            mean_daily_return = df['daily_returns'].mean()
-            std_daily_return = df['daily_returns'].std()
-            
-            if std_daily_return == 0 or pd.isna(std_daily_return):
-                sharpe_ratio = 0.0
-                logger.warning("Benchmark returns std deviation is zero or NaN, setting Sharpe ratio to 0.0")
-            else:
-                # Annualize (252 trading days)
-                sharpe_ratio = (mean_daily_return / std_daily_return) * np.sqrt(252)
-            
-            # Make sure sharpe_ratio is not NaN
-            if pd.isna(sharpe_ratio):
-                sharpe_ratio = 0.0
-                logger.warning("Benchmark Sharpe ratio calculation resulted in NaN, setting to 0.0")
+            # Buy-and-hold is a position of 1 from the first bar, run through the same engine as the strategies
+            initial_capital = engine.INITIAL_CAPITAL
+            periods_per_year = bars.periods_per_year(prices.timestamp, interval)
+            returns, portfolio_value = engine.simulate(prices.close, np.ones(len(prices)), initial_capital)
+            run_metrics = engine.performance_metrics(returns, portfolio_value, initial_capital, periods_per_year)
+            total_return = run_metrics['total_return']
+            max_drawdown = run_metrics['max_drawdown']
+            sharpe_ratio = run_metrics['sharpe_ratio']
             
             # Log the metrics for verification
-            logger.info(f"SPY metrics - Total Return: {total_return:.2%}, Max Drawdown: {max_drawdown:.2%}, Sharpe: {sharpe_ratio:.2f}")
-            
-            # Prepare data for frontend
-            portfolio_value = df['portfolio_value'].tolist()
-            portfolio_dates = [d.strftime('%Y-%m-%d') for d in df.index]
-            
-            # Convert to JSON
-            portfolio_value_json = json.dumps([float(x) for x in portfolio_value])
-            portfolio_dates_json = json.dumps(portfolio_dates)
+            logger.info(f"{symbol} metrics - Total Return: {total_return:.2%}, Max Drawdown: {max_drawdown:.2%}, Sharpe: {sharpe_ratio:.2f}")
             
             # Create response
             response_data = {
                 'symbol': symbol,
+                'interval': interval,
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d'),
-                'total_return': float(total_return),
-                'max_drawdown': float(max_drawdown),
-                'sharpe_ratio': float(sharpe_ratio),
-                'equity_curve': portfolio_value_json,
-                'portfolio_dates': portfolio_dates_json
+                'total_return': total_return,
+                'max_drawdown': max_drawdown,
+                'sharpe_ratio': sharpe_ratio,
+                'metrics': metrics.summary(returns, portfolio_value, initial_capital, periods_per_year),
+                'equity_curve': portfolio_value.tolist(),
+                'portfolio_dates': bars.format_timestamps(prices.timestamp, interval).tolist()
             }
             
             logger.info(f"{symbol} buy-and-hold performance: {total_return:.2%} total return")
-            return Response(response_data, status=status.HTTP_200_OK)
+            if data_version:
+                result_cache.set(cache_key, response_data)
+            return _curve_response(request, response_data, status.HTTP_200_OK, headers={'X-Cache': 'MISS'})
             
         except Exception as e:
             logger.exception(f"Unexpected error in BenchmarkView: {str(e)}")
@@ -229,8 +250,19 @@ class BenchmarkView(APIView):
 
 class BacktestView(APIView):
     def post(self, request):
+        # Stage timings go out in a Server-Timing header and to /api/metrics/; ?profile=1 adds a cProfile summary
+        timer = timing.StageTimer()
+        with timing.profiled(_query_flag(request, 'profile') and timing.profiling_allowed()) as profiler:
+            response = self.run_backtest(request, timer)
+        return timing.finish(response, 'backtest', timer, profiler)
+
+    def run_backtest(self, request, timer):
         try:
+            if _wants_job(request):
+                return _queue_job('backtest', request.data)
+            
             # Get strategy indicator type from the request
+            symbol = price_store.normalize_symbol(request.data.get('symbol', 'AAPL'))
             indicator = request.data.get('indicator')
             start_date = pd.to_datetime(request.data.get('start_date'))
             end_date = pd.to_datetime(request.data.get('end_date'))
@@ -247,277 +279,562 @@ class BacktestView(APIView):
             start_date_str = start_date.strftime('%Y-%m-%d')
             end_date_str = end_date.strftime('%Y-%m-%d')
             
-            # Get price data first before calculating indicators
-            price_data = PriceData.objects.filter(
-                timestamp__gte=start_date,
-                timestamp__lte=end_date
-            ).order_by('timestamp')
+            # Look up the strategy and its parameters in the registry
+            if indicator not in strategies.STRATEGIES:
+                error_msg = f'Unsupported indicator: {indicator}'
+                logger.error(error_msg)
+                return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
+            strategy = strategies.get_strategy(indicator)
+            params = strategy.parse_params(request.data)
+            cost_model = costs.CostModel.from_request(request.data.get('costs'))
+            compact = _query_flag(request, 'compact')
+            interval = price_store.normalize_interval(request.data.get('interval'))
+            source = bars.source_interval(symbol, interval)
+            
+            # A repeat of an earlier run on the same data returns that run's result instead of recomputing it
+            with timer.stage('cache'):
+                data_version = price_store.data_version(symbol, source) if source else None
+                cache_key = result_cache.make_key(
+                    'backtest', symbol, data_version, indicator=indicator, params=params,
+                    start=start_date_str, end=end_date_str, interval=interval, compact=compact,
+                    costs=cost_model.as_dict()
+                )
+                cached = result_cache.get(cache_key) if data_version else None
+            if cached is not None:
+                return _curve_response(request, cached, status.HTTP_200_OK, headers={'X-Cache': 'HIT'})
+            
+            # Get price data first before calculating indicators (resampled if only a finer interval is stored)
+            with timer.stage('load'):
+                prices = bars.load_bars(symbol, start_date, _load_end(end_date, interval), interval, source)
+            
+            if prices is None or len(prices) == 0:
+                error_msg = f'No price data found for {symbol} in the specified date range ({start_date_str} to {end_date_str})'
+                logger.error(error_msg)
+                return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Work on the stored arrays directly (timestamps in the store are already timezone naive)
+            logger.info(f"Found {len(prices)} {interval} bars for {symbol} between {start_date_str} and {end_date_str}")
+            logger.info(f"Running {indicator} backtest with parameters: {params}, date range: {start_date_str} to {end_date_str}")
+            
+            # Calculate indicators and signals, skipping the warmup period where they aren't valid
+            initial_capital = engine.INITIAL_CAPITAL
+            with timer.stage('strategy'):
+                # Indicators computed earlier are read back instead of recomputed; windowed ones are cut from the whole history
+                history = functools.partial(bars.load_bars, symbol, interval=interval, source=source)
+                arrays = strategies.IndicatorCache(
+                    prices.close, store=indicator_store.for_series(symbol, interval, data_version, prices.timestamp, history)
+                )
+                run = engine.run_strategy(
+                    prices.close, strategy, params, arrays, initial_capital=initial_capital,
+                    periods_per_year=bars.periods_per_year(prices.timestamp, interval),
+                    costs=cost_model, volume=prices.volume
+                )
+            total_return = run['total_return']
+            max_drawdown = run['max_drawdown']
+            sharpe_ratio = run['sharpe_ratio']
+            logger.info(f"Skipped {run['start']} data points as warmup period. Remaining data points: {len(run['position'])}")
+            
+            timestamps = np.asarray(prices.timestamp[run['start']:])
+            position = run['position']
+            
+            # Generate trades list from the position change points, sized from the compounding equity and net of costs
+            logger.info(f"Position changes detected: {int(np.count_nonzero(np.diff(position)))}")
+            unit = bars.date_unit(interval)
+            with timer.stage('trades'):
+                trades = engine.extract_trades(
+                    timestamps, prices.close[run['start']:], position, initial_capital, unit=unit,
+                    equity=run['portfolio_value'], exposure=run['exposure'], cost_rate=run['cost_rate']
+                )
+            
+            logger.info(f"Generated {len(trades)} trades")
+            
+            # Store the curve, its dates and the trades in compact binary form
+            with timer.stage('encode'):
+                portfolio_value = np.nan_to_num(run['portfolio_value'], nan=initial_capital)
+                curve_start, curve_dates = codec.encode_dates(timestamps, unit)
+                equity_curve = codec.encode_curve(portfolio_value)  # Now actual portfolio value
+                packed_trades = codec.encode_trades(trades, unit)
+            
+            logger.info(f"Prepared {len(portfolio_value)} dates for chart display from {curve_start or 'N/A'} to {bars.format_timestamps(timestamps[-1:], interval)[0] if len(timestamps) else 'N/A'}")
+            
+            # Create backtest result
+            with timer.stage('save'):
+                result = BacktestResult.objects.create(
+                    symbol=symbol,
+                    indicator=indicator,
+                    short_window=int(request.data.get('short_window', 0)),  # Default to 0 if not provided
+                    long_window=int(request.data.get('long_window', 0)),    # Default to 0 if not provided
+                    start_date=start_date,
+                    end_date=end_date,
+                    total_return=float(total_return),
+                    max_drawdown=float(max_drawdown),
+                    sharpe_ratio=float(sharpe_ratio),
+                    equity_curve=equity_curve,
+                    curve_start=curve_start,
+                    curve_dates=curve_dates,
+                    calendar=symbol,
+                    interval=interval,
+                    trades=packed_trades,
+                    costs={} if cost_model.free else cost_model.as_dict(),
+                    metrics={name: run[name] for name in metrics.SUMMARY_FIELDS if name in run}
+                )
+            
+            logger.info(f"Backtest completed successfully. Total return: {total_return:.2%}")
+            with timer.stage('serialize'):
+                response_data = BacktestResultSerializer(result, context={'compact': compact}).data
+            if data_version:
+                result_cache.set(cache_key, response_data)
+            return _curve_response(request, response_data, status.HTTP_201_CREATED, headers={'X-Cache': 'MISS'})
+            
+        except Exception as e:
+            logger.exception("Unexpected error in BacktestView")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class BacktestHistoryView(APIView):
+    """Stored backtest results, newest first, without their curves"""
+    def get(self, request):
+        try:
+            results = BacktestResult.objects.defer('equity_curve', 'curve_dates', 'trades').order_by('-created_at')
+            symbol = request.query_params.get('symbol')
+            if symbol:
+                results = results.filter(symbol=price_store.normalize_symbol(symbol))
+            limit = min(int(request.query_params.get('limit', 50)), 500)
+            return Response(BacktestSummarySerializer(results[:limit], many=True).data)
+        except Exception as e:
+            logger.exception("Unexpected error in BacktestHistoryView")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class BacktestDetailView(APIView):
+    """One stored backtest result with its equity curve, dates and trades"""
+    def get(self, request, result_id):
+        result = BacktestResult.objects.filter(pk=result_id).first()
+        if result is None:
+            return Response({'error': f'Backtest result {result_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            data = BacktestResultSerializer(result, context={'compact': _query_flag(request, 'compact')}).data
+            return _curve_response(request, data, status.HTTP_200_OK)
+        except Exception as e:
+            logger.exception("Unexpected error in BacktestDetailView")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class SweepView(APIView):
+    """Evaluate every combination of a strategy's parameter ranges over one price series"""
+    def post(self, request):
+        try:
+            if _wants_job(request):
+                return _queue_job('sweep', request.data)
+            
+            symbol = price_store.normalize_symbol(request.data.get('symbol', 'AAPL'))
+            indicator = request.data.get('indicator')
+            ranges = request.data.get('params') or {}
+            rank_by = request.data.get('rank_by', 'sharpe_ratio')
+            limit = request.data.get('limit')
+            start_date = pd.to_datetime(request.data.get('start_date')).replace(tzinfo=None)
+            end_date = pd.to_datetime(request.data.get('end_date')).replace(tzinfo=None)
             
-            if not price_data:
-                error_msg = f'No price data found for the specified date range ({start_date_str} to {end_date_str})'
+            # End date might be today or in the future; set it to yesterday to ensure data is available
+            current_date = datetime.now().date()
+            if end_date.date() >= current_date:
+                end_date = pd.to_datetime(current_date - timedelta(days=1))
+            
+            if not isinstance(ranges, dict):
+                return Response({'error': "'params' must map parameter names to ranges"}, status=status.HTTP_400_BAD_REQUEST)
+            param_sets = sweep.build_grid(indicator, ranges)
+            if not param_sets:
+                return Response({'error': 'No valid parameter combinations in the requested ranges'}, status=status.HTTP_400_BAD_REQUEST)
+            cost_model = costs.CostModel.from_request(request.data.get('costs'))
+            interval = price_store.normalize_interval(request.data.get('interval'))
+            
+            # Load the price series once for every combination (resampled or backfilled as a backtest's)
+            prices = bars.load_bars(symbol, start_date, _load_end(end_date, interval), interval)
+            if prices is None or len(prices) == 0:
+                error_msg = f'No price data found for {symbol} in the specified date range ({start_date:%Y-%m-%d} to {end_date:%Y-%m-%d})'
                 logger.error(error_msg)
                 return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Convert to DataFrame
-            df = pd.DataFrame(list(price_data.values()))
-            logger.info(f"Found {len(df)} data points between {start_date_str} and {end_date_str}")
-            
-            # Make sure timestamp is timezone naive if necessary
-            if df['timestamp'].iloc[0].tzinfo is not None:
-                df['timestamp'] = df['timestamp'].apply(lambda x: x.replace(tzinfo=None))
-            
-            # Default warmup period - will be overridden based on indicator
-            warmup_period = 0
-            
-            # Extract specific parameters based on the indicator type
-            if indicator == 'SMA':
-                # For Golden Cross strategy with 50/200 SMA
-                short_window = int(request.data.get('short_window', 50))
-                long_window = int(request.data.get('long_window', 200))
-                
-                logger.info(f"Calculating SMAs with windows {short_window} and {long_window}")
-                df['short_ma'] = df['close'].rolling(window=short_window).mean()
-                df['long_ma'] = df['close'].rolling(window=long_window).mean()
-                
-                # Check if we have enough data for the moving averages
-                min_required_points = long_window * 1.1  # Reduce from 1.5 to 1.1 to make it work with less data
-                if len(df) < min_required_points:
-                    error_msg = f"Insufficient data points for reliable analysis. This strategy requires at least {int(min_required_points)} days of data, but only {len(df)} days are available in the selected date range. Please extend your date range or choose a strategy with a shorter lookback period."
-                    logger.error(f"Not enough data points for reliable SMA calculation. Need at least {min_required_points} but have {len(df)}")
-                    return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Generate signals - only buy when short MA crosses above long MA, and sell when it crosses below
-                df['signal'] = 0  # Default no position
-                
-                # Determine crossover points for Golden Cross strategy
-                df['prev_diff'] = (df['short_ma'] - df['long_ma']).shift(1)
-                df['curr_diff'] = df['short_ma'] - df['long_ma']
-                
-                # Buy signal: prev_diff < 0 and curr_diff > 0 (cross above)
-                # Sell signal: prev_diff > 0 and curr_diff < 0 (cross below)
-                df.loc[(df['prev_diff'] < 0) & (df['curr_diff'] > 0), 'signal'] = 1    # Buy on golden cross
-                df.loc[(df['prev_diff'] > 0) & (df['curr_diff'] < 0), 'signal'] = -1   # Sell on death cross
-                
-                # Forward fill the signals - maintain position until next crossover
-                df['position'] = df['signal'].replace(to_replace=0, method='ffill')
-                
-                # Set initial position based on first valid data point
-                # If short MA > long MA at start, begin with a long position
-                first_valid_idx = df.dropna(subset=['short_ma', 'long_ma']).index[0]
-                if df.loc[first_valid_idx, 'short_ma'] > df.loc[first_valid_idx, 'long_ma']:
-                    df.loc[:first_valid_idx, 'position'] = 1
-                else:
-                    df.loc[:first_valid_idx, 'position'] = 0
-                    
-                df['position'] = df['position'].fillna(0)  # Fill any remaining NaNs with 0 (no position)
-                
-                warmup_period = long_window
-                logger.info(f"Generated signals for SMA strategy. Warmup period: {warmup_period}")
-            
-            elif indicator == 'RSI':
-                # Get RSI parameters
-                rsi_period = int(request.data.get('rsi_period', 14))
-                overbought = int(request.data.get('overbought', 70))
-                oversold = int(request.data.get('oversold', 30))
-                
-                # Calculate RSI
-                delta = df['close'].diff()
-                gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-                rs = gain / loss
-                df['rsi'] = 100 - (100 / (1 + rs))
-                
-                # Generate signals based on RSI
-                df['signal'] = 0
-                df.loc[df['rsi'] < oversold, 'signal'] = 1  # Buy when RSI is oversold
-                df.loc[df['rsi'] > overbought, 'signal'] = -1  # Sell when RSI is overbought
-                
-                warmup_period = rsi_period * 3  # Allow enough time for RSI to stabilize
-                logger.info(f"Running RSI backtest with parameters: rsi_period={rsi_period}, overbought={overbought}, oversold={oversold}, date range: {start_date_str} to {end_date_str}")
-            
-            elif indicator == 'MACD':
-                # Get MACD parameters
-                fast_period = int(request.data.get('fast_period', 12))
-                slow_period = int(request.data.get('slow_period', 26))
-                signal_period = int(request.data.get('signal_period', 9))
-                
-                # Calculate MACD components
-                df['ema_fast'] = df['close'].ewm(span=fast_period).mean()
-                df['ema_slow'] = df['close'].ewm(span=slow_period).mean()
-                df['macd'] = df['ema_fast'] - df['ema_slow']
-                df['signal_line'] = df['macd'].ewm(span=signal_period).mean()
-                
-                # Generate signals based on MACD crossing signal line
-                df['signal'] = 0
-                df.loc[df['macd'] > df['signal_line'], 'signal'] = 1  # Buy when MACD crosses above signal
-                df.loc[df['macd'] < df['signal_line'], 'signal'] = -1  # Sell when MACD crosses below signal
-                
-                warmup_period = max(fast_period, slow_period, signal_period) * 3
-                logger.info(f"Running MACD backtest with parameters: fast_period={fast_period}, slow_period={slow_period}, signal_period={signal_period}, date range: {start_date_str} to {end_date_str}")
-            
-            elif indicator == 'BBANDS':
-                # Get Bollinger Bands parameters
-                window = int(request.data.get('window', 20))
-                num_std_dev = float(request.data.get('num_std_dev', 2.0))
-                
-                # Calculate Bollinger Bands
-                df['sma'] = df['close'].rolling(window=window).mean()
-                df['std'] = df['close'].rolling(window=window).std()
-                df['upper_band'] = df['sma'] + (df['std'] * num_std_dev)
-                df['lower_band'] = df['sma'] - (df['std'] * num_std_dev)
-                
-                # Generate signals based on price crossing bands
-                df['signal'] = 0
-                df.loc[df['close'] < df['lower_band'], 'signal'] = 1  # Buy when price crosses below lower band
-                df.loc[df['close'] > df['upper_band'], 'signal'] = -1  # Sell when price crosses above upper band
-                
-                warmup_period = window * 3
-                logger.info(f"Running Bollinger Bands backtest with parameters: window={window}, num_std_dev={num_std_dev}, date range: {start_date_str} to {end_date_str}")
-            else:
-                error_msg = f'Unsupported indicator: {indicator}'
+            report = _progress(request)
+            started = time.perf_counter()
+            rows = sweep.run_sweep(
+                np.array(prices.close), indicator, param_sets,
+                max_workers=settings.SWEEP_MAX_WORKERS, rank_by=rank_by,
+                costs=cost_model, volume=np.array(prices.volume) if cost_model.uses_volume else None,
+                periods_per_year=bars.periods_per_year(prices.timestamp, interval),
+                progress=report and (lambda done, total: report(f'Evaluated {done} of {total} combinations'))
+            )
+            elapsed = time.perf_counter() - started
+            evaluated = sum(1 for row in rows if 'error' not in row)
+            logger.info(f"Sweep over {len(param_sets)} {indicator} combinations for {symbol} took {elapsed:.2f}s")
+            
+            return Response({
+                'symbol': symbol,
+                'indicator': indicator,
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+                'interval': interval,
+                'rank_by': rank_by,
+                'costs': cost_model.as_dict(),
+                'combinations': len(param_sets),
+                'evaluated': evaluated,
+                'failed': len(rows) - evaluated,
+                'elapsed_seconds': elapsed,
+                'results': rows[:int(limit)] if limit else rows,
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.exception(f"Unexpected error in SweepView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class WalkForwardView(APIView):
+    """Re-optimize a strategy on rolling train windows and trade the winners out of sample"""
+    def post(self, request):
+        try:
+            if _wants_job(request):
+                return _queue_job('walk_forward', request.data)
+            
+            symbol = price_store.normalize_symbol(request.data.get('symbol', 'AAPL'))
+            indicator = request.data.get('indicator')
+            ranges = request.data.get('params') or {}
+            rank_by = request.data.get('rank_by', 'sharpe_ratio')
+            train_bars = int(request.data.get('train_bars', 504))
+            test_bars = int(request.data.get('test_bars', 126))
+            anchored = str(request.data.get('anchored', '')).lower() in ('1', 'true', 'yes')
+            start_date = pd.to_datetime(request.data.get('start_date')).replace(tzinfo=None)
+            end_date = pd.to_datetime(request.data.get('end_date')).replace(tzinfo=None)
+            
+            # End date might be today or in the future; set it to yesterday to ensure data is available
+            current_date = datetime.now().date()
+            if end_date.date() >= current_date:
+                end_date = pd.to_datetime(current_date - timedelta(days=1))
+            
+            if not isinstance(ranges, dict):
+                return Response({'error': "'params' must map parameter names to ranges"}, status=status.HTTP_400_BAD_REQUEST)
+            param_sets = sweep.build_grid(indicator, ranges)
+            if not param_sets:
+                return Response({'error': 'No valid parameter combinations in the requested ranges'}, status=status.HTTP_400_BAD_REQUEST)
+            cost_model = costs.CostModel.from_request(request.data.get('costs'))
+            interval = price_store.normalize_interval(request.data.get('interval'))
+            
+            # Resampled if only a finer interval is stored, and backfilled from the PriceData table if needed
+            prices = bars.load_bars(symbol, start_date, _load_end(end_date, interval), interval)
+            if prices is None or len(prices) == 0:
+                error_msg = f'No price data found for {symbol} in the specified date range ({start_date:%Y-%m-%d} to {end_date:%Y-%m-%d})'
                 logger.error(error_msg)
                 return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Skip the warmup period where indicators aren't valid
-            original_length = len(df)
-            if len(df) > warmup_period:
-                df = df.iloc[warmup_period:]
-                logger.info(f"Skipped {warmup_period} data points as warmup period. Remaining data points: {len(df)}")
-            else:
-                logger.warning(f"Not enough data points ({len(df)}) for warmup period ({warmup_period})")
+            started = time.perf_counter()
+            run = walkforward.run_walk_forward(
+                np.array(prices.close), indicator, param_sets, train_bars, test_bars,
+                anchored=anchored, rank_by=rank_by, max_workers=settings.SWEEP_MAX_WORKERS,
+                periods_per_year=bars.periods_per_year(prices.timestamp, interval),
+                costs=cost_model, volume=np.array(prices.volume) if cost_model.uses_volume else None
+            )
+            elapsed = time.perf_counter() - started
+            logger.info(f"Walk-forward of {len(run['folds'])} folds for {symbol} took {elapsed:.2f}s")
+            
+            dates = bars.format_timestamps(prices.timestamp, interval)
+            folds = [{
+                'train_start': dates[fold['train_start']],
+                'train_end': dates[fold['train_end'] - 1],
+                'test_start': dates[fold['train_end']],
+                'test_end': dates[fold['test_end'] - 1],
+                'params': fold['params'],
+                'train': fold['train'],
+                'test': fold['test'],
+            } for fold in run['folds']]
+            
+            return _curve_response(request, {
+                'symbol': symbol,
+                'indicator': indicator,
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+                'interval': interval,
+                'costs': cost_model.as_dict(),
+                'rank_by': rank_by,
+                'train_bars': train_bars,
+                'test_bars': test_bars,
+                'anchored': anchored,
+                'combinations': run['combinations'],
+                'total_return': run['total_return'],
+                'max_drawdown': run['max_drawdown'],
+                'sharpe_ratio': run['sharpe_ratio'],
+                'elapsed_seconds': elapsed,
+                'folds': folds,
+                'equity_curve': run['equity'].tolist(),
+                'portfolio_dates': dates[run['start']:].tolist()
+            }, status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.exception(f"Unexpected error in WalkForwardView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class MonteCarloView(APIView):
+    """Confidence intervals for a backtest's metrics from resampled strategy returns"""
+    def post(self, request):
+        try:
+            if _wants_job(request):
+                return _queue_job('monte_carlo', request.data)
+            
+            symbol = price_store.normalize_symbol(request.data.get('symbol', 'AAPL'))
+            indicator = request.data.get('indicator')
+            methods = request.data.get('methods') or list(montecarlo.METHODS)
+            if isinstance(methods, str):
+                methods = [methods]
+            n_sims = int(request.data.get('n_sims', 10000))
+            block_size = int(request.data.get('block_size', 20))
+            confidence = float(request.data.get('confidence', 0.9))
+            seed = request.data.get('seed')
+            start_date = pd.to_datetime(request.data.get('start_date')).replace(tzinfo=None)
+            end_date = pd.to_datetime(request.data.get('end_date')).replace(tzinfo=None)
+            
+            # End date might be today or in the future; set it to yesterday to ensure data is available
+            current_date = datetime.now().date()
+            if end_date.date() >= current_date:
+                end_date = pd.to_datetime(current_date - timedelta(days=1))
+            
+            strategy = strategies.get_strategy(indicator)
+            params = strategy.parse_params(request.data.get('params') or request.data)
+            cost_model = costs.CostModel.from_request(request.data.get('costs'))
+            interval = price_store.normalize_interval(request.data.get('interval'))
             
-            if len(df) == 0:
-                error_msg = f"After applying warmup period, no data points remain for backtest"
+            prices = bars.load_bars(symbol, start_date, _load_end(end_date, interval), interval)
+            if prices is None or len(prices) == 0:
+                error_msg = f'No price data found for {symbol} in the specified date range ({start_date:%Y-%m-%d} to {end_date:%Y-%m-%d})'
                 logger.error(error_msg)
                 return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Calculate positions, returns, and portfolio value
-            initial_capital = 10000.0
-            
-            if indicator == 'SMA':  # Special handling for SMA golden cross
-                # We already calculated position in the indicator section for SMA
-                df['position_changed'] = df['position'].diff().fillna(0) != 0  # Flag when position changes
-            else:
-                df['position'] = df['signal']  # Current position
-                df['position_changed'] = df['position'].diff().fillna(0) != 0  # Flag when position changes
-            
-            # Calculate returns based on positions
-            df['returns'] = df['close'].pct_change().fillna(0)
-            df['strategy_returns'] = df['position'].shift(1).fillna(0) * df['returns']
-            df['portfolio_value'] = initial_capital * (1 + df['strategy_returns']).cumprod()
-            
-            # Calculate metrics
-            total_return = df['portfolio_value'].iloc[-1] / initial_capital - 1
-            cumulative_returns = df['portfolio_value']
-            max_drawdown = (cumulative_returns / cumulative_returns.cummax() - 1).min()
-            
-            # Handle case where std dev is zero (happens with no trades or constant returns)
-            std_dev = df['strategy_returns'].std()
-            if std_dev == 0 or pd.isna(std_dev):
-                sharpe_ratio = 0.0
-                logger.warning("Strategy returns std deviation is zero or NaN, setting Sharpe ratio to 0.0")
-            else:
-                sharpe_ratio = np.sqrt(252) * df['strategy_returns'].mean() / std_dev
-            
-            # Make sure sharpe_ratio is not NaN
-            if pd.isna(sharpe_ratio):
-                sharpe_ratio = 0.0
-                logger.warning("Strategy Sharpe ratio calculation resulted in NaN, setting to 0.0")
-            
-            # Generate trades list with correct P&L
-            trades = []
-            position = 0
-            entry_price = 0
-            entry_date = None
-            
-            # For debugging: check if we have any position changes
-            logger.info(f"Position changes detected: {df['position_changed'].sum()}")
-            position_changes = df[df['position_changed'] != 0]
-            logger.info(f"Found {len(position_changes)} position changes")
-            
-            # Loop through all rows
-            for idx, row in df.iterrows():
-                current_position = row['position']
-                
-                # If we're in cash and get a new position
-                if position == 0 and current_position != 0:
-                    # Enter new position
-                    position = current_position
-                    entry_price = row['close']
-                    entry_date = row['timestamp']
-                    position_type = "LONG" if position > 0 else "SHORT"
-                    logger.info(f"Entered {position_type} position at {entry_price} on {entry_date}")
-                
-                # If we're in a position and position changes or end of backtest
-                elif position != 0 and (current_position != position or idx == len(df) - 1):
-                    # Close the position (either signal changed or last day of backtest)
-                    exit_price = row['close']
-                    exit_date = row['timestamp']
-                    
-                    # Calculate P&L
-                    if position == 1:  # Long position
-                        percent_pnl = (exit_price - entry_price) / entry_price * 100
-                    else:  # Short position
-                        percent_pnl = (entry_price - exit_price) / entry_price * 100
-                    
-                    # Calculate position size (using initial capital)
-                    position_size = initial_capital / entry_price
-                    dollar_pnl = (exit_price - entry_price) * position * position_size
-                    
-                    # Record the trade
-                    trades.append({
-                        'entry_date': entry_date.strftime('%Y-%m-%d'),
-                        'exit_date': exit_date.strftime('%Y-%m-%d'),
-                        'entry_price': float(entry_price),
-                        'exit_price': float(exit_price),
-                        'position': int(position),
-                        'percent_pnl': float(percent_pnl),
-                        'dollar_pnl': float(dollar_pnl)
-                    })
-                    
-                    logger.info(f"Exited position at {exit_price} on {exit_date} with P&L: {percent_pnl:.2f}%")
-                    
-                    # If we're switching directly to a new position
-                    if current_position != 0 and current_position != position:
-                        position = current_position
-                        entry_price = exit_price  # Re-enter at the same price
-                        entry_date = exit_date
-                        new_position_type = "LONG" if position > 0 else "SHORT"
-                        logger.info(f"Entered new {new_position_type} position at {entry_price} on {entry_date}")
-                    else:
-                        position = 0  # Go to cash
+            periods_per_year = bars.periods_per_year(prices.timestamp, interval)
+            run = engine.run_strategy(np.array(prices.close), strategy, params, periods_per_year=periods_per_year,
+                                      costs=cost_model, volume=prices.volume)
+            # Position held over each bar, which is what a trade-order shuffle keeps together
+            held = np.zeros(len(run['exposure']))
+            held[1:] = run['exposure'][:-1]
+            
+            started = time.perf_counter()
+            simulations = {}
+            for method in methods:
+                simulated = montecarlo.simulate(
+                    run['strategy_returns'], method, n_sims, block_size=block_size, held=held,
+                    seed=None if seed is None else int(seed), periods_per_year=periods_per_year
+                )
+                simulations[method] = montecarlo.summarize(simulated, run, confidence)
+            elapsed = time.perf_counter() - started
+            logger.info(f"{n_sims} simulations x {len(methods)} methods over {len(held)} bars took {elapsed:.2f}s")
             
-            logger.info(f"Generated {len(trades)} trades")
+            return Response({
+                'symbol': symbol,
+                'indicator': indicator,
+                'params': params,
+                'costs': cost_model.as_dict(),
+                'interval': interval,
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+                'n_sims': n_sims,
+                'block_size': block_size,
+                'confidence': confidence,
+                'bars': len(held),
+                'total_return': run['total_return'],
+                'max_drawdown': run['max_drawdown'],
+                'sharpe_ratio': run['sharpe_ratio'],
+                'elapsed_seconds': elapsed,
+                'simulations': simulations
+            }, status=status.HTTP_200_OK)
             
-            # Convert portfolio value and dates to JSON-serializable format, handling NaN values
-            portfolio_value = cumulative_returns.fillna(initial_capital).tolist()
-            portfolio_dates = [d.strftime('%Y-%m-%d') for d in df['timestamp']]
-            portfolio_value_json = json.dumps([float(x) for x in portfolio_value])
-            portfolio_dates_json = json.dumps(portfolio_dates)
+        except Exception as e:
+            logger.exception(f"Unexpected error in MonteCarloView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class PortfolioView(APIView):
+    """Backtest a basket of symbols with a weighting rule and periodic rebalancing"""
+    def post(self, request):
+        try:
+            if _wants_job(request):
+                return _queue_job('portfolio', request.data)
             
-            logger.info(f"Prepared {len(portfolio_dates)} dates for chart display from {portfolio_dates[0] if portfolio_dates else 'N/A'} to {portfolio_dates[-1] if portfolio_dates else 'N/A'}")
+            symbols = request.data.get('symbols') or []
+            if isinstance(symbols, str):
+                symbols = symbols.split(',')
+            symbols = list(dict.fromkeys(price_store.normalize_symbol(s) for s in symbols))
+            if not symbols:
+                return Response({'error': 'Provide at least one symbol'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Create backtest result
-            result = BacktestResult.objects.create(
-                indicator=indicator,
-                short_window=int(request.data.get('short_window', 0)),  # Default to 0 if not provided
-                long_window=int(request.data.get('long_window', 0)),    # Default to 0 if not provided
-                start_date=start_date,
-                end_date=end_date,
-                total_return=float(total_return),
-                max_drawdown=float(max_drawdown),
-                sharpe_ratio=float(sharpe_ratio),
-                equity_curve=portfolio_value_json,  # Now actual portfolio value
-                trades=json.dumps(trades)
+            weighting = request.data.get('weighting', 'equal')
+            indicator = request.data.get('indicator')
+            rebalance_every = int(request.data.get('rebalance_every', 21))
+            vol_lookback = int(request.data.get('vol_lookback', 63))
+            initial_capital = float(request.data.get('initial_capital', engine.INITIAL_CAPITAL))
+            start_date = pd.to_datetime(request.data.get('start_date')).replace(tzinfo=None)
+            end_date = pd.to_datetime(request.data.get('end_date')).replace(tzinfo=None)
+            
+            # End date might be today or in the future; set it to yesterday to ensure data is available
+            current_date = datetime.now().date()
+            if end_date.date() >= current_date:
+                end_date = pd.to_datetime(current_date - timedelta(days=1))
+            
+            strategy = params = None
+            if indicator:
+                strategy = strategies.get_strategy(indicator)
+                params = strategy.parse_params(request.data.get('params') or request.data)
+            
+            report = _progress(request)
+            if report:
+                report(f'Loading prices of {len(symbols)} symbols')
+            timestamps, close, missing = price_store.load_matrix(symbols, start_date, end_date)
+            if missing:
+                error_msg = f"No stored price data for: {', '.join(missing)}. Fetch these symbols first."
+                logger.error(error_msg)
+                return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
+            if len(timestamps) == 0:
+                error_msg = f'No dates with data for every symbol between {start_date:%Y-%m-%d} and {end_date:%Y-%m-%d}'
+                logger.error(error_msg)
+                return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
+            
+            logger.info(f"Running {weighting} portfolio backtest over {len(symbols)} symbols and {len(timestamps)} bars")
+            run = portfolio.run_portfolio(
+                close, weighting, strategy, params,
+                rebalance_every=rebalance_every, vol_lookback=vol_lookback, initial_capital=initial_capital,
+                progress=report
             )
             
-            logger.info(f"Backtest completed successfully. Total return: {total_return:.2%}")
-            serializer = BacktestResultSerializer(result)
-            # Add portfolio_dates to the response
-            response_data = serializer.data
-            response_data['portfolio_dates'] = portfolio_dates_json
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            portfolio_dates = pd.DatetimeIndex(timestamps[run['start']:]).strftime('%Y-%m-%d').tolist()
+            return _curve_response(request, {
+                'symbols': symbols,
+                'weighting': weighting,
+                'indicator': indicator,
+                'params': params,
+                'rebalance_every': rebalance_every,
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+                'total_return': run['total_return'],
+                'max_drawdown': run['max_drawdown'],
+                'sharpe_ratio': run['sharpe_ratio'],
+                'exposure': run['exposure'],
+                'final_weights': dict(zip(symbols, run['weights'].tolist())),
+                'equity_curve': run['equity'].tolist(),
+                'drawdown_curve': run['drawdown'].tolist(),
+                'portfolio_dates': portfolio_dates
+            }, status.HTTP_200_OK)
             
         except Exception as e:
-            logger.exception("Unexpected error in BacktestView")
+            logger.exception(f"Unexpected error in PortfolioView: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class MetricsView(APIView):
+    """Per-stage request timings aggregated in this process (see timing.py)"""
+    def get(self, request):
+        return Response({'views': timing.metrics(), 'samples_per_stage': timing.SAMPLES})
+
+    def delete(self, request):
+        timing.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class MonitorListView(APIView):
+    """Saved strategies carried forward as new bars are stored (see monitors.py)"""
+    def get(self, request):
+        try:
+            queryset = StrategyMonitor.objects.defer('state')
+            symbol = request.query_params.get('symbol')
+            if symbol:
+                queryset = queryset.filter(symbol=price_store.normalize_symbol(symbol))
+            return Response(StrategyMonitorSerializer(queryset, many=True).data)
+        except Exception as e:
+            logger.exception("Unexpected error in MonitorListView")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def post(self, request):
+        try:
+            indicator = request.data.get('indicator')
+            start_date = request.data.get('start_date')
+            if not start_date:
+                return Response({'error': "'start_date' is required"}, status=status.HTTP_400_BAD_REQUEST)
+            monitor = monitors.create(
+                request.data.get('symbol', 'AAPL'), indicator, request.data, start_date,
+                interval=request.data.get('interval'), cost_spec=request.data.get('costs')
+            )
+            return Response(StrategyMonitorSerializer(monitor).data, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            logger.exception(f"Unexpected error in MonitorListView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class MonitorDetailView(APIView):
+    """One saved strategy; POST carries it forward over any bars stored since its checkpoint"""
+    def get(self, request, monitor_id):
+        monitor = StrategyMonitor.objects.filter(pk=monitor_id).first()
+        if monitor is None:
+            return Response({'error': f'Monitor {monitor_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(StrategyMonitorSerializer(monitor).data)
+    
+    def post(self, request, monitor_id):
+        monitor = StrategyMonitor.objects.filter(pk=monitor_id).first()
+        if monitor is None:
+            return Response({'error': f'Monitor {monitor_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            if monitors.advance(monitor):
+                monitor.save()
+            return Response(StrategyMonitorSerializer(monitor).data)
+        except Exception as e:
+            logger.exception(f"Unexpected error in MonitorDetailView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def delete(self, request, monitor_id):
+        deleted, _ = StrategyMonitor.objects.filter(pk=monitor_id).delete()
+        if not deleted:
+            return Response({'error': f'Monitor {monitor_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class JobListView(APIView):
+    """Queue a fetch, benchmark, backtest, sweep or portfolio request to run on a worker"""
+    def get(self, request):
+        queryset = Job.objects.order_by('-created_at')
+        if request.query_params.get('status'):
+            queryset = queryset.filter(status=request.query_params['status'])
+        return Response({'jobs': [jobs.describe(job) for job in queryset[:50]]})
+    
+    def post(self, request):
+        try:
+            data = request.data.get('data') or {}
+            if not isinstance(data, dict):
+                return Response({'error': "'data' must be the request body for the job's endpoint"}, status=status.HTTP_400_BAD_REQUEST)
+            return _queue_job(request.data.get('kind'), data)
+        except Exception as e:
+            logger.exception(f"Unexpected error in JobListView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class JobDetailView(APIView):
+    """Job status and result; ?stream=1 streams status changes as NDJSON until the job is done (a few seconds under WSGI)"""
+    def get(self, request, job_id):
+        job = Job.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({'error': f'No job with id {job_id}'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if _query_flag(request, 'stream'):
+            lines = self.stream_async(job) if concurrency.is_asgi(request) else self.stream(job)
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        return Response(jobs.describe(job))
+    
+    def stream(self, job):
+        """Status changes for JOB_STREAM_SYNC_TIMEOUT seconds; the client requests again if the job isn't done"""
+        deadline = time.monotonic() + JOB_STREAM_SYNC_TIMEOUT
+        last = None
+        while True:
+            state = (job.status, job.message)
+            if state != last:
+                yield json.dumps(jobs.describe(job), cls=DjangoJSONEncoder) + '\n'
+                last = state
+            if job.done or time.monotonic() > deadline:
+                return
+            time.sleep(JOB_STREAM_INTERVAL)
+            job.refresh_from_db()
+    
+    async def stream_async(self, job):
+        """stream() for ASGI, which waits on the event loop instead of holding a thread"""
+        deadline = time.monotonic() + JOB_STREAM_TIMEOUT
+        last = None
+        while True:
+            state = (job.status, job.message)
+            if state != last:
+                yield json.dumps(jobs.describe(job), cls=DjangoJSONEncoder) + '\n'
+                last = state
+            if job.done or time.monotonic() > deadline:
+                return
+            await asyncio.sleep(JOB_STREAM_INTERVAL)
+            await sync_to_async(job.refresh_from_db)()
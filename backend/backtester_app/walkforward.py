@@ -0,0 +1,215 @@
+"""Walk-forward optimization over rolling in-sample / out-of-sample folds.
+
+Every parameter combination's position series is computed once over the
+whole range (indicators are causal, so a fold's slice is exactly what a run
+over the fold would see) and turned into one row of a (combinations x bars)
+strategy-return matrix. A fold scores all combinations on its train slice in
+one vectorized pass, keeps the best, and takes that row's returns over the
+following test slice. The test slices tile the range after the first train
+window, so they stitch into one out-of-sample equity curve. When folds are
+scored in worker processes, the matrix is shared with them rather than
+copied into each.
+"""
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import engine, shared, strategies
+
+logger = logging.getLogger(__name__)
+
+MAX_COMBINATIONS = 2000
+# Folds are scored with engine.path_metrics(), which has only these
+RANK_METRICS = ('total_return', 'max_drawdown', 'sharpe_ratio')
+# Below this many (combination x bar) cells scored, folds run in-process
+INLINE_CELLS = 20_000_000
+
+_worker_returns = None
+
+
+def strategy_return_matrix(close, strategy, param_sets, costs=None, volume=None, initial_capital=engine.INITIAL_CAPITAL):
+    """Per-bar strategy returns for every parameter set: (n_sets, n_bars), plus the sets' warmups.
+
+    Row p at bar t is the position held at the close of bar t - 1 times the
+    return of bar t, as in engine.simulate(), net of the costs.CostModel's
+    charges if one is given (``volume`` is the bar volume it may need).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    arrays = strategies.IndicatorCache(close)
+    arrays.require([key for params in param_sets for key in strategy.indicator_keys(params)])
+
+    bar_returns = close[1:] / close[:-1] - 1
+    returns = np.zeros((len(param_sets), len(close)))
+    for row, params in enumerate(param_sets):
+        position = strategy.signals(arrays, params)
+        if costs is None or costs.free:
+            returns[row, 1:] = position[:-1] * bar_returns
+        else:
+            exposure, charges, _ = engine.apply_costs(close, position, costs, volume, initial_capital)
+            returns[row] = engine.simulate(close, exposure, initial_capital, charges)[0]
+    warmups = np.array([strategy.warmup(params) for params in param_sets], dtype=np.int64)
+    return returns, warmups
+
+
+def window_metrics(returns, periods_per_year=engine.TRADING_DAYS):
+    """engine.performance_metrics() for each row of a (rows x bars) window of returns.
+
+    The first bar of the window earns nothing, matching a run that starts there.
+    """
+    returns = np.array(returns, dtype=np.float64, ndmin=2)
+    returns[:, 0] = 0.0
+    return engine.path_metrics(returns, periods_per_year)
+
+
+def make_folds(n_bars, origin, train_bars, test_bars, anchored=False):
+    """(train_start, train_end, test_end) bar offsets; test windows tile [origin + train_bars, n_bars)"""
+    if train_bars < 2 or test_bars < 1:
+        raise ValueError("train_bars must be at least 2 and test_bars at least 1")
+    folds = []
+    test_start = origin + train_bars
+    while test_start < n_bars:
+        train_start = origin if anchored else test_start - train_bars
+        folds.append((train_start, test_start, min(test_start + test_bars, n_bars)))
+        test_start += test_bars
+    return folds
+
+
+def _init_worker(returns):
+    global _worker_returns
+    _worker_returns = returns
+
+
+def _attach_worker(handle):
+    _init_worker(shared.attach(handle)['returns'])
+
+
+def _evaluate_folds(folds, rank_by, returns=None, periods_per_year=engine.TRADING_DAYS):
+    """Best row per fold on its train window and that row's train metrics.
+
+    ``returns`` defaults to the matrix a pool worker's initializer attached.
+    """
+    if returns is None:
+        returns = _worker_returns
+    results = []
+    for train_start, train_end, _ in folds:
+        metrics = window_metrics(returns[:, train_start:train_end], periods_per_year)
+        best = int(np.argmax(metrics[rank_by]))
+        results.append((best, {name: float(values[best]) for name, values in metrics.items()}))
+    return results
+
+
+def run_walk_forward(close, indicator, param_sets, train_bars, test_bars, anchored=False,
+                     rank_by='sharpe_ratio', max_workers=None, initial_capital=engine.INITIAL_CAPITAL,
+                     periods_per_year=engine.TRADING_DAYS, costs=None, volume=None):
+    """Optimize on each train window, trade the winner on the next test window.
+
+    Folds start once every combination's warmup is over. Every combination
+    is charged the same costs.CostModel, if given, with the bar ``volume``
+    for models that use it; the out-of-sample run also pays for the switch
+    between one fold's choice and the next. Metrics are annualized over
+    periods_per_year bars. Returns a dict with the bar offset where the
+    first test window starts, the stitched out-of-sample returns and equity,
+    the per-fold choices and the out-of-sample metrics.
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"rank_by must be one of {', '.join(RANK_METRICS)}")
+    if len(param_sets) > MAX_COMBINATIONS:
+        raise ValueError(f"Walk-forward grid has {len(param_sets)} combinations; the limit is {MAX_COMBINATIONS}")
+
+    close = np.asarray(close, dtype=np.float64)
+    strategy = strategies.get_strategy(indicator)
+    usable = []
+    for params in param_sets:
+        try:
+            strategy.check_data(len(close), params)
+            usable.append(params)
+        except ValueError:
+            pass
+    if not usable:
+        raise ValueError("No parameter combination has enough data for the selected date range")
+
+    returns, warmups = strategy_return_matrix(close, strategy, usable, costs, volume, initial_capital)
+    origin = int(warmups.max())
+    folds = make_folds(len(close), origin, train_bars, test_bars, anchored)
+    if not folds:
+        raise ValueError(
+            f"Not enough data for one fold: {len(close)} bars, {origin} warmup and {train_bars} train bars needed before testing"
+        )
+
+    max_workers = max_workers or os.cpu_count() or 1
+    cells = len(usable) * sum(train_end - train_start for train_start, train_end, _ in folds)
+    if cells <= INLINE_CELLS or max_workers == 1 or len(folds) == 1:
+        # Views run on a thread pool, so the inline path doesn't go through the worker global
+        chosen = _evaluate_folds(folds, rank_by, returns, periods_per_year)
+    else:
+        workers = min(max_workers, len(folds))
+        chunk_size = math.ceil(len(folds) / workers)
+        chunks = [folds[i:i + chunk_size] for i in range(0, len(folds), chunk_size)]
+        # spawn rather than fork: the web server may have threads holding locks
+        context = multiprocessing.get_context('spawn')
+        with shared.SharedArrays({'returns': returns}) as arrays, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                    initializer=_attach_worker, initargs=(arrays.handle,)) as pool:
+            results = pool.map(_evaluate_folds, chunks, [rank_by] * len(chunks), [None] * len(chunks),
+                               [periods_per_year] * len(chunks))
+            chosen = [fold for chunk in results for fold in chunk]
+
+    first_test = folds[0][1]
+    if costs is None or costs.free:
+        oos_returns = np.zeros(len(close) - first_test)
+        for (_, train_end, test_end), (best, _) in zip(folds, chosen):
+            oos_returns[train_end - first_test:test_end - first_test] = returns[best, train_end:test_end]
+    else:
+        oos_returns = _stitched_returns(close, strategy, usable, folds, chosen, costs, volume, initial_capital)
+
+    fold_rows = []
+    for (train_start, train_end, test_end), (best, train_metrics) in zip(folds, chosen):
+        test_metrics = window_metrics(returns[best, train_end - 1:test_end], periods_per_year)
+        fold_rows.append({
+            'train_start': train_start,
+            'train_end': train_end,
+            'test_end': test_end,
+            'params': usable[best],
+            'train': train_metrics,
+            'test': {name: float(values[0]) for name, values in test_metrics.items()},
+        })
+
+    # The first out-of-sample bar earns the position chosen at the end of the first train window
+    equity = initial_capital * np.cumprod(1 + oos_returns)
+    logger.info(f"Walk-forward over {len(folds)} folds and {len(usable)} {indicator} combinations")
+    return {
+        'start': first_test,
+        'returns': oos_returns,
+        'equity': equity,
+        'folds': fold_rows,
+        'combinations': len(usable),
+        **engine.performance_metrics(oos_returns, equity, initial_capital, periods_per_year),
+    }
+
+
+def _stitched_returns(close, strategy, param_sets, folds, chosen, costs, volume, initial_capital):
+    """Out-of-sample returns of the positions the folds chose, charged as one run from the first test window"""
+    arrays = strategies.IndicatorCache(close)
+    winners = sorted({best for best, _ in chosen})
+    arrays.require([key for best in winners for key in strategy.indicator_keys(param_sets[best])])
+    positions = {best: strategy.signals(arrays, param_sets[best]) for best in winners}
+
+    # The position held from bar first_test - 1, i.e. earning from first_test on
+    first_test = folds[0][1]
+    held = np.empty(len(close) - first_test + 1)
+    for (_, train_end, test_end), (best, _) in zip(folds, chosen):
+        held[train_end - first_test:test_end - first_test] = positions[best][train_end - 1:test_end - 1]
+    held[-1] = positions[chosen[-1][0]][-1]
+
+    close = close[first_test - 1:]
+    volume = None if volume is None else np.asarray(volume, dtype=np.float64)[first_test - 1:]
+    exposure, charges, _ = engine.apply_costs(close, held, costs, volume, initial_capital)
+    returns, _ = engine.simulate(close, exposure, initial_capital, charges)
+    # Entering the first position is charged on the bar before the test window; book it on its first bar
+    oos_returns = returns[1:]
+    oos_returns[0] = (1 + oos_returns[0]) * (1 + returns[0]) - 1
+    return oos_returns